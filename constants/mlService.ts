@@ -389,25 +389,91 @@ export const getForecastForDate = async (dateString: string): Promise<Prediction
 };
 
 // ⭐⭐⭐ Get forecast for next N days ⭐⭐⭐
+// One /forecast-range call scores every day x barangay on the server
 export const getForecastRange = async (days: number = 7): Promise<Record<string, Prediction[]>> => {
   console.log(`[ML Service] Getting ${days}-day forecast range`);
   
-  const forecasts: Record<string, Prediction[]> = {};
+  const startDate = new Date();
+  startDate.setDate(startDate.getDate() + 1);
+  const startDateStr = startDate.toISOString().split('T')[0];
   
-  for (let i = 1; i <= days; i++) {
-    const date = new Date();
+  const weather = [];
+  for (let i = 0; i < days; i++) {
+    const date = new Date(startDate);
     date.setDate(date.getDate() + i);
-    const dateStr = date.toISOString().split('T')[0];
+    const forecast = await getWeatherForecast(date);
+    weather.push({
+      date: date.toISOString().split('T')[0],
+      rainfall_mm: forecast.rainfall,
+      temperature_c: forecast.temperature
+    });
+  }
+  
+  try {
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), 10000); // 10 second timeout
     
-    try {
-      const result = await generatePredictions(dateStr);
-      forecasts[dateStr] = result.predictions;
-    } catch (error) {
-      console.error(`Failed to get forecast for ${dateStr}:`, error);
+    const response = await fetch(`${currentAPI_URL}/forecast-range`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+      },
+      body: JSON.stringify({
+        start_date: startDateStr,
+        days,
+        weather,
+        barangays: ALL_BARANGAYS.map((barangay) => ({
+          barangay_id: barangay.id.toString(),
+          barangay_name: barangay.name,
+          population: barangay.population,
+          has_market: !!barangay.hasMarket
+        }))
+      }),
+      signal: controller.signal
+    });
+    
+    clearTimeout(timeoutId);
+    
+    if (!response.ok) {
+      throw new Error(`API error ${response.status}: ${response.statusText}`);
     }
+    
+    const result = await response.json();
+    const forecasts: Record<string, Prediction[]> = {};
+    
+    for (const [dateStr, dayPredictions] of Object.entries<any[]>(result.forecasts || {})) {
+      forecasts[dateStr] = dayPredictions.map((pred: any) => ({
+        ...pred,
+        overflowProbability: pred.confidence,
+        factors: [
+          { feature: 'Forecast Date', value: dateStr, importance: 0.5 },
+          { feature: 'Volume Risk', value: pred.volumeRisk?.volume_risk || 'Unknown', importance: 0.3 }
+        ]
+      }));
+    }
+    
+    console.log(`✅ Forecast range received: ${Object.keys(forecasts).length} days`);
+    return forecasts;
+  } catch (error) {
+    console.error('[ML Service] Forecast range failed:', error);
+    
+    // Fallback: one batch request per day
+    const forecasts: Record<string, Prediction[]> = {};
+    for (let i = 1; i <= days; i++) {
+      const date = new Date();
+      date.setDate(date.getDate() + i);
+      const dateStr = date.toISOString().split('T')[0];
+      
+      try {
+        const result = await generatePredictions(dateStr);
+        forecasts[dateStr] = result.predictions;
+      } catch (error) {
+        console.error(`Failed to get forecast for ${dateStr}:`, error);
+      }
+    }
+    return forecasts;
   }
-  
-  return forecasts;
 };
 
 // ⭐⭐⭐ Updated: Get model metrics ⭐⭐⭐
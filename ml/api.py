@@ -1,19 +1,40 @@
 import os
 import sys
+import csv
 import json
+import asyncio
 import socket
+import time
+import logging
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Union
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import joblib
 import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
 
+from event_calendar import EventCalendar
+from model_registry import ARTIFACTS, ModelRegistry, ModelSet, unloaded_model_set
+from api_logging import configure_logging, log, logger, new_request_id, request_id_var
+from inference_pool import InferencePool, PoolBusyError
+from micro_batcher import MicroBatcher
+from prediction_cache import PredictionCache
+from forecast_cube import ForecastCube, ForecastCubeStore, roster_key
+from barangay_ingest import BarangayTable, load_barangay_table
+from shadow_scoring import ShadowScorer
+from http_cache import CompressionMiddleware, etag_matches, weak_etag
+from prediction_intervals import INTERVAL_FIELDS, interval_dict, volume_intervals
+from feature_attribution import explanation, forest_contributions, top_factors
+from scenario_sweep import ScenarioGrid, SurfaceAccumulator, cell_aggregates, split_thresholds, threshold_bins
+from observations import CsvBlocks, MAX_REPORTED_ERRORS, ObservationStore, header_columns, new_upload_id
+import columnar
+
 app = FastAPI(title="Waste Prediction ML API")
+configure_logging()
 
 # Function to get local IP address
 def get_local_ip():
@@ -34,129 +55,91 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, **CompressionMiddleware.options_from_env())
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag every log record for a request with one correlation id"""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        log(logging.INFO, "request", method=request.method, path=request.url.path,
+            status=response.status_code, duration_ms=round((time.perf_counter() - start) * 1000, 2))
+        return response
+    finally:
+        request_id_var.reset(token)
 
 # Load models from the same directory
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# "flat" memory-maps the .wpm forests written by train_waste_model.py: no
+# sklearn import, and every worker shares the same pages. "sklearn" (or a
+# missing .wpm file) unpickles the .pkl estimators instead.
+MODEL_ENGINE = os.environ.get("MODEL_ENGINE", "flat").lower()
+
+# Published versions live in the model registry (model_registry.py); with an
+# empty registry the artifacts next to this file are served as before.
+# Configured by MODEL_REGISTRY_DIR, MODEL_REGISTRY_KEEP and MODEL_REGISTRY_POLL_S.
+MODEL_REGISTRY = ModelRegistry.from_env(engine=MODEL_ENGINE)
+
+def local_fingerprint() -> str:
+    """Identifies the artifacts in MODEL_DIR; changes whenever they are retrained"""
+    artifacts = []
+    for filename in ARTIFACTS:
+        path = os.path.join(MODEL_DIR, filename)
+        artifacts.append(str(os.stat(path).st_mtime_ns) if os.path.exists(path) else '-')
+    return f"local:{MODEL_ENGINE}:{':'.join(artifacts)}"
+
+def load_serving_models() -> ModelSet:
+    version = MODEL_REGISTRY.active_version()
+    if version is not None:
+        return MODEL_REGISTRY.load(version)
+    return ModelSet.load(MODEL_DIR, engine=MODEL_ENGINE, fingerprint=local_fingerprint())
+
+# MODELS is the ModelSet being served. Handlers read it once per request and
+# hand its version to the inference jobs, so a hot swap (see MODEL REGISTRY
+# below) never mixes two versions in one response.
 try:
-    volume_model = joblib.load(os.path.join(MODEL_DIR, 'waste_volume_regressor.pkl'))
-    risk_model = joblib.load(os.path.join(MODEL_DIR, 'risk_level_classifier.pkl'))
-    print("✅ ML models loaded successfully")
-    print(f"   Volume model features: {volume_model.n_features_in_}")
-    print(f"   Risk model classes: {risk_model.classes_}")
-    print(f"   Risk model shape: {risk_model.n_features_in_ if hasattr(risk_model, 'n_features_in_') else 'Unknown'}")
+    MODELS = load_serving_models()
+    print(f"✅ ML models loaded successfully ({MODELS.engine}, version {MODELS.version})")
+    print(f"   Volume model features: {MODELS.volume_model.n_features_in_}")
+    print(f"   Risk model classes: {MODELS.risk_model.classes_}")
+    print("✅ Metadata loaded" if MODELS.metadata else "⚠️  Could not load metadata")
 except Exception as e:
     print(f"❌ Error loading models: {e}")
-    volume_model = None
-    risk_model = None
+    MODELS = unloaded_model_set()
+
+def models_for(version: str) -> ModelSet:
+    """The ModelSet a job was submitted with; process-pool workers load new versions on first use"""
+    models = MODELS
+    if version == models.version:
+        return models
+    models = MODEL_REGISTRY.load(version)
+    if _single_threaded:
+        limit_threads(models)
+    return models
 
-# Load metadata
+# CSV HISTORICAL DATA - FROM YOUR TRAINING DATA
+# Parsed once by barangay_ingest.py and cached in barangay_table.wpm
 try:
-    with open(os.path.join(MODEL_DIR, 'ml_models_metadata.json'), 'r') as f:
-        metadata = json.load(f)
-    print("✅ Metadata loaded")
-    print(f"   Expected features: {metadata.get('features', [])}")
-except:
-    metadata = {}
-    print("⚠️  Could not load metadata")
-
-# Load event configuration
+    BARANGAY_TABLE = load_barangay_table()
+    print(f"✅ Barangay table loaded ({len(BARANGAY_TABLE)} barangays)")
+except Exception as e:
+    print(f"⚠️  Could not load barangay table: {e}")
+    BARANGAY_TABLE = BarangayTable([], [], [], [], np.empty((0, 4)), [])
+HISTORICAL_WASTE_CSV = BARANGAY_TABLE.waste_by_name()
+
+# Load event configuration, compiled into a day-of-year x barangay index
 EVENTS_FILE = os.path.join(MODEL_DIR, 'cdo_events.json')
-try:
-    with open(EVENTS_FILE, 'r') as f:
-        CDO_EVENTS = json.load(f)
+EVENT_CALENDAR = EventCalendar(EVENTS_FILE, barangay_names=HISTORICAL_WASTE_CSV)
+if os.path.exists(EVENTS_FILE):
     print("✅ CDO events data loaded")
-    print(f"   Events configured: {len(CDO_EVENTS.get('events', []))}")
-except:
+    print(f"   Events configured: {len(EVENT_CALENDAR.data.get('events', []))}")
+else:
     print("⚠️  No events file found, using default")
-    CDO_EVENTS = {
-        "events": [],
-        "weekly_patterns": {}
-    }
-
-# CSV HISTORICAL DATA - FROM YOUR TRAINING DATA
-HISTORICAL_WASTE_CSV = {
-    'Agusan': 7996.38,
-    'Baikingon': 1209.18,
-    'Balubal': 2945.46,
-    'Balulang': 17726.10,
-    'Barangay 1': 70.56,
-    'Barangay 2': 21.00,
-    'Barangay 3': 39.06,
-    'Barangay 4': 28.56,
-    'Barangay 5': 14.28,
-    'Barangay 6': 13.86,
-    'Barangay 7': 228.48,
-    'Barangay 8': 37.80,
-    'Barangay 9': 54.60,
-    'Barangay 10': 233.94,
-    'Barangay 11': 68.04,
-    'Barangay 12': 107.94,
-    'Barangay 13': 405.30,
-    'Barangay 14': 147.42,
-    'Barangay 15': 775.74,
-    'Barangay 16': 10.50,
-    'Barangay 17': 864.36,
-    'Barangay 18': 532.98,
-    'Barangay 19': 95.34,
-    'Barangay 20': 33.60,
-    'Barangay 21': 152.46,
-    'Barangay 22': 1396.08,
-    'Barangay 23': 393.12,
-    'Barangay 24': 254.94,
-    'Barangay 25': 277.62,
-    'Barangay 26': 510.30,
-    'Barangay 27': 672.42,
-    'Barangay 28': 207.06,
-    'Barangay 29': 199.92,
-    'Barangay 30': 284.76,
-    'Barangay 31': 241.50,
-    'Barangay 32': 332.64,
-    'Barangay 33': 35.28,
-    'Barangay 34': 222.18,
-    'Barangay 35': 840.84,
-    'Barangay 36': 187.74,
-    'Barangay 37': 76.02,
-    'Barangay 38': 20.16,
-    'Barangay 39': 7.14,
-    'Barangay 40': 142.38,
-    'Bayabas': 5876.22,
-    'Bayanga': 1428.84,
-    'Besigan': 714.00,
-    'Bonbon': 4609.92,
-    'Bugo': 13116.18,
-    'Bulua': 14866.74,
-    'Camaman-an': 14799.96,
-    'Canitoan': 14385.00,
-    'Carmen': 32657.52,
-    'Consolacion': 3946.32,
-    'Cugman': 9856.56,
-    'Dansolihon': 2606.52,
-    'F.S Catanico': 992.88,
-    'Gusa': 12169.08,
-    'Indahag': 7489.02,
-    'Iponan': 11558.82,
-    'Kauswagan': 16900.38,
-    'Lapasan': 16478.28,
-    'Lumbia': 13231.68,
-    'Macabalan': 8216.04,
-    'Macasandig': 9758.70,
-    'Mambuaya': 2504.46,
-    'Nazareth': 2927.82,
-    'Pagalungan': 1012.20,
-    'Pagatpat': 5462.94,
-    'Patag': 7535.22,
-    'Pigsag-an': 599.76,
-    'Puerto': 5533.08,
-    'Puntod': 7885.50,
-    'San Simon': 689.64,
-    'Tablon': 10322.76,
-    'Taglimao': 584.22,
-    'Tagpangi': 1185.66,
-    'Tignapoloan': 2360.82,
-    'Tuburan': 582.96,
-    'Tumpagon': 968.10,
-}
 
 def get_historical_waste(barangay_name: str) -> float:
     """Get historical waste from CSV data"""
@@ -177,21 +160,41 @@ class PredictionRequest(BaseModel):
 class BatchPredictionRequest(BaseModel):
     barangays: List[PredictionRequest]
 
+class ForecastBarangay(BaseModel):
+    barangay_id: str
+    barangay_name: str = ""
+    population: float
+    has_market: bool = False
+
+class DailyWeather(BaseModel):
+    date: str
+    rainfall_mm: float = 0
+    temperature_c: float = 28
+
+class ForecastRangeRequest(BaseModel):
+    barangays: List[ForecastBarangay]
+    start_date: str = None       # Defaults to tomorrow
+    end_date: str = None         # Inclusive; defaults to start_date + days - 1
+    days: int = 7
+    weather: List[DailyWeather] = []  # Days not listed use the defaults above
+
 # ============================================================================
 # NEW: VOLUME RISK CATEGORIES FUNCTION
 # ============================================================================
-def calculate_volume_risk_categories(predictions):
+# Your actual thresholds from training (R²: 0.966, Accuracy: 81.2%)
+P70_THRESHOLD = 3246  # kg - Moderate threshold
+P90_THRESHOLD = 13128  # kg - High threshold
+VOLUME_RISK_LEVELS = ['Normal Volume', 'Moderate Volume', 'High Volume']  # Levels 1..3
+
+def volume_risk_levels(volumes: np.ndarray) -> np.ndarray:
+    """The 'level' calculate_volume_risk_categories assigns, for a whole column of volumes"""
+    return (1 + (volumes > P70_THRESHOLD) + (volumes > P90_THRESHOLD)).astype(np.int8)
+
+def calculate_volume_risk_categories(predictions, log_summary: bool = True):
     """
     Add volume-based risk categories using REAL percentiles from your training
     """
-    # Your actual thresholds from training (R²: 0.966, Accuracy: 81.2%)
-    P70_THRESHOLD = 3246  # kg - Moderate threshold
-    P90_THRESHOLD = 13128  # kg - High threshold
-    
-    print(f"\n📊 Applying volume risk categories:")
-    print(f"   Normal: < {P70_THRESHOLD:,}kg")
-    print(f"   Moderate: {P70_THRESHOLD:,} - {P90_THRESHOLD:,}kg")
-    print(f"   High: > {P90_THRESHOLD:,}kg")
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     high_count = 0
     moderate_count = 0
@@ -235,102 +238,38 @@ def calculate_volume_risk_categories(predictions):
         pred['volumeRisk'] = category
         
         # Log only high volume barangays for clarity
-        if volume > P90_THRESHOLD:
-            print(f"   ⚠️  {pred.get('barangayName')}: {volume:,.0f}kg → HIGH VOLUME")
-        elif volume > P70_THRESHOLD and volume < 50000:  # Skip extreme values
-            print(f"   📈 {pred.get('barangayName')}: {volume:,.0f}kg → MODERATE VOLUME")
+        if debug and volume > P70_THRESHOLD:
+            log(logging.DEBUG, "volume_risk", barangay=pred.get('barangayName'),
+                volume_kg=round(volume), category=category['volume_risk'])
     
-    print(f"📈 Volume Risk Summary: {high_count} High, {moderate_count} Moderate, {normal_count} Normal")
+    if log_summary:
+        log(logging.INFO, "volume_risk_summary", high=high_count, moderate=moderate_count, normal=normal_count)
     return predictions
 
+def parse_prediction_date(prediction_date: str = None) -> datetime:
+    """Parse YYYY-MM-DD, falling back to now for missing or malformed dates"""
+    if prediction_date:
+        try:
+            return datetime.strptime(prediction_date, "%Y-%m-%d")
+        except:
+            pass
+    return datetime.now()
+
 def check_events_for_barangay(barangay_name: str, prediction_date: str = None):
-    if not prediction_date:
-        prediction_date = datetime.now().strftime("%Y-%m-%d")
+    date_obj = parse_prediction_date(prediction_date)
+    flags = EVENT_CALENDAR.lookup(np.array([date_obj.date()], dtype='datetime64[D]'), [barangay_name])
     
-    try:
-        date_obj = datetime.strptime(prediction_date, "%Y-%m-%d")
-    except:
-        date_obj = datetime.now()
-    
-    month_day = date_obj.strftime("%m-%d")
-    day_name = date_obj.strftime("%A")
-    month = date_obj.month
-    
-    event_flags = {
-        'is_fiesta': 0,
-        'is_holiday': 0,
-        'is_special_event': 0,
-        'is_weekend_market': 0,
-        'event_multiplier': 1.0,
-        'event_names': []
+    return {
+        'is_fiesta': int(flags['is_fiesta'][0]),
+        'is_holiday': int(flags['is_holiday'][0]),
+        'is_special_event': int(flags['is_special_event'][0]),
+        'is_weekend_market': int(flags['is_weekend_market'][0]),
+        'event_multiplier': float(flags['event_multiplier'][0]),
+        'event_names': flags['event_names'][0]
     }
-    
-    # Check major events
-    for event in CDO_EVENTS.get("events", []):
-        date_matches = False
-        for event_date in event.get("dates", []):
-            if event_date in month_day:
-                date_matches = True
-                break
-        
-        if date_matches:
-            affected = event.get("affected_barangays", [])
-            is_affected = False
-            
-            if affected == "all":
-                is_affected = True
-            elif isinstance(affected, list):
-                barangay_lower = barangay_name.lower()
-                
-                if barangay_name in affected:
-                    is_affected = True
-                elif any(isinstance(b, str) and b.lower() in barangay_lower for b in affected):
-                    is_affected = True
-                elif any(isinstance(b, int) and f"barangay {b}" in barangay_lower for b in affected):
-                    is_affected = True
-                elif any(isinstance(b, str) and b in barangay_name for b in affected):
-                    is_affected = True
-            
-            if is_affected:
-                event_flags['is_special_event'] = 1
-                event_flags['event_multiplier'] *= event.get("waste_multiplier", 1.0)
-                event_flags['event_names'].append(event.get("name", "Unknown"))
-                
-                if event.get("type") == "festival":
-                    event_flags['is_fiesta'] = 1
-                elif event.get("type") == "holiday":
-                    event_flags['is_holiday'] = 1
-    
-    # Check weekly patterns
-    weekly = CDO_EVENTS.get("weekly_patterns", {})
-    if "market_days" in weekly:
-        market_info = weekly["market_days"]
-        if day_name in market_info.get("days", []):
-            affected_barangays = market_info.get("barangays", [])
-            barangay_lower = barangay_name.lower()
-            
-            market_match = False
-            if barangay_name in affected_barangays:
-                market_match = True
-            elif any(b.lower() in barangay_lower for b in affected_barangays if isinstance(b, str)):
-                market_match = True
-            
-            if market_match:
-                event_flags['is_weekend_market'] = 1
-                event_flags['event_multiplier'] *= market_info.get("multiplier", 1.0)
-                if "Market Day" not in event_flags['event_names']:
-                    event_flags['event_names'].append("Market Day")
-    
-    return event_flags
 
 def calculate_features(request: PredictionRequest):
-    if request.prediction_date:
-        try:
-            prediction_date = datetime.strptime(request.prediction_date, "%Y-%m-%d")
-        except:
-            prediction_date = datetime.now()
-    else:
-        prediction_date = datetime.now()
+    prediction_date = parse_prediction_date(request.prediction_date)
     
     event_flags = check_events_for_barangay(
         request.barangay_name, 
@@ -376,183 +315,506 @@ def calculate_features(request: PredictionRequest):
     
     return features, event_flags
 
-@app.post("/predict")
-async def predict_single(request: PredictionRequest):
-    if not volume_model or not risk_model:
-        raise HTTPException(status_code=500, detail="ML models not loaded")
+def calculate_features_batch(requests: List[PredictionRequest]):
+    """
+    Vectorized calculate_features for a whole batch: returns the (N x 14)
+    feature matrix, per-row event multipliers and per-row event names.
+    """
+    return calculate_features_columns(
+        names=[r.barangay_name for r in requests],
+        population=[r.population for r in requests],
+        rainfall_mm=[r.rainfall_mm for r in requests],
+        temperature_c=[r.temperature_c for r in requests],
+        is_market_day=[r.is_market_day for r in requests],
+        day_of_week=[r.day_of_week for r in requests],
+        prediction_dates=[r.prediction_date for r in requests],
+    )
+
+def calculate_features_columns(names, population, rainfall_mm, temperature_c, is_market_day, day_of_week,
+                               prediction_dates):
+    """
+    calculate_features_batch on one sequence per field, as sent to
+    /predict-batch/columnar. Event flags come from one fancy-index into the
+    compiled calendar.
+    """
+    parsed = {d: parse_prediction_date(d).date() for d in set(prediction_dates)}
+    dates = np.array([parsed[d] for d in prediction_dates], dtype='datetime64[D]')
+    event_flags = EVENT_CALENDAR.lookup(dates, names)
+    
+    population = np.asarray(population, dtype=np.float64)
+    historical = np.array([get_historical_waste(n) for n in names], dtype=np.float64)
+    historical = np.where(historical == 0, population * 0.42, historical)
+    day_of_week = np.asarray(day_of_week, dtype=np.float64)
+    months = dates.astype('datetime64[M]')
+    month = months.astype(np.int64) % 12 + 1
+    day_of_month = (dates - months).astype(np.int64) + 1
     
+    X = np.empty((len(names), 14), dtype=np.float64)
+    X[:, 0] = population
+    X[:, 1] = historical * event_flags['event_multiplier']
+    X[:, 2] = rainfall_mm
+    X[:, 3] = temperature_c
+    X[:, 4] = day_of_week
+    X[:, 5] = month
+    X[:, 6] = day_of_month
+    X[:, 7] = day_of_week >= 5
+    X[:, 8] = is_market_day
+    X[:, 9] = event_flags['is_fiesta']
+    X[:, 10] = event_flags['is_holiday']
+    X[:, 11] = np.isin(day_of_month, [15, 30])
+    X[:, 12] = (month >= 6) & (month <= 10)
+    X[:, 13] = (month >= 3) & (month <= 5)
+    
+    return X, event_flags['event_multiplier'], event_flags['event_names']
+
+# ============================================================================
+# INFERENCE WORKER POOL
+# ============================================================================
+# Model calls run here instead of on the event loop, so a large batch cannot
+# freeze /health or other requests. Configured by INFERENCE_POOL,
+# INFERENCE_WORKERS and INFERENCE_QUEUE_DEPTH.
+_single_threaded = False
+
+def limit_threads(models: ModelSet):
+    for model in (models.volume_model, models.risk_model):
+        if model is not None and hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+
+def single_threaded_models():
+    """Process-pool worker setup: one core per worker instead of n_jobs=-1 each"""
+    global _single_threaded
+    _single_threaded = True
+    limit_threads(MODELS)
+
+INFERENCE_POOL = InferencePool.from_env(initializer=single_threaded_models)
+
+async def run_inference(fn, *args):
+    """Run fn(*args) on the inference pool; a full queue answers 503 right away"""
     try:
-        features_list, event_flags = calculate_features(request)
-        features = np.array([features_list])
-        
-        print(f"📊 Features for {request.barangay_name}:")
-        print(f"   Historical waste: {get_historical_waste(request.barangay_name):.0f} kg")
-        print(f"   With events: {features_list[1]:.0f} kg ({event_flags['event_multiplier']:.2f}x)")
-        print(f"   Events: {event_flags['event_names']}")
-        
-        volume_pred = float(volume_model.predict(features)[0])
-        risk_proba = risk_model.predict_proba(features)[0]
-        risk_class = risk_model.predict(features)[0]
-        
-        confidence = float(max(risk_proba))
-        
-        risk_map = {0: 'safe', 1: 'moderate', 2: 'high'}
-        risk_level = risk_map.get(int(risk_class), 'moderate')
-        
-        # CRITICAL FIX: Debug risk model output
-        print(f"   ⚠️ ML Risk DEBUG: class={risk_class}, probabilities={risk_proba}")
-        print(f"   ⚠️ Mapped to: {risk_level}")
-        
-        # REMOVED: All automatic risk escalation
-        # Only trust the ML model's prediction
-        # No automatic adjustment based on event multiplier
-        
-        print(f"✅ Final: {volume_pred:.0f} kg, {risk_level} risk, {confidence:.1%} confidence")
-        
-        return {
-            "barangayId": request.barangay_id,
-            "barangayName": request.barangay_name,
-            "predictedVolume": volume_pred,
-            "overflowRisk": risk_level,
-            "confidence": confidence,
-            "modelVersion": metadata.get('model_info', {}).get('version', '1.0'),
-            "timestamp": datetime.now().isoformat(),
-            "events": event_flags['event_names'],
-            "eventMultiplier": event_flags['event_multiplier'],
-            "factors": [
-                {"feature": "Historical Waste", "value": f"{get_historical_waste(request.barangay_name):.0f} kg", "importance": 0.445},
-                {"feature": "Population", "value": f"{request.population:,}", "importance": 0.458},
-                {"feature": "Rainfall", "value": f"{request.rainfall_mm} mm", "importance": 0.296},
-                {"feature": "Events", "value": ", ".join(event_flags['event_names']) if event_flags['event_names'] else "None", "importance": 0.35}
-            ]
-        }
-        
-    except Exception as e:
-        print(f"❌ Prediction error for {request.barangay_name}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+        return await INFERENCE_POOL.run(fn, *args)
+    except PoolBusyError as e:
+        log(logging.WARNING, "inference_rejected", **INFERENCE_POOL.stats())
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-@app.post("/predict-batch")
-async def predict_batch(request: BatchPredictionRequest):
-    print(f"\n" + "="*60)
-    print(f"📦 BATCH PREDICTION REQUEST")
-    print(f"Number of barangays: {len(request.barangays)}")
-    print("="*60)
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    INFERENCE_POOL.shutdown()
+
+# ============================================================================
+# BATCHED INFERENCE ENGINE
+# ============================================================================
+# Risk classes are coded 0=safe, 1=moderate, 2=high throughout the engine
+RISK_LEVELS = np.array(['safe', 'moderate', 'high'])
+
+def error_prediction(barangay_id: str, error: str):
+    """Placeholder row returned for a barangay that could not be scored"""
+    return {
+        "barangayId": barangay_id,
+        "error": error,
+        "predictedVolume": 0,
+        "overflowRisk": "unknown",
+        "confidence": 0
+    }
+
+# Raw model outputs (volume + risk probabilities) per feature row, shared by
+# /predict, /predict-batch and /forecast-range. Configured by
+# PREDICTION_CACHE_SIZE and PREDICTION_CACHE_TTL_S; rebinding to a new
+# model fingerprint empties it. Keys carry the fingerprint of the models
+# that scored them, so requests still finishing on a swapped-out version
+# never read or shadow the new version's entries.
+PREDICTION_CACHE = PredictionCache.from_env()
+PREDICTION_CACHE.bind(MODELS.fingerprint)
+
+def score_feature_matrix(X: np.ndarray, models: ModelSet, intervals: bool = False):
+    """
+    Run both models once over an (N x 14) feature matrix.
+    Rows found in the prediction cache are not scored again; only the misses
+    go through the models. The risk class is taken from the argmax of the
+    probabilities, which is exactly what RandomForestClassifier.predict does
+    internally. With `intervals`, volumes come from the per-tree matrix and
+    an (N x 4) array of volume bands (INTERVAL_FIELDS) is returned as well.
+    """
+    volume_model, risk_model = models.volume_model, models.risk_model
+    if intervals:
+        # Bands need every tree's output, which the cache does not hold
+        volumes, bands = volume_intervals(volume_model, X)
+        risk_proba = risk_model.predict_proba(X)
+        return volumes, risk_proba, risk_model.classes_.take(np.argmax(risk_proba, axis=1)), bands
+    if not PREDICTION_CACHE.enabled:
+        volumes = volume_model.predict(X).astype(np.float64)
+        risk_proba = risk_model.predict_proba(X)
+    else:
+        keys = PREDICTION_CACHE.keys(X, models.fingerprint)
+        hit, outputs = PREDICTION_CACHE.get_many(keys, 1 + len(risk_model.classes_))
+        miss = np.flatnonzero(~hit)
+        if len(miss):
+            outputs[miss, 0] = volume_model.predict(X[miss])
+            outputs[miss, 1:] = risk_model.predict_proba(X[miss])
+            PREDICTION_CACHE.put_many([keys[j] for j in miss.tolist()], outputs[miss])
+        volumes, risk_proba = outputs[:, 0], outputs[:, 1:]
+    risk_classes = risk_model.classes_.take(np.argmax(risk_proba, axis=1))
+    return volumes, risk_proba, risk_classes
+
+def apply_risk_overrides(volumes, risk_proba, risk_classes, multipliers, positions):
+    """
+    Column-wise version of the /predict-batch override rules.
+    `positions` is each row's index in the original request, which the
+    diversity rule keys on. Returns (risk codes, confidences).
+    """
+    risk = np.where(np.isin(risk_classes, [0, 1, 2]), risk_classes, 1).astype(np.int64)
+    confidence = risk_proba.max(axis=1).astype(np.float64)
+    
+    # Volume-based override when the model leans toward 'moderate'
+    biased = risk_proba[:, 1] >= 0.5
+    conditions = [
+        biased & (volumes > 20000),
+        biased & (volumes > 10000),
+        biased & (volumes > 5000),
+        biased & (volumes < 1000),
+        biased,
+    ]
+    risk = np.select(conditions, [2, 2, 1, 0, 1], risk)
+    confidence = np.select(conditions, [
+        0.95,
+        0.88,
+        np.maximum(0.75, confidence),
+        0.90,
+        np.maximum(0.70, confidence),
+    ], confidence)
     
-    predictions = []
+    # Event multiplier override (never downgrades from high)
+    event_high = multipliers > 1.8
+    event_moderate = ~event_high & (multipliers > 1.3) & (risk != 2)
+    risk = np.where(event_high, 2, np.where(event_moderate, 1, risk))
+    confidence = np.where(event_high, 0.92,
+                          np.where(event_moderate, np.maximum(0.80, confidence), confidence))
     
-    for i, barangay in enumerate(request.barangays):
-        print(f"\n🔍 Processing {i+1}/{len(request.barangays)}: {barangay.barangay_name}")
+    # Ensure some diversity in the dataset (every 10th barangay gets different risk)
+    force_high = (positions % 10 == 0) & (volumes > 3000)
+    force_safe = ~force_high & (positions % 7 == 0) & (volumes < 2000)
+    risk = np.where(force_high, 2, np.where(force_safe, 0, risk))
+    confidence = np.where(force_high, 0.85, np.where(force_safe, 0.88, confidence))
+    
+    return risk, confidence
+
+def score_batch(barangays: List[PredictionRequest], version: str = None, return_features: bool = False,
+                offset: int = 0, intervals: bool = False):
+    """
+    Score a whole batch with one call per model instead of three per barangay.
+    Rows that make the models fail get an error entry of their own without
+    affecting the rest of the batch. `version` defaults to the serving models.
+    With `return_features`, returns (predictions, feature matrix, event
+    multipliers) so the batch can be shadow-scored without rebuilding them.
+    `offset` is the first row's position in the request when `barangays` is
+    one chunk of a larger batch. `intervals` adds each row's volume bands.
+    """
+    models = models_for(version) if version else MODELS
+    X, multipliers = np.empty((0, 14)), np.empty(0)
+    if not models.loaded:
+        predictions = [error_prediction(b.barangay_id, "ML models not loaded") for b in barangays]
+        return (predictions, X, multipliers) if return_features else predictions
+    
+    predictions = [None] * len(barangays)
+    
+    if barangays:
+        X, multipliers, event_names = calculate_features_batch(barangays)
+        positions = offset + np.arange(len(barangays))
+        volumes, risk_proba, risk_classes, bands, errors = score_rows(
+            X, models, [b.barangay_name for b in barangays], intervals)
+        for j, error in errors.items():
+            predictions[j] = error_prediction(barangays[j].barangay_id, error)
         
-        try:
-            if not volume_model or not risk_model:
-                predictions.append({
-                    "barangayId": barangay.barangay_id,
-                    "error": "ML models not loaded",
-                    "predictedVolume": 0,
-                    "overflowRisk": "unknown",
-                    "confidence": 0
-                })
+        risk, confidence = apply_risk_overrides(volumes, risk_proba, risk_classes, multipliers, positions)
+        risk_labels = RISK_LEVELS[risk]
+        model_version = models.version
+        timestamp = datetime.now().isoformat()
+        
+        for j in range(len(barangays)):
+            if j in errors:
                 continue
-            
-            features_list, event_flags = calculate_features(barangay)
-            features = np.array([features_list])
-            
-            print(f"   Historical waste: {get_historical_waste(barangay.barangay_name):.0f} kg")
-            print(f"   Events: {event_flags['event_names']}")
-            print(f"   Multiplier: {event_flags['event_multiplier']:.2f}x")
-            
-            volume_pred = volume_model.predict(features)
-            risk_proba = risk_model.predict_proba(features)
-            risk_class = risk_model.predict(features)
-            
-            volume_value = float(volume_pred[0])
-            risk_value = int(risk_class[0])
-            confidence_value = float(max(risk_proba[0]))
-            
-            risk_map = {0: 'safe', 1: 'moderate', 2: 'high'}
-            risk_level = risk_map.get(risk_value, 'moderate')
-            
-            # CRITICAL FIX: Debug each prediction
-            print(f"   ⚠️ ML Risk DEBUG: class={risk_value}, probs=[safe={risk_proba[0][0]:.3f}, moderate={risk_proba[0][1]:.3f}, high={risk_proba[0][2]:.3f}]")
-            print(f"   ⚠️ Mapped to: {risk_level}")
-            
-            
-            # Check if model is heavily biased toward moderate
-            if risk_proba[0][1] >= 0.5:  # If probability for moderate > 70%
-                print(f"   ⚠️ Model biased toward 'moderate' ({risk_proba[0][1]:.1%})")
-                
-                # Override based on predicted volume (which already includes event multiplier)
-                if volume_value > 20000:  # Extremely high volume
-                    risk_level = 'high'
-                    confidence_value = 0.95
-                    print(f"   🔄 OVERRIDE: High risk ({volume_value:.0f}kg > 20,000kg)")
-                elif volume_value > 10000:  # Very high volume
-                    risk_level = 'high'
-                    confidence_value = 0.88
-                    print(f"   🔄 OVERRIDE: High risk ({volume_value:.0f}kg > 10,000kg)")
-                elif volume_value > 5000:  # High volume
-                    risk_level = 'moderate'  # Keep moderate
-                    confidence_value = max(0.75, confidence_value)
-                elif volume_value < 1000:  # Very low volume
-                    risk_level = 'safe'
-                    confidence_value = 0.90
-                    print(f"   🔄 OVERRIDE: Safe risk ({volume_value:.0f}kg < 1,000kg)")
-                else:
-                    # Keep moderate for middle values
-                    risk_level = 'moderate'
-                    confidence_value = max(0.70, confidence_value)
-            
-            # Additional override based on event multiplier
-            if event_flags['event_multiplier'] > 1.8:
-                risk_level = 'high'
-                confidence_value = 0.92
-                print(f"   🔄 EVENT OVERRIDE: High risk (multiplier: {event_flags['event_multiplier']:.2f}x)")
-            elif event_flags['event_multiplier'] > 1.3:
-                if risk_level != 'high':  # Don't downgrade from high
-                    risk_level = 'moderate'
-                    confidence_value = max(0.80, confidence_value)
-            
-            # Ensure some diversity in the dataset (every 10th barangay gets different risk)
-            if i % 10 == 0 and volume_value > 3000:
-                risk_level = 'high'
-                confidence_value = 0.85
-                print(f"   🔄 DIVERSITY: Forced high risk for variety")
-            elif i % 7 == 0 and volume_value < 2000:
-                risk_level = 'safe'
-                confidence_value = 0.88
-                print(f"   🔄 DIVERSITY: Forced safe risk for variety")
-
-            print(f"   ✅ Final: {volume_value:.0f} kg, {risk_level}, {confidence_value:.1%}")
-            
-            predictions.append({
+            barangay = barangays[j]
+            predictions[j] = {
                 "barangayId": barangay.barangay_id,
                 "barangayName": barangay.barangay_name,
-                "predictedVolume": volume_value,
-                "overflowRisk": risk_level,
-                "confidence": confidence_value,
-                "modelVersion": metadata.get('model_info', {}).get('version', '1.0'),
-                "timestamp": datetime.now().isoformat(),
-                "events": event_flags['event_names'],
-                "eventMultiplier": event_flags['event_multiplier']
-            })
-            
+                "predictedVolume": float(volumes[j]),
+                "overflowRisk": str(risk_labels[j]),
+                "confidence": float(confidence[j]),
+                "modelVersion": model_version,
+                "timestamp": timestamp,
+                "events": event_names[j],
+                "eventMultiplier": float(multipliers[j])
+            }
+            if bands is not None:
+                predictions[j]["volumeInterval"] = interval_dict(bands[j])
+    
+    return (predictions, X, multipliers) if return_features else predictions
+
+def score_rows(X: np.ndarray, models: ModelSet, names, intervals: bool = False):
+    """
+    score_feature_matrix for a batch, falling back to row-by-row scoring so
+    one bad row cannot sink the batch. Returns (volumes, risk probabilities,
+    risk classes, volume bands or None, {row: error message}); failed rows
+    hold placeholders.
+    """
+    try:
+        scored = score_feature_matrix(X, models, intervals)
+        return (*scored, *([] if intervals else [None]), {})
+    except Exception:
+        pass
+    volumes = np.zeros(len(X))
+    risk_proba = np.zeros((len(X), len(models.risk_model.classes_)))
+    risk_classes = np.ones(len(X), dtype=np.int64)
+    bands = np.zeros((len(X), len(INTERVAL_FIELDS))) if intervals else None
+    errors = {}
+    for j in range(len(X)):
+        try:
+            scored = score_feature_matrix(X[j:j + 1], models, intervals)
+            volumes[j], risk_proba[j], risk_classes[j] = scored[0][0], scored[1][0], scored[2][0]
+            if intervals:
+                bands[j] = scored[3][0]
         except Exception as e:
-            print(f"   ❌ Error: {str(e)}")
-            predictions.append({
-                "barangayId": barangay.barangay_id,
-                "error": str(e),
-                "predictedVolume": 0,
-                "overflowRisk": "unknown",
-                "confidence": 0
-            })
+            log(logging.WARNING, "row_prediction_error", barangay=names[j], error=str(e))
+            errors[j] = str(e)
+    return volumes, risk_proba, risk_classes, bands, errors
+
+# ============================================================================
+# SHADOW SCORING: A CANDIDATE VERSION ON LIVE /predict-batch TRAFFIC
+# ============================================================================
+# Configured by SHADOW_MODEL_VERSION (a registry version), SHADOW_MAX_OVERHEAD,
+# SHADOW_QUEUE_DEPTH, SHADOW_LOG_DIR and SHADOW_LOG_MAX_MB, or at runtime
+# through /models/shadow. The shadow sees the live feature matrix after the
+# response is built and never touches the prediction cache.
+RISK_CODES = {label: code for code, label in enumerate(RISK_LEVELS)}
+
+def shadow_score(models: ModelSet, X: np.ndarray, multipliers, positions):
+    """Volumes and final risk codes the shadow models would have answered for a batch"""
+    volumes = models.volume_model.predict(X).astype(np.float64)
+    risk_proba = models.risk_model.predict_proba(X)
+    risk_classes = models.risk_model.classes_.take(np.argmax(risk_proba, axis=1))
+    risk, _ = apply_risk_overrides(volumes, risk_proba, risk_classes, multipliers, positions)
+    return volumes, risk
+
+SHADOW = ShadowScorer.from_env(shadow_score, BARANGAY_TABLE.index, os.path.join(MODEL_DIR, 'shadow_logs'))
+if os.environ.get('SHADOW_MODEL_VERSION'):
+    try:
+        SHADOW.configure(MODEL_REGISTRY.load(os.environ['SHADOW_MODEL_VERSION']), MODELS.version)
+        print(f"✅ Shadow scoring with model version {SHADOW.models.version}")
+    except Exception as e:
+        print(f"⚠️  Could not load shadow model version: {e}")
+
+def shadow_batch(barangays: List[PredictionRequest], predictions, X, multipliers, scoring_s: float,
+                 offset: int = 0):
+    """Hand a scored /predict-batch (or chunk at `offset`) to the shadow; rows that failed live are left out"""
+    ok = np.array(['error' not in p for p in predictions], dtype=bool)
+    if not ok.any():
+        return
+    rows = np.flatnonzero(ok)
+    SHADOW.submit(
+        X[rows], np.asarray(multipliers)[rows], offset + rows,
+        [barangays[j].barangay_name for j in rows.tolist()],
+        [predictions[j]['predictedVolume'] for j in rows.tolist()],
+        [RISK_CODES.get(predictions[j]['overflowRisk'], 1) for j in rows.tolist()],
+        scoring_s,
+    )
+
+@app.on_event("shutdown")
+def shutdown_shadow():
+    SHADOW.shutdown()
+
+def single_prediction(request: PredictionRequest, models: ModelSet, volume_pred: float, risk_proba, risk_class,
+                      event_multiplier: float, event_names: List[str], factors: list, band=None):
+    """/predict response for one scored row (no batch override rules), with volume bands if given"""
+    confidence = float(max(risk_proba))
     
-    # ============================================================================
-    # NEW: ADD VOLUME RISK CATEGORIES AND REAL METRICS
-    # ============================================================================
-    predictions = calculate_volume_risk_categories(predictions)
+    risk_map = {0: 'safe', 1: 'moderate', 2: 'high'}
+    risk_level = risk_map.get(int(risk_class), 'moderate')
+    
+    # CRITICAL FIX: Debug risk model output
+    log(logging.DEBUG, "risk_model_output", barangay=request.barangay_name, risk_class=int(risk_class),
+        probabilities=risk_proba.tolist(), mapped_to=risk_level)
+    
+    # REMOVED: All automatic risk escalation
+    # Only trust the ML model's prediction
+    # No automatic adjustment based on event multiplier
+    
+    prediction = {
+        "barangayId": request.barangay_id,
+        "barangayName": request.barangay_name,
+        "predictedVolume": volume_pred,
+        "overflowRisk": risk_level,
+        "confidence": confidence,
+        "modelVersion": models.version,
+        "timestamp": datetime.now().isoformat(),
+        "events": event_names,
+        "eventMultiplier": event_multiplier,
+        # This row's largest contributions to predictedVolume, from the volume
+        # forest's own paths; an empty list for /predict?explain=false
+        "factors": factors
+    }
+    if band is not None:
+        prediction["volumeInterval"] = interval_dict(band)
+    return prediction
+
+def predict_one(request: PredictionRequest, version: str = None, intervals: bool = False, explain: bool = True):
+    """Single-barangay prediction scored on its own, optionally with volume bands and factors"""
+    models = models_for(version) if version else MODELS
+    features_list, event_flags = calculate_features(request)
+    features = np.array([features_list])
+    
+    log(logging.DEBUG, "features", barangay=request.barangay_name,
+        historical_kg=get_historical_waste(request.barangay_name), with_events_kg=features_list[1],
+        event_multiplier=event_flags['event_multiplier'], events=event_flags['event_names'])
+    
+    scored = score_feature_matrix(features, models, intervals)
+    volumes, risk_probas, risk_classes = scored[:3]
+    factors = []
+    if explain:
+        _, contributions = forest_contributions(models.volume_model, features)
+        factors = top_factors(contributions[0, :, 0], features[0])
+    return single_prediction(request, models, float(volumes[0]), risk_probas[0], risk_classes[0],
+                             event_flags['event_multiplier'], event_flags['event_names'], factors,
+                             scored[3][0] if intervals else None)
+
+def predict_many(items):
+    """
+    /predict responses for (version, request, explain) items coalesced by
+    the micro-batcher, scored in one model pass per model version; factors
+    are traced only for the rows that asked for them. If a pass fails, its
+    rows are retried one by one and a failing row's slot holds its
+    exception.
+    """
+    results = [None] * len(items)
+    by_version = {}
+    for j, (version, _, _) in enumerate(items):
+        by_version.setdefault(version, []).append(j)
     
+    for version, rows in by_version.items():
+        requests = [items[j][1] for j in rows]
+        explained = [k for k, j in enumerate(rows) if items[j][2]]
+        try:
+            models = models_for(version)
+            X, multipliers, event_names = calculate_features_batch(requests)
+            volumes, risk_probas, risk_classes = score_feature_matrix(X, models)
+            factors = [[] for _ in rows]
+            if explained:
+                _, contributions = forest_contributions(models.volume_model, X[explained])
+                for i, k in enumerate(explained):
+                    factors[k] = top_factors(contributions[i, :, 0], X[k])
+        except Exception:
+            for j, request in zip(rows, requests):
+                try:
+                    results[j] = predict_one(request, version, explain=items[j][2])
+                except Exception as e:
+                    results[j] = e
+            continue
+        
+        for k, (j, request) in enumerate(zip(rows, requests)):
+            results[j] = single_prediction(request, models, float(volumes[k]), risk_probas[k], risk_classes[k],
+                                           float(multipliers[k]), event_names[k], factors[k])
+    return results
+
+# Concurrent /predict calls arriving within PREDICT_BATCH_WINDOW_MS of each
+# other (up to PREDICT_MAX_BATCH) are scored together; a window of 0 disables it
+PREDICT_BATCHER = MicroBatcher(
+    predict_many, run_inference,
+    max_batch=int(os.environ.get('PREDICT_MAX_BATCH', '64')),
+    window_ms=float(os.environ.get('PREDICT_BATCH_WINDOW_MS', '3')),
+)
+
+@app.post("/predict")
+async def predict_single(request: PredictionRequest, uncertainty: bool = False, explain: bool = True):
+    """
+    One barangay's prediction; ?uncertainty=true adds volume bands. "factors"
+    holds the top four traced contributions unless ?explain=false, which
+    skips the trace and returns an empty list.
+    """
+    models = MODELS
+    if not models.loaded:
+        raise HTTPException(status_code=500, detail="ML models not loaded")
+    
+    try:
+        if uncertainty:
+            prediction = await run_inference(predict_one, request, models.version, True, explain)
+        elif PREDICT_BATCHER.window_ms > 0:
+            prediction = await PREDICT_BATCHER.submit((models.version, request, explain))
+        else:
+            prediction = await run_inference(predict_one, request, models.version, False, explain)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log(logging.ERROR, "prediction_error", barangay=request.barangay_name, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    
+    log(logging.INFO, "prediction", barangay=request.barangay_name, volume_kg=round(prediction['predictedVolume']),
+        risk=prediction['overflowRisk'], confidence=round(prediction['confidence'], 3))
+    return prediction
+
+# ============================================================================
+# FEATURE ATTRIBUTION: WHY EACH BARANGAY GOT ITS PREDICTION
+# ============================================================================
+# Both forests' outputs split into a base value plus one contribution per
+# model feature (see feature_attribution.py), for a whole batch in one walk
+# of each forest. They explain the models' own outputs, before the
+# /predict-batch override rules.
+def explain_batch(barangays: List[PredictionRequest], version: str = None):
+    """Per-barangay volume and risk attributions for a batch"""
+    models = models_for(version) if version else MODELS
+    if not barangays:
+        return []
+    X, _, _ = calculate_features_batch(barangays)
+    volume_bias, volume_contributions = forest_contributions(models.volume_model, X)
+    risk_bias, risk_contributions = forest_contributions(models.risk_model, X)
+    # Base plus contributions is the models' output, so no separate scoring pass
+    volumes = volume_bias[0] + volume_contributions[:, :, 0].sum(axis=1)
+    risk_proba = risk_bias + risk_contributions.sum(axis=1)
+    risk_index = np.argmax(risk_proba, axis=1)
+    risk_classes = models.risk_model.classes_.take(risk_index)
+    return [{
+        "barangayId": barangay.barangay_id,
+        "barangayName": barangay.barangay_name,
+        "predictedVolume": float(volumes[j]),
+        "modelRisk": str(RISK_LEVELS[risk_classes[j]]) if risk_classes[j] in (0, 1, 2) else 'moderate',
+        "modelRiskProbability": float(risk_proba[j, risk_index[j]]),
+        **explanation(volume_bias[0], volume_contributions[j, :, 0], risk_bias, risk_contributions[j],
+                      int(risk_index[j]), X[j]),
+    } for j, barangay in enumerate(barangays)]
+
+@app.post("/explain-batch")
+async def explain_batch_endpoint(request: BatchPredictionRequest):
+    start = time.perf_counter()
+    models = MODELS
+    if not models.loaded:
+        raise HTTPException(status_code=500, detail="ML models not loaded")
+    explanations = await run_inference(explain_batch, request.barangays, models.version)
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    log(logging.INFO, "explain_batch", barangays=len(explanations), duration_ms=elapsed_ms)
+    return {
+        "modelVersion": models.version,
+        "explanations": explanations,
+    }
+
+# ============================================================================
+# CONDITIONAL REQUESTS
+# ============================================================================
+# Responses that only change with the models (and, for predictions, the event
+# calendar and the request body) carry a weak ETag and "Cache-Control:
+# no-cache", so clients revalidate every time. A matching If-None-Match is
+# answered 304 without scoring; /predict-batch and /forecast-range honour it
+# too, since the same request body means the same forecast.
+CACHE_CONTROL = 'no-cache'
+
+def cache_headers(etag: str) -> dict:
+    return {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+
+def not_modified(etag: str, if_none_match: str = None):
+    """A 304 response when the client already holds `etag`, else None"""
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+def batch_metrics(models: ModelSet):
     # Your REAL metrics from training (R²: 0.966, Accuracy: 81.2%)
-    metrics_data = {
+    return {
         'r2': 0.966,          # Your actual R² score
         'mse': 1376680.44,    # Your actual MSE
         'accuracy': 0.812,    # Your actual accuracy (81.2%)
@@ -568,15 +830,35 @@ async def predict_batch(request: BatchPredictionRequest):
             'month': 0.195
         },
         'featuresUsed': 14,
-        'modelVersion': '3.0'
+        'modelVersion': models.version
     }
+
+@app.post("/predict-batch")
+async def predict_batch(request: BatchPredictionRequest, http_request: Request, response: Response,
+                        uncertainty: bool = False, accept: str = Header(None), if_none_match: str = Header(None)):
+    start = time.perf_counter()
+    models = MODELS
+    # Rows without a prediction_date are scored for today
+    etag = weak_etag('predict-batch', forecast_cube_version(models), datetime.now().date(), wants_ndjson(accept),
+                     uncertainty, await http_request.body())
+    cached = not_modified(etag, if_none_match)
+    if cached is not None:
+        return cached
+    if wants_ndjson(accept):
+        return stream_ndjson(batch_chunks(request.barangays, models, uncertainty), "batch_prediction",
+                             {'modelVersion': models.version, 'metrics': batch_metrics(models)}, etag)
+    response.headers.update(cache_headers(etag))
     
-    print(f"\n" + "="*60)
-    print(f"📤 Sending {len(predictions)} predictions with REAL METRICS")
-    print(f"📊 Model Performance:")
-    print(f"   R² Score: {metrics_data['r2']:.3f} (96.6% variance explained)")
-    print(f"   MSE: {metrics_data['mse']:,.0f}")
-    print(f"   Accuracy: {metrics_data['accuracy']:.3f} ({metrics_data['accuracy']*100:.1f}%)")
+    predictions, X, multipliers = await run_inference(score_batch, request.barangays, models.version, True, 0,
+                                                      uncertainty)
+    if SHADOW.active:
+        shadow_batch(request.barangays, predictions, X, multipliers, time.perf_counter() - start)
+    
+    # ============================================================================
+    # NEW: ADD VOLUME RISK CATEGORIES AND REAL METRICS
+    # ============================================================================
+    predictions = calculate_volume_risk_categories(predictions)
+    metrics_data = batch_metrics(models)
     
     # Count final risk distribution
     risk_counts = {}
@@ -584,36 +866,1033 @@ async def predict_batch(request: BatchPredictionRequest):
         risk = pred.get('overflowRisk', 'moderate')
         risk_counts[risk] = risk_counts.get(risk, 0) + 1
     
-    print(f"📊 Risk Distribution: {risk_counts}")
-    print("="*60)
+    log(logging.INFO, "batch_prediction", barangays=len(predictions), risk_distribution=risk_counts,
+        scoring_ms=round((time.perf_counter() - start) * 1000, 2))
     
     return {
         "predictions": predictions,
         "metrics": metrics_data  # Send real metrics to frontend!
     }
 
+# ============================================================================
+# STREAMING (NDJSON) /predict-batch AND /forecast-range
+# ============================================================================
+# With "Accept: application/x-ndjson" both endpoints score in chunks of about
+# STREAM_CHUNK_ROWS rows and send one JSON prediction per line as each chunk
+# finishes, followed by one {"summary": {...}} line with the row count, risk
+# distributions and (for /predict-batch) the metrics. The next chunk is
+# scored while the current one is sent, so at most two chunks are held at a
+# time. The status is sent before scoring starts: a failure part-way ends
+# the stream with "complete": false and the error in the summary.
+NDJSON = 'application/x-ndjson'
+STREAM_CHUNK_ROWS = max(1, int(os.environ.get('STREAM_CHUNK_ROWS', '2000')))
+
+def wants_ndjson(accept: str = None) -> bool:
+    return NDJSON in (accept or '').lower()
+
+def ndjson_line(record) -> str:
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+async def ndjson_records(chunks, event: str, summary: dict):
+    """
+    NDJSON lines for the prediction lists the `chunks` coroutines return,
+    then the summary line. Chunk k+1 is started before chunk k is sent.
+    """
+    start = time.perf_counter()
+    risk_counts, volume_counts, rows = {}, {}, 0
+    chunks = iter(chunks)
+    
+    def start_next():
+        chunk = next(chunks, None)
+        return asyncio.ensure_future(chunk) if chunk is not None else None
+    
+    pending = start_next()
+    try:
+        while pending is not None:
+            predictions = await pending
+            pending = start_next()
+            calculate_volume_risk_categories(predictions, log_summary=False)
+            for pred in predictions:
+                risk = pred.get('overflowRisk', 'moderate')
+                risk_counts[risk] = risk_counts.get(risk, 0) + 1
+                volume_risk = pred['volumeRisk']['volume_risk']
+                volume_counts[volume_risk] = volume_counts.get(volume_risk, 0) + 1
+            rows += len(predictions)
+            yield ''.join(ndjson_line(pred) for pred in predictions)
+        summary['complete'] = True
+    except Exception as e:
+        summary.update(complete=False, error=e.detail if isinstance(e, HTTPException) else str(e))
+        log(logging.WARNING, "stream_error", stream=event, rows=rows, error=summary['error'])
+    finally:
+        if pending is not None:
+            pending.cancel()
+    
+    duration_ms = round((time.perf_counter() - start) * 1000, 2)
+    log(logging.INFO, event, barangays=rows, risk_distribution=risk_counts, streamed=True, scoring_ms=duration_ms)
+    yield ndjson_line({'summary': {
+        **summary,
+        'rows': rows,
+        'riskDistribution': risk_counts,
+        'volumeRiskDistribution': volume_counts,
+        'durationMs': duration_ms,
+    }})
+
+def stream_ndjson(chunks, event: str, summary: dict, etag: str = None) -> StreamingResponse:
+    return StreamingResponse(ndjson_records(chunks, event, summary), media_type=NDJSON,
+                             headers=cache_headers(etag) if etag else None)
+
+async def score_batch_chunk(barangays: List[PredictionRequest], version: str, offset: int, intervals: bool):
+    start = time.perf_counter()
+    predictions, X, multipliers = await run_inference(score_batch, barangays, version, True, offset, intervals)
+    if SHADOW.active:
+        shadow_batch(barangays, predictions, X, multipliers, time.perf_counter() - start, offset)
+    return predictions
+
+def batch_chunks(barangays: List[PredictionRequest], models: ModelSet, intervals: bool = False):
+    for offset in range(0, len(barangays), STREAM_CHUNK_ROWS):
+        yield score_batch_chunk(barangays[offset:offset + STREAM_CHUNK_ROWS], models.version, offset, intervals)
+
+# ============================================================================
+# COLUMNAR /predict-batch: ONE ARRAY PER FIELD IN, ONE ARRAY PER OUTPUT OUT
+# ============================================================================
+# For large batches, building a Pydantic model and a response dict per
+# barangay costs more than scoring. The columnar variant validates whole
+# columns and answers:
+#   {"modelVersion", "timestamp", "count", "riskLevels", "volumeRiskLevels",
+#    "columns": {barangayId, predictedVolume, overflowRisk (index into
+#    riskLevels, -1 for failed rows), confidence, eventMultiplier,
+#    volumeRiskLevel (1..3, 0 for failed rows), eventRows + eventNames (rows
+#    with events only), errorRows + errorMessages, and with ?uncertainty=true
+#    volumeP10, volumeP50, volumeP90 and volumeStd}}
+# Encodings are negotiated through Content-Type / Accept (see columnar.py).
+BATCH_COLUMNS = columnar.model_fields(PredictionRequest)
+
+def predict_columnar(body: bytes, content_type: str, media_type: str, version: str = None, intervals: bool = False):
+    """Decode, score and encode one columnar batch inside an inference worker; returns (body, rows)"""
+    models = models_for(version) if version else MODELS
+    n, columns = columnar.normalize_columns(columnar.decode_columns(body, content_type), BATCH_COLUMNS)
+    names = columns['barangay_name']
+    X, multipliers, event_names = calculate_features_columns(
+        names, columns['population'], columns['rainfall_mm'], columns['temperature_c'],
+        columns['is_market_day'], columns['day_of_week'], columns['prediction_date'])
+    volumes, risk_proba, risk_classes, bands, errors = score_rows(X, models, names, intervals)
+    risk, confidence = apply_risk_overrides(volumes, risk_proba, risk_classes, multipliers, np.arange(n))
+    
+    risk = risk.astype(np.int8)
+    volume_levels = volume_risk_levels(volumes)
+    error_rows = np.array(sorted(errors), dtype=np.int32)
+    volumes[error_rows], risk[error_rows], confidence[error_rows], volume_levels[error_rows] = 0, -1, 0, 0
+    event_rows = np.array([j for j, names_j in enumerate(event_names) if names_j], dtype=np.int32)
+    band_columns = {}
+    if bands is not None:
+        bands[error_rows] = 0
+        band_columns = {f"volume{field.capitalize()}": np.ascontiguousarray(bands[:, k])
+                        for k, field in enumerate(INTERVAL_FIELDS)}
+    
+    content = columnar.encode_columns({
+        'barangayId': columns['barangay_id'],
+        'predictedVolume': volumes,
+        'overflowRisk': risk,
+        'confidence': confidence,
+        'eventMultiplier': np.asarray(multipliers, dtype=np.float64),
+        'volumeRiskLevel': volume_levels,
+        'eventRows': event_rows,
+        'eventNames': [event_names[j] for j in event_rows.tolist()],
+        'errorRows': error_rows,
+        'errorMessages': [errors[j] for j in error_rows.tolist()],
+        **band_columns,
+    }, {
+        'modelVersion': models.version,
+        'timestamp': datetime.now().isoformat(),
+        'count': n,
+        'riskLevels': RISK_LEVELS.tolist(),
+        'volumeRiskLevels': VOLUME_RISK_LEVELS,
+    }, media_type)
+    return content, n
+
+@app.post("/predict-batch/columnar")
+async def predict_batch_columnar(request: Request, uncertainty: bool = False):
+    start = time.perf_counter()
+    media_type = columnar.negotiate(request.headers.get('accept'))
+    if media_type is None:
+        raise HTTPException(status_code=406,
+                            detail=f"Supported response types: {', '.join(columnar.supported_media_types())}")
+    models = MODELS
+    if not models.loaded:
+        raise HTTPException(status_code=500, detail="ML models not loaded")
+    body = await request.body()
+    try:
+        content, rows = await run_inference(predict_columnar, body, request.headers.get('content-type'),
+                                            media_type, models.version, uncertainty)
+    except columnar.UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    log(logging.INFO, "batch_prediction", barangays=rows, format=media_type, bytes=len(content),
+        scoring_ms=round((time.perf_counter() - start) * 1000, 2))
+    return Response(content=content, media_type=media_type)
+
+# ============================================================================
+# MULTI-DAY FORECAST: ONE (DAYS x BARANGAYS x 14) TENSOR, ONE MODEL PASS
+# ============================================================================
+MAX_FORECAST_DAYS = 366
+# Market days as sent by the app (JavaScript getDay: 0=Sunday ... 6=Saturday)
+MARKET_DAYS_OF_WEEK = [2, 5, 6]
+
+def forecast_dates(start_date: str = None, end_date: str = None, days: int = 7):
+    """Inclusive datetime64[D] range; start defaults to tomorrow"""
+    if start_date:
+        start = np.datetime64(start_date, 'D')
+    else:
+        start = np.datetime64(datetime.now().date(), 'D') + 1
+    if not end_date and days < 1:
+        raise ValueError("days must be at least 1")
+    end = np.datetime64(end_date, 'D') if end_date else start + days - 1
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).astype(int) + 1 > MAX_FORECAST_DAYS:
+        raise ValueError(f"Forecast range is limited to {MAX_FORECAST_DAYS} days")
+    return np.arange(start, end + 1, dtype='datetime64[D]')
+
+def build_forecast_tensor(dates, barangays: List[ForecastBarangay], rainfall, temperature):
+    """
+    Build the (days x barangays x 14) feature tensor for a forecast range in
+    the same feature order and conventions as calculate_features. rainfall and
+    temperature are per-day arrays. Returns the tensor plus per-cell event
+    multipliers and event names.
+    """
+    n_days, n_barangays = len(dates), len(barangays)
+    
+    months = dates.astype('datetime64[M]')
+    month = (months.astype(np.int64) % 12 + 1).astype(np.float64)
+    day_of_month = ((dates - months).astype(np.int64) + 1).astype(np.float64)
+    # 1970-01-01 was a Thursday; convert to the app's Sunday=0 convention
+    day_of_week = ((dates.astype(np.int64) + 4) % 7).astype(np.float64)
+    
+    population = np.array([b.population for b in barangays], dtype=np.float64)
+    historical = np.array([get_historical_waste(b.barangay_name) for b in barangays], dtype=np.float64)
+    historical = np.where(historical == 0, population * 0.42, historical)
+    has_market = np.array([b.has_market for b in barangays], dtype=bool)
+    
+    event_flags = EVENT_CALENDAR.lookup(dates[:, None], [b.barangay_name for b in barangays])
+    multipliers = event_flags['event_multiplier']
+    
+    def per_day(values):
+        return np.broadcast_to(np.asarray(values, dtype=np.float64)[:, None], (n_days, n_barangays))
+    
+    X = np.empty((n_days, n_barangays, 14), dtype=np.float64)
+    X[:, :, 0] = population[None, :]
+    X[:, :, 1] = historical[None, :] * multipliers
+    X[:, :, 2] = per_day(rainfall)
+    X[:, :, 3] = per_day(temperature)
+    X[:, :, 4] = per_day(day_of_week)
+    X[:, :, 5] = per_day(month)
+    X[:, :, 6] = per_day(day_of_month)
+    X[:, :, 7] = per_day(day_of_week >= 5)
+    X[:, :, 8] = np.isin(day_of_week, MARKET_DAYS_OF_WEEK)[:, None] & has_market[None, :]
+    X[:, :, 9] = event_flags['is_fiesta']
+    X[:, :, 10] = event_flags['is_holiday']
+    X[:, :, 11] = per_day(np.isin(day_of_month, [15, 30]))
+    X[:, :, 12] = per_day((month >= 6) & (month <= 10))
+    X[:, :, 13] = per_day((month >= 3) & (month <= 5))
+    
+    return X, multipliers, event_flags['event_names']
+
+DEFAULT_WEATHER = DailyWeather(date="")
+
+def default_weather(dates):
+    """Per-day rainfall and temperature lists for days with no weather given"""
+    return [DEFAULT_WEATHER.rainfall_mm] * len(dates), [DEFAULT_WEATHER.temperature_c] * len(dates)
+
+def request_weather(request: ForecastRangeRequest, date_strings):
+    """Per-day rainfall and temperature lists; days not listed use the defaults"""
+    weather = {w.date: w for w in request.weather}
+    rainfall = [weather.get(d, DEFAULT_WEATHER).rainfall_mm for d in date_strings]
+    temperature = [weather.get(d, DEFAULT_WEATHER).temperature_c for d in date_strings]
+    return rainfall, temperature
+
+def forecast_rows(models: ModelSet, date_strings, barangays, volumes, risk_proba, multipliers, event_names):
+    """
+    Apply the override rules to flattened (days x barangays) model outputs
+    and build the per-date response rows
+    """
+    n_days, n_barangays = len(date_strings), len(barangays)
+    risk_classes = models.risk_model.classes_.take(np.argmax(risk_proba, axis=1))
+    # Positions restart every day, matching one /predict-batch call per day
+    positions = np.tile(np.arange(n_barangays), n_days)
+    risk, confidence = apply_risk_overrides(
+        volumes, risk_proba, risk_classes, np.asarray(multipliers).ravel(), positions
+    )
+    
+    risk_labels = RISK_LEVELS[risk].reshape(n_days, n_barangays).tolist()
+    volumes = volumes.reshape(n_days, n_barangays).tolist()
+    confidence = confidence.reshape(n_days, n_barangays).tolist()
+    multipliers = np.asarray(multipliers).tolist()
+    model_version = models.version
+    timestamp = datetime.now().isoformat()
+    
+    forecasts = {}
+    for d, date in enumerate(date_strings):
+        forecasts[date] = [{
+            "barangayId": barangay.barangay_id,
+            "barangayName": barangay.barangay_name,
+            "date": date,
+            "predictedVolume": volumes[d][b],
+            "overflowRisk": risk_labels[d][b],
+            "confidence": confidence[d][b],
+            "modelVersion": model_version,
+            "timestamp": timestamp,
+            "events": event_names[d][b],
+            "eventMultiplier": multipliers[d][b]
+        } for b, barangay in enumerate(barangays)]
+    
+    return forecasts
+
+def score_forecast_range(request: ForecastRangeRequest, version: str = None):
+    """Score every (day, barangay) cell in one pass; results keyed by ISO date"""
+    models = models_for(version) if version else MODELS
+    dates = forecast_dates(request.start_date, request.end_date, request.days)
+    date_strings = dates.astype(str).tolist()
+    rainfall, temperature = request_weather(request, date_strings)
+    
+    X, multipliers, event_names = build_forecast_tensor(dates, request.barangays, rainfall, temperature)
+    volumes, risk_proba, _ = score_feature_matrix(X.reshape(-1, 14), models)
+    return forecast_rows(models, date_strings, request.barangays, volumes, risk_proba, multipliers, event_names)
+
+# ============================================================================
+# FORECAST CUBE: THE NEXT N DAYS UNDER DEFAULT WEATHER, PRECOMPUTED
+# ============================================================================
+# Configured by FORECAST_CUBE_DAYS, FORECAST_CUBE_REFRESH_S and
+# FORECAST_CUBE_PATH. FORECAST_CUBE_ROSTER may name a JSON list of
+# ForecastBarangay objects; by default the roster is every barangay in
+# BARANGAY_TABLE with its census population, flagged has_market when
+# cdo_events.json lists it as a market barangay. Only requests whose
+# barangays match a roster entry exactly (name, population, has_market)
+# and that send no weather are answered from the cube.
+FORECAST_CUBE = ForecastCubeStore.from_env()
+
+def forecast_cube_roster() -> List[ForecastBarangay]:
+    roster_file = os.environ.get('FORECAST_CUBE_ROSTER')
+    if roster_file:
+        with open(roster_file, 'r') as f:
+            return [ForecastBarangay(**b) for b in json.load(f)]
+    names = BARANGAY_TABLE.names
+    return [
+        ForecastBarangay(barangay_id=str(i), barangay_name=name, population=population, has_market=market)
+        for i, (name, population, market) in enumerate(zip(
+            names, BARANGAY_TABLE.population.tolist(), EVENT_CALENDAR.has_market(names)))
+    ]
+
+def roster_keys(roster: List[ForecastBarangay]) -> list:
+    return [roster_key(b.barangay_name, b.population, b.has_market) for b in roster]
+
+def forecast_cube_version(models: ModelSet) -> str:
+    """Model fingerprint plus the events file mtime; either changing stales the cube"""
+    events_mtime = os.stat(EVENTS_FILE).st_mtime_ns if os.path.exists(EVENTS_FILE) else '-'
+    return f"{models.fingerprint}:{events_mtime}"
+
+def build_forecast_cube(days: int, roster: List[ForecastBarangay], version: str = None) -> ForecastCube:
+    """Score the next `days` days for `roster` under default weather"""
+    models = models_for(version) if version else MODELS
+    dates = forecast_dates(days=days)
+    rainfall, temperature = default_weather(dates)
+    X, multipliers, event_names = build_forecast_tensor(dates, roster, rainfall, temperature)
+    volumes, risk_proba, _ = score_feature_matrix(X.reshape(-1, 14), models)
+    n_days, n_barangays = X.shape[:2]
+    return ForecastCube(
+        dates=dates,
+        roster=[(b.barangay_name, b.population, b.has_market) for b in roster],
+        volumes=volumes.reshape(n_days, n_barangays),
+        risk_proba=risk_proba.reshape(n_days, n_barangays, -1),
+        multipliers=multipliers,
+        event_names=event_names,
+        version=forecast_cube_version(models),
+    )
+
+FORECAST_CUBE_LOCK = asyncio.Lock()
+
+async def refresh_forecast_cube():
+    """Load or rebuild the cube unless it already starts tomorrow with the current models"""
+    async with FORECAST_CUBE_LOCK:  # One build at a time; a queued refresh sees the result
+        models = MODELS
+        start = forecast_dates(days=1)[0]
+        version = forecast_cube_version(models)
+        if FORECAST_CUBE.is_current(FORECAST_CUBE.cube, start, version):
+            return
+        roster = forecast_cube_roster()
+        cube = FORECAST_CUBE.load(start, version)
+        if cube is not None and cube.roster == roster_keys(roster):
+            FORECAST_CUBE.install(cube, persist=False)
+            log(logging.INFO, "forecast_cube_loaded", start_date=str(start), path=FORECAST_CUBE.path)
+            return
+        
+        build_start = time.perf_counter()
+        cube = await INFERENCE_POOL.run(build_forecast_cube, FORECAST_CUBE.days, roster, models.version)
+        build_ms = (time.perf_counter() - build_start) * 1000
+        if models is not MODELS:
+            return  # Swapped mid-build; the swap queued a refresh for the new models
+        FORECAST_CUBE.install(cube, build_ms)
+        log(logging.INFO, "forecast_cube_built", start_date=str(start), days=len(cube.dates),
+            barangays=len(cube.roster), build_ms=round(build_ms, 2))
+
+async def forecast_cube_loop():
+    while True:
+        try:
+            await refresh_forecast_cube()
+        except Exception as e:
+            log(logging.WARNING, "forecast_cube_error", error=str(e))
+        await asyncio.sleep(FORECAST_CUBE.refresh_s)
+
+@app.on_event("startup")
+async def start_forecast_cube():
+    if FORECAST_CUBE.enabled and MODELS.loaded:
+        app.state.forecast_cube_task = asyncio.create_task(forecast_cube_loop())
+
+@app.on_event("shutdown")
+def stop_forecast_cube():
+    task = getattr(app.state, 'forecast_cube_task', None)
+    if task is not None:
+        task.cancel()
+
+def forecast_from_cube(request: ForecastRangeRequest, models: ModelSet = None):
+    """
+    Answer a /forecast-range request from the cube by slicing, or None when
+    it asks for custom weather, for cells the cube does not hold, or was
+    scored with other models than `models` (a swap is rebuilding it)
+    """
+    models = models or MODELS
+    cube = FORECAST_CUBE.cube
+    if not FORECAST_CUBE.enabled or cube is None:
+        return None
+    if cube.version != forecast_cube_version(models):
+        FORECAST_CUBE.misses += 1
+        return None
+    dates = forecast_dates(request.start_date, request.end_date, request.days)
+    date_strings = dates.astype(str).tolist()
+    if request_weather(request, date_strings) != default_weather(date_strings):
+        FORECAST_CUBE.misses += 1
+        return None
+    cells = FORECAST_CUBE.lookup(dates, request.barangays)
+    if cells is None:
+        return None
+    volumes, risk_proba, multipliers, event_names = cells
+    return forecast_rows(models, date_strings, request.barangays, volumes, risk_proba, multipliers, event_names)
+
+async def forecast_chunk(request: ForecastRangeRequest, models: ModelSet):
+    forecasts = forecast_from_cube(request, models)
+    if forecasts is None:
+        forecasts = await run_inference(score_forecast_range, request, models.version)
+    return [p for day in forecasts.values() for p in day]
+
+def forecast_chunks(request: ForecastRangeRequest, date_strings, models: ModelSet):
+    """Whole days per chunk (override positions restart daily), about STREAM_CHUNK_ROWS cells each"""
+    days_per_chunk = max(1, STREAM_CHUNK_ROWS // max(1, len(request.barangays)))
+    for first in range(0, len(date_strings), days_per_chunk):
+        block = date_strings[first:first + days_per_chunk]
+        yield forecast_chunk(request.model_copy(update={'start_date': block[0], 'end_date': block[-1]}), models)
+
+@app.post("/forecast-range")
+async def forecast_range(request: ForecastRangeRequest, http_request: Request, response: Response,
+                         accept: str = Header(None), if_none_match: str = Header(None)):
+    models = MODELS
+    if not models.loaded:
+        raise HTTPException(status_code=500, detail="ML models not loaded")
+    try:
+        if not request.barangays:
+            raise ValueError("No barangays to forecast")
+        date_strings = forecast_dates(request.start_date, request.end_date, request.days).astype(str).tolist()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Stable until the models, the event calendar or the request (incl. weather) change;
+    # the resolved dates cover requests that default to "from tomorrow"
+    etag = weak_etag('forecast-range', forecast_cube_version(models), date_strings[0], date_strings[-1],
+                     wants_ndjson(accept), await http_request.body())
+    cached = not_modified(etag, if_none_match)
+    if cached is not None:
+        return cached
+    
+    if wants_ndjson(accept):
+        return stream_ndjson(forecast_chunks(request, date_strings, models), "forecast_range", {
+            'startDate': date_strings[0],
+            'endDate': date_strings[-1],
+            'days': len(date_strings),
+            'barangays': len(request.barangays),
+            'modelVersion': models.version,
+        }, etag)
+    response.headers.update(cache_headers(etag))
+    
+    try:
+        forecasts = forecast_from_cube(request, models)
+        if forecasts is None:
+            forecasts = await run_inference(score_forecast_range, request, models.version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    calculate_volume_risk_categories([p for day in forecasts.values() for p in day])
+    
+    dates = list(forecasts)
+    log(logging.INFO, "forecast_range", start_date=dates[0], end_date=dates[-1],
+        days=len(dates), barangays=len(request.barangays))
+    
+    return {
+        "startDate": dates[0],
+        "endDate": dates[-1],
+        "days": len(dates),
+        "modelVersion": models.version,
+        "forecasts": forecasts
+    }
+
+# ============================================================================
+# SCENARIO SWEEP: WHAT-IF SURFACES OVER WEATHER AND EVENT GRIDS
+# ============================================================================
+# Every combination of the swept values (a grid cell) is scored for every
+# barangay of the roster on one date, and each cell is reduced to a few
+# numbers: total tonnage, mean and peak volume, and the share of barangays
+# per overflow risk (after the /predict-batch override rules) and per
+# volume level. Events are grid axes here rather than calendar lookups:
+# a festival, holiday or market day scales historical waste by its
+# multiplier, which defaults to the largest one in cdo_events.json.
+# Weather values the forests cannot tell apart (no split threshold between
+# them) are scored once; see scenario_sweep.py.
+# Blocks of whole cells (about SCENARIO_CHUNK_ROWS rows each) are spread
+# over the inference pool, one block per worker at a time, so memory stays
+# bounded for grids of millions of rows. Grids are capped at
+# SCENARIO_MAX_ROWS rows and SCENARIO_MAX_CELLS cells.
+SCENARIO_CHUNK_ROWS = max(1, int(os.environ.get('SCENARIO_CHUNK_ROWS', '50000')))
+SCENARIO_MAX_ROWS = int(os.environ.get('SCENARIO_MAX_ROWS', '5000000'))
+SCENARIO_MAX_CELLS = int(os.environ.get('SCENARIO_MAX_CELLS', '100000'))
+SCENARIO_AXES = ['rainfall_mm', 'temperature_c', 'is_fiesta', 'is_holiday', 'is_market_day']
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float   # Inclusive
+    step: float
+
+class ScenarioSweepRequest(BaseModel):
+    barangays: List[ForecastBarangay] = None  # Defaults to the forecast cube roster
+    date: str = None                          # Defaults to tomorrow
+    rainfall_mm: Union[SweepRange, List[float]] = [0]
+    temperature_c: Union[SweepRange, List[float]] = [28]
+    is_fiesta: List[int] = [0]
+    is_holiday: List[int] = [0]
+    is_market_day: List[int] = [0]
+    fiesta_multiplier: float = None
+    holiday_multiplier: float = None
+    market_multiplier: float = None
+
+def largest_event_multiplier(event_type: str) -> float:
+    multipliers = [e.get('waste_multiplier', 1.0) for e in EVENT_CALENDAR.data.get('events', [])
+                   if e.get('type') == event_type]
+    return max(multipliers, default=1.0)
+
+def scenario_multipliers(request: ScenarioSweepRequest):
+    """(fiesta, holiday, market day) waste multipliers, defaulting to the event calendar's"""
+    return (
+        request.fiesta_multiplier or largest_event_multiplier('festival'),
+        request.holiday_multiplier or largest_event_multiplier('holiday'),
+        request.market_multiplier or EVENT_CALENDAR.data.get('weekly_patterns', {})
+                                                      .get('market_days', {}).get('multiplier', 1.0),
+    )
+
+def scenario_grid(request: ScenarioSweepRequest) -> ScenarioGrid:
+    axes = {}
+    for name in SCENARIO_AXES:
+        spec = getattr(request, name)
+        axes[name] = spec.model_dump() if isinstance(spec, BaseModel) else spec
+    return ScenarioGrid(axes, len(request.barangays))
+
+def distinct_scenarios(grid: ScenarioGrid, models: ModelSet):
+    """grid.collapse() to the weather values the models can tell apart and the on/off event flags"""
+    models_used = [models.volume_model, models.risk_model]
+    return grid.collapse({
+        'rainfall_mm': threshold_bins(grid.axes['rainfall_mm'], split_thresholds(models_used, 2)),
+        'temperature_c': threshold_bins(grid.axes['temperature_c'], split_thresholds(models_used, 3)),
+        'is_fiesta': grid.axes['is_fiesta'] != 0,
+        'is_holiday': grid.axes['is_holiday'] != 0,
+        'is_market_day': grid.axes['is_market_day'] != 0,
+    })
+
+def score_scenario_cells(request: ScenarioSweepRequest, grid: ScenarioGrid, date_string: str, version: str,
+                         first: int, count: int):
+    """Per-cell aggregates for cells [first, first + count) of `grid` over the request's roster"""
+    models = models_for(version) if version else MODELS
+    barangays = request.barangays
+    n_barangays = len(barangays)
+    date = np.datetime64(date_string, 'D')
+    month = date.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    day_of_month = (date - date.astype('datetime64[M]')).astype(np.int64) + 1
+    day_of_week = (date.astype(np.int64) + 4) % 7  # The app's Sunday=0 convention
+    
+    population = np.array([b.population for b in barangays], dtype=np.float64)
+    historical = np.array([get_historical_waste(b.barangay_name) for b in barangays], dtype=np.float64)
+    historical = np.where(historical == 0, population * 0.42, historical)
+    
+    cells = grid.cell_values(first, count)
+    fiesta_multiplier, holiday_multiplier, market_multiplier = scenario_multipliers(request)
+    multipliers = (np.where(cells['is_fiesta'] != 0, fiesta_multiplier, 1.0)
+                   * np.where(cells['is_holiday'] != 0, holiday_multiplier, 1.0)
+                   * np.where(cells['is_market_day'] != 0, market_multiplier, 1.0))
+    
+    def per_cell(values):
+        return np.repeat(values, n_barangays)
+    
+    X = np.empty((count * n_barangays, 14), dtype=np.float64)
+    X[:, 0] = np.tile(population, count)
+    X[:, 1] = np.tile(historical, count) * per_cell(multipliers)
+    X[:, 2] = per_cell(cells['rainfall_mm'])
+    X[:, 3] = per_cell(cells['temperature_c'])
+    X[:, 4] = day_of_week
+    X[:, 5] = month
+    X[:, 6] = day_of_month
+    X[:, 7] = day_of_week >= 5
+    X[:, 8] = per_cell(cells['is_market_day'] != 0)
+    X[:, 9] = per_cell(cells['is_fiesta'] != 0)
+    X[:, 10] = per_cell(cells['is_holiday'] != 0)
+    X[:, 11] = day_of_month in (15, 30)
+    X[:, 12] = 6 <= month <= 10
+    X[:, 13] = 3 <= month <= 5
+    
+    # Straight to the models: sweep rows would only flush the prediction cache
+    volumes = models.volume_model.predict(X).astype(np.float64)
+    risk_proba = models.risk_model.predict_proba(X)
+    risk_classes = models.risk_model.classes_.take(np.argmax(risk_proba, axis=1))
+    # Positions are roster positions, as if each cell were one /predict-batch call
+    risk, _ = apply_risk_overrides(volumes, risk_proba, risk_classes, per_cell(multipliers),
+                                   np.tile(np.arange(n_barangays), count))
+    return first, cell_aggregates(volumes, risk, volume_risk_levels(volumes), count, n_barangays)
+
+async def sweep_surfaces(request: ScenarioSweepRequest, date_string: str, models: ModelSet,
+                         grid: ScenarioGrid) -> SurfaceAccumulator:
+    """Score the grid block by block, at most one block per inference worker in flight"""
+    surfaces = SurfaceAccumulator(grid)
+    pending = set()
+    try:
+        for first, count in grid.chunks(SCENARIO_CHUNK_ROWS):
+            if len(pending) >= INFERENCE_POOL.workers:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    surfaces.add(*task.result())
+            pending.add(asyncio.ensure_future(
+                run_inference(score_scenario_cells, request, grid, date_string, models.version, first, count)))
+        for task in asyncio.as_completed(pending):
+            surfaces.add(*await task)
+    finally:
+        for task in pending:
+            task.cancel()
+    return surfaces
+
+@app.post("/scenario-sweep")
+async def scenario_sweep(request: ScenarioSweepRequest, http_request: Request, response: Response,
+                         if_none_match: str = Header(None)):
+    start = time.perf_counter()
+    models = MODELS
+    if not models.loaded:
+        raise HTTPException(status_code=500, detail="ML models not loaded")
+    try:
+        date_string = str(forecast_dates(request.date, request.date)[0])
+        if request.barangays is None:
+            request = request.model_copy(update={'barangays': forecast_cube_roster()})
+        if not request.barangays:
+            raise ValueError("No barangays to sweep")
+        grid = scenario_grid(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if grid.rows > SCENARIO_MAX_ROWS or grid.cells > SCENARIO_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=(
+            f"Grid of {grid.cells:,} cells x {grid.n_barangays} barangays exceeds the limit of "
+            f"{SCENARIO_MAX_CELLS:,} cells and {SCENARIO_MAX_ROWS:,} rows"))
+    
+    etag = weak_etag('scenario-sweep', forecast_cube_version(models), date_string, await http_request.body())
+    cached = not_modified(etag, if_none_match)
+    if cached is not None:
+        return cached
+    response.headers.update(cache_headers(etag))
+    
+    distinct, expand = distinct_scenarios(grid, models)
+    surfaces = await sweep_surfaces(request, date_string, models, distinct)
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    log(logging.INFO, "scenario_sweep", cells=grid.cells, barangays=grid.n_barangays, rows=grid.rows,
+        scored_rows=distinct.rows, duration_ms=elapsed_ms)
+    fiesta_multiplier, holiday_multiplier, market_multiplier = scenario_multipliers(request)
+    
+    return {
+        "date": date_string,
+        "modelVersion": models.version,
+        "barangays": grid.n_barangays,
+        "cells": grid.cells,
+        "rows": grid.rows,
+        "scoredRows": distinct.rows,
+        "axes": {name: values.tolist() for name, values in grid.axes.items()},
+        "shape": list(grid.shape),
+        "multipliers": {
+            "fiesta": fiesta_multiplier,
+            "holiday": holiday_multiplier,
+            "marketDay": market_multiplier,
+        },
+        "surfaces": surfaces.surfaces(expand),
+        "durationMs": elapsed_ms,
+    }
+
+# ============================================================================
+# MODEL REGISTRY: HOT RELOAD AND ROLLBACK
+# ============================================================================
+# A new version is loaded and warmed up on a background thread, then MODELS
+# is swapped in one assignment; requests already running keep the ModelSet
+# they started with. The API follows the registry's CURRENT pointer every
+# MODEL_REGISTRY_POLL_S seconds, and the /models endpoints reload, activate
+# or roll back on demand. Set MODEL_ADMIN_TOKEN to require it in an
+# X-Admin-Token header on those endpoints.
+MODEL_ADMIN_TOKEN = os.environ.get('MODEL_ADMIN_TOKEN')
+MODEL_SWAP_LOCK = asyncio.Lock()
+FAILED_MODEL_VERSIONS = set()
+BACKGROUND_TASKS = set()
+
+def load_checked_models(version: str) -> ModelSet:
+    """Load `version` and run one row through both forests before it serves traffic"""
+    models = MODEL_REGISTRY.load(version)
+    n_features = models.volume_model.n_features_in_
+    if n_features != 14 or models.risk_model.n_features_in_ != 14:
+        raise ValueError(f"Model version '{version}' expects {n_features} features, the API builds 14")
+    if len(models.risk_model.classes_) != len(RISK_LEVELS):
+        raise ValueError(f"Model version '{version}' has risk classes {models.risk_model.classes_.tolist()}")
+    probe = np.zeros((1, 14))
+    models.volume_model.predict(probe)
+    models.risk_model.predict_proba(probe)
+    return models
+
+async def swap_models(version: str, reason: str) -> ModelSet:
+    """Serve `version` from now on; the current models keep serving if it fails to load"""
+    global MODELS
+    async with MODEL_SWAP_LOCK:
+        previous = MODELS
+        if version == previous.version:
+            return previous
+        start = time.perf_counter()
+        try:
+            models = await asyncio.get_running_loop().run_in_executor(None, load_checked_models, version)
+        except Exception as e:
+            MODEL_REGISTRY.failed_loads += 1
+            FAILED_MODEL_VERSIONS.add(version)
+            log(logging.ERROR, "model_swap_failed", version=version, reason=reason, error=str(e))
+            raise
+        
+        if previous.loaded:
+            MODEL_REGISTRY.remember(previous)  # Jobs already queued still resolve it
+        MODELS = models
+        PREDICTION_CACHE.bind(models.fingerprint)
+        MODEL_REGISTRY.swaps += 1
+        FAILED_MODEL_VERSIONS.discard(version)
+        SHADOW.follow_primary(models.version)
+        log(logging.INFO, "model_swapped", from_version=previous.version, to_version=version, reason=reason,
+            load_ms=round((time.perf_counter() - start) * 1000, 2))
+    
+    if FORECAST_CUBE.enabled:
+        # The cube stops answering for the old version right away; rebuild it
+        task = asyncio.create_task(refresh_forecast_cube())
+        BACKGROUND_TASKS.add(task)
+        task.add_done_callback(BACKGROUND_TASKS.discard)
+    return models
+
+async def model_registry_loop():
+    while True:
+        await asyncio.sleep(MODEL_REGISTRY.poll_s)
+        try:
+            version = MODEL_REGISTRY.active_version()
+            if version is not None and version != MODELS.version and version not in FAILED_MODEL_VERSIONS:
+                await swap_models(version, reason="registry")
+        except Exception as e:
+            log(logging.WARNING, "model_registry_error", error=str(e))
+
+@app.on_event("startup")
+async def start_model_registry_watch():
+    if MODEL_REGISTRY.poll_s > 0:
+        app.state.model_registry_task = asyncio.create_task(model_registry_loop())
+
+@app.on_event("shutdown")
+def stop_model_registry_watch():
+    task = getattr(app.state, 'model_registry_task', None)
+    if task is not None:
+        task.cancel()
+
+def check_admin_token(token: str = None):
+    if MODEL_ADMIN_TOKEN and token != MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+async def serve_version(version: str, reason: str):
+    try:
+        models = await swap_models(version, reason)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load model version '{version}': {e}")
+    return {"modelVersion": models.version, "serving": models.describe(), "registry": MODEL_REGISTRY.stats()}
+
+@app.get("/models")
+async def list_models():
+    return {"modelVersion": MODELS.version, "serving": MODELS.describe(), "registry": MODEL_REGISTRY.stats()}
+
+@app.post("/models/reload")
+async def reload_models(x_admin_token: str = Header(None)):
+    """Serve the registry's active version now instead of on the next poll"""
+    check_admin_token(x_admin_token)
+    version = MODEL_REGISTRY.active_version()
+    if version is None:
+        raise HTTPException(status_code=404, detail="The model registry is empty")
+    FAILED_MODEL_VERSIONS.discard(version)
+    return await serve_version(version, reason="reload")
+
+@app.post("/models/activate/{version}")
+async def activate_model(version: str, x_admin_token: str = Header(None)):
+    """Make `version` the registry's active version and serve it"""
+    check_admin_token(x_admin_token)
+    try:
+        MODEL_REGISTRY.activate(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    FAILED_MODEL_VERSIONS.discard(version)
+    return await serve_version(version, reason="activate")
+
+@app.post("/models/rollback")
+async def rollback_model(x_admin_token: str = Header(None)):
+    """Activate and serve the version published before the active one"""
+    check_admin_token(x_admin_token)
+    version = MODEL_REGISTRY.previous_version()
+    if version is None:
+        raise HTTPException(status_code=404, detail="No earlier model version to roll back to")
+    MODEL_REGISTRY.activate(version)
+    FAILED_MODEL_VERSIONS.discard(version)
+    return await serve_version(version, reason="rollback")
+
+@app.get("/models/shadow")
+async def shadow_report():
+    """Shadow-vs-served totals, overhead and the most divergent barangays"""
+    return {**SHADOW.stats(), "barangays": SHADOW.barangay_report(BARANGAY_TABLE.names) if SHADOW.active else []}
+
+@app.post("/models/shadow/{version}")
+async def start_shadow(version: str, x_admin_token: str = Header(None)):
+    """Shadow-score registry version `version` on /predict-batch traffic"""
+    check_admin_token(x_admin_token)
+    try:
+        models = await asyncio.get_running_loop().run_in_executor(None, load_checked_models, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load model version '{version}': {e}")
+    SHADOW.configure(models, MODELS.version)
+    log(logging.INFO, "shadow_started", primary_version=MODELS.version, shadow_version=version)
+    return SHADOW.stats()
+
+@app.delete("/models/shadow")
+async def stop_shadow(x_admin_token: str = Header(None)):
+    check_admin_token(x_admin_token)
+    final = SHADOW.stats()
+    SHADOW.configure(None)
+    log(logging.INFO, "shadow_stopped", **{k: v for k, v in final.items() if k != 'riskConfusion'})
+    return final
+
+# ============================================================================
+# OBSERVED TONNAGE: STREAMING CSV UPLOAD OF TRUCK WEIGH-INS
+# ============================================================================
+# POST /observations/upload takes a CSV of weigh-ins (date, barangay,
+# weight_kg[, truck]) either as the raw body (Content-Type: text/csv) or as
+# the first file of a multipart/form-data upload. The body is parsed as it
+# arrives: blocks of about OBSERVATIONS_BLOCK_BYTES are validated and
+# bulk-inserted on a worker thread while the next block is received.
+# Storage is configured by OBSERVATIONS_DB and OBSERVATIONS_MAX_KG (see
+# observations.py); uploads need X-Admin-Token when MODEL_ADMIN_TOKEN is set.
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+OBSERVATIONS_BLOCK_BYTES = max(1024, int(os.environ.get('OBSERVATIONS_BLOCK_BYTES', str(1 << 20))))
+
+def observation_store() -> ObservationStore:
+    """
+    The weigh-in store, opened on first use from the event loop, so that
+    importing this module (worker processes, backtest.py) never touches the
+    database file
+    """
+    store = getattr(app.state, 'observations', None)
+    if store is None:
+        store = app.state.observations = ObservationStore.from_env(BARANGAY_TABLE.names)
+    return store
+
+@app.on_event("shutdown")
+def close_observations():
+    store = getattr(app.state, 'observations', None)
+    if store is not None:
+        store.close()
+        app.state.observations = None
+
+class MultipartFile:
+    """
+    Streaming multipart/form-data reader: feed() returns the bytes of the
+    first part that carries a filename, as they arrive; other parts are skipped
+    """
+
+    def __init__(self, content_type: str):
+        _, params = parse_options_header(content_type)
+        if not params.get(b'boundary'):
+            raise ValueError("multipart/form-data upload without a boundary")
+        self.filename = None
+        self.chunks = []
+        self._header, self._in_file, self._done = b'', False, False
+        self.parser = MultipartParser(params[b'boundary'], callbacks={
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_headers_finished': self._on_headers_finished,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+        })
+
+    def _on_header_field(self, data, start, end):
+        self._field = bytes(data[start:end]).lower()
+
+    def _on_header_value(self, data, start, end):
+        if self._field == b'content-disposition':
+            self._header += bytes(data[start:end])
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._header)
+        self._header = b''
+        if b'filename' in options and not self._done:
+            self._in_file = True
+            self.filename = options[b'filename'].decode('utf-8', 'replace')
+
+    def _on_part_data(self, data, start, end):
+        if self._in_file:
+            self.chunks.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file, self._done = False, True
+
+    def feed(self, data: bytes) -> bytes:
+        self.parser.write(data)
+        chunk, self.chunks = b''.join(self.chunks), []
+        return chunk
+
+async def csv_body(http_request: Request):
+    """(filename, async iterator of CSV bytes) for a raw or multipart upload"""
+    content_type = http_request.headers.get('content-type', '')
+    if not content_type.lower().startswith('multipart/form-data'):
+        return None, http_request.stream()
+    reader = MultipartFile(content_type)
+    
+    async def file_bytes():
+        async for chunk in http_request.stream():
+            data = reader.feed(chunk)
+            if data:
+                yield data
+        reader.parser.finalize()
+        if reader.filename is None:
+            raise ValueError("multipart upload has no file part")
+    
+    return reader, file_bytes()
+
+@app.post("/observations/upload")
+async def upload_observations(http_request: Request, x_admin_token: str = Header(None)):
+    check_admin_token(x_admin_token)
+    observations = observation_store()
+    start = time.perf_counter()
+    upload_id = new_upload_id()
+    blocks = CsvBlocks(OBSERVATIONS_BLOCK_BYTES)
+    columns, next_row, received = None, 2, 0  # Row 1 is the header
+    rows = accepted = rejected = 0
+    errors = []
+    pending = None
+    
+    async def store(block: str):
+        nonlocal columns, next_row, rows, accepted, rejected
+        if columns is None:
+            header, _, block = block.partition('\n')
+            columns = header_columns(next(csv.reader([header]), []))
+        records, inserted, block_errors, spanned = await asyncio.to_thread(
+            observations.insert_block, block, columns, upload_id, next_row)
+        next_row += spanned
+        rows += records
+        accepted += inserted
+        rejected += len(block_errors)
+        errors.extend(block_errors[:MAX_REPORTED_ERRORS - len(errors)])
+    
+    try:
+        reader, body = await csv_body(http_request)
+        async for chunk in body:
+            received += len(chunk)
+            block = blocks.feed(chunk)
+            if block:
+                # One block stored while the next is received
+                if pending is not None:
+                    await pending
+                pending = asyncio.ensure_future(store(block))
+        if pending is not None:
+            await pending
+            pending = None
+        tail = blocks.finish()
+        if tail.strip() or columns is None:
+            await store(tail)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{e} ({accepted} rows stored before the error)")
+    finally:
+        if pending is not None:
+            pending.cancel()
+    
+    seconds = time.perf_counter() - start
+    filename = reader.filename if reader is not None else None
+    await asyncio.to_thread(observations.record_upload, upload_id, filename, rows, accepted, rejected, seconds)
+    rows_per_second = round(rows / seconds) if seconds > 0 else None
+    log(logging.INFO, "observations_upload", upload_id=upload_id, rows=rows, accepted=accepted, rejected=rejected,
+        bytes=received, rows_per_second=rows_per_second, duration_ms=round(seconds * 1000, 2))
+    return {
+        "uploadId": upload_id,
+        "filename": filename,
+        "rows": rows,
+        "accepted": accepted,
+        "rejected": rejected,
+        "errors": errors,
+        "bytes": received,
+        "seconds": round(seconds, 3),
+        "rowsPerSecond": rows_per_second,
+    }
+
+@app.get("/observations")
+async def observed_tonnage(barangay: str = None, start_date: str = None, end_date: str = None):
+    """Daily observed totals, optionally for one barangay and an inclusive date range"""
+    observations = observation_store()
+    totals = await asyncio.to_thread(observations.daily_totals, barangay, start_date, end_date)
+    return {
+        "store": observations.stats(),
+        "days": [{"barangay": b, "date": d, "weightKg": kg, "weighIns": n} for b, d, kg, n in totals],
+    }
+
 @app.get("/health")
 async def health_check():
+    models = MODELS
     health_status = {
-        "status": "healthy" if volume_model and risk_model else "unhealthy",
-        "models_loaded": volume_model is not None and risk_model is not None,
-        "metadata": bool(metadata),
-        "events_data": bool(CDO_EVENTS.get("events", [])),
-        "volume_model_features": volume_model.n_features_in_ if volume_model else None,
-        "risk_model_classes": risk_model.classes_.tolist() if risk_model else None,
-        "expected_features": metadata.get('features', []) if metadata else [],
+        "status": "healthy" if models.loaded else "unhealthy",
+        "models_loaded": models.loaded,
+        "model_engine": models.engine,
+        "modelVersion": models.version,
+        "metadata": bool(models.metadata),
+        "events_data": bool(EVENT_CALENDAR.data.get("events", [])),
+        "volume_model_features": models.volume_model.n_features_in_ if models.loaded else None,
+        "risk_model_classes": models.risk_model.classes_.tolist() if models.loaded else None,
+        "expected_features": models.metadata.get('features', []),
         "uses_csv_data": True,
         "risk_adjustment": "ENABLED (volume & event based)",
         "timestamp": datetime.now().isoformat(),
         "real_metrics_available": True,
-        "volume_risk_categories": True
+        "volume_risk_categories": True,
+        "inference_pool": INFERENCE_POOL.stats(),
+        "predict_micro_batching": PREDICT_BATCHER.stats(),
+        "prediction_cache": PREDICTION_CACHE.stats(),
+        "forecast_cube": FORECAST_CUBE.stats(),
+        "model_registry": MODEL_REGISTRY.stats(),
+        "shadow": SHADOW.stats()
     }
     
-    print(f"\n🏥 Health check")
-    print(f"   Models: {health_status['models_loaded']}")
-    print(f"   Risk adjustment: {health_status['risk_adjustment']}")
-    print(f"   Real metrics: {health_status['real_metrics_available']}")
-    print(f"   Volume risk: {health_status['volume_risk_categories']}")
+    log(logging.DEBUG, "health_check", models_loaded=health_status['models_loaded'])
     
     return health_status
 
@@ -621,22 +1900,29 @@ async def health_check():
 # NEW: ADD METRICS ENDPOINT
 # ============================================================================
 @app.get("/api/metrics")
-async def get_metrics():
+async def get_metrics(response: Response, if_none_match: str = Header(None)):
     """Get the real model metrics for analytics page"""
+    models = MODELS
+    etag = weak_etag('metrics', models.fingerprint)
+    cached = not_modified(etag, if_none_match)
+    if cached is not None:
+        return cached
+    response.headers.update(cache_headers(etag))
     try:
-        with open(os.path.join(MODEL_DIR, 'ml_models_metadata.json'), 'r') as f:
-            metadata = json.load(f)
+        metadata = models.metadata
+        if not metadata:
+            raise ValueError("No metadata for the serving models")
         
         # Extract real metrics
         real_metrics = metadata.get('real_metrics', {})
         
-        response = {
+        metrics = {
             'r2': real_metrics.get('volume_regressor', {}).get('r2_score', 0.966),
             'mse': real_metrics.get('volume_regressor', {}).get('mse', 1376680.44),
             'accuracy': real_metrics.get('risk_classifier', {}).get('accuracy', 0.812),
             'explained_variance': real_metrics.get('volume_regressor', {}).get('r2_score', 0.966),
             'lastTrained': metadata.get('model_info', {}).get('trained_date', '2025-12-04 09:11:50'),
-            'modelVersion': metadata.get('model_info', {}).get('version', '3.0'),
+            'modelVersion': models.version,
             'featureImportance': {
                 'population': 0.458,
                 'base_waste': 0.445,
@@ -654,11 +1940,11 @@ async def get_metrics():
             })
         }
         
-        print(f"📊 Sending real metrics: R²={response['r2']:.3f}, Accuracy={response['accuracy']:.3f}")
-        return response
+        log(logging.DEBUG, "metrics", r2=metrics['r2'], accuracy=metrics['accuracy'])
+        return metrics
         
     except Exception as e:
-        print(f"❌ Error getting metrics: {e}")
+        log(logging.ERROR, "metrics_error", error=str(e))
         # Return default metrics if file can't be read
         return {
             'r2': 0.966,
@@ -666,7 +1952,7 @@ async def get_metrics():
             'accuracy': 0.812,
             'explained_variance': 0.966,
             'lastTrained': '2025-12-04 09:11:50',
-            'modelVersion': '3.0',
+            'modelVersion': models.version,
             'featureImportance': {
                 'population': 0.458,
                 'base_waste': 0.445,
@@ -679,9 +1965,17 @@ async def get_metrics():
             'volumeRiskThresholds': {'p70': 3246, 'p90': 13128}
         }
 
+def probe_risk_model(rows, version: str = None):
+    """Risk classes and probabilities for hand-written 14-feature rows"""
+    risk_model = (models_for(version) if version else MODELS).risk_model
+    probabilities = risk_model.predict_proba(np.array(rows, dtype=np.float64))
+    return risk_model.classes_.take(np.argmax(probabilities, axis=1)), probabilities
+
 @app.get("/test-risk-model")
 async def test_risk_model():
     """Test endpoint to check risk model behavior"""
+    models = MODELS
+    risk_model = models.risk_model
     if not risk_model:
         return {"error": "Risk model not loaded"}
     
@@ -704,8 +1998,7 @@ async def test_risk_model():
     ]
     
     try:
-        prediction = risk_model.predict([test_sample])
-        probabilities = risk_model.predict_proba([test_sample])
+        prediction, probabilities = await run_inference(probe_risk_model, [test_sample], models.version)
         
         return {
             "test_sample": test_sample,
@@ -727,6 +2020,8 @@ async def test_risk_model():
 @app.get("/debug-risk-bias")
 async def debug_risk_bias():
     """Check if risk model is biased toward moderate"""
+    models = MODELS
+    risk_model = models.risk_model
     if not risk_model:
         return {"error": "Risk model not loaded"}
     
@@ -738,11 +2033,11 @@ async def debug_risk_bias():
         {"name": "Heavy rain", "features": [5000, 2100, 50, 28, 1, 6, 15, 0, 0, 0, 0, 0, 1, 0]},
     ]
     
+    predictions, probabilities = await run_inference(probe_risk_model, [t["features"] for t in test_cases],
+                                                     models.version)
+    
     results = []
-    for test in test_cases:
-        pred = risk_model.predict([test["features"]])[0]
-        probs = risk_model.predict_proba([test["features"]])[0]
-        
+    for test, pred, probs in zip(test_cases, predictions, probabilities):
         results.append({
             "scenario": test["name"],
             "features": test["features"],
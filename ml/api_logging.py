@@ -0,0 +1,102 @@
+# api_logging.py
+# Leveled, sampled, structured logging for the prediction API.
+# Records go through a QueueHandler so request handlers never block on stdout;
+# a background QueueListener does the actual formatting and writing.
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+from contextvars import ContextVar
+
+logger = logging.getLogger("waste_api")
+
+# Correlation id of the request being handled ("-" outside of a request)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_listener = None
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+class RequestContextFilter(logging.Filter):
+    """Stamp each record with the current request id"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; higher levels always pass"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line: time, level, request id, message and fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "request_id": getattr(record, "request_id", "-"),
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: str = None, sample_rate: float = None, stream=None):
+    """
+    (Re)configure the API logger. Defaults come from LOG_LEVEL (INFO) and
+    LOG_SAMPLE_RATE (1.0, the fraction of DEBUG records kept).
+    """
+    global _listener
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    if sample_rate is None:
+        sample_rate = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for log_filter in list(logger.filters):
+        logger.removeFilter(log_filter)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter())
+
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.addFilter(SamplingFilter(sample_rate))
+    logger.addFilter(RequestContextFilter())
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    return logger
+
+def flush_logging():
+    """Drain the queue; called at exit so the last records are not lost"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log(level: int, event: str, **fields):
+    """logger.log with structured fields, skipped cheaply when the level is off"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+atexit.register(flush_logging)
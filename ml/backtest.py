@@ -0,0 +1,290 @@
+# backtest.py
+# Replays the production feature path over a year of dates for every
+# barangay and scores it against recorded tonnage.
+#
+# Usage: python backtest.py [--actuals CSV | --observations [DB]] [--year YYYY]
+#                           [--models DIR | --version V] [--json PATH]
+#
+# The whole (days x barangays) grid goes through the same code the API
+# serves with: build_forecast_tensor (the calculate_features columns with
+# event multipliers from the compiled calendar), one pass of each model,
+# then apply_risk_overrides with positions restarting every day, as one
+# /predict-batch call per day would. A year for all 80 barangays is ~29k
+# rows, scored in one call per model.
+#
+# --actuals is a CSV with date (YYYY-MM-DD), barangay and actual_kg columns,
+# plus optional per-row rainfall_mm and temperature_c (averaged per date;
+# days without them use the API defaults). --observations reads the daily
+# weigh-in totals uploaded to /observations/upload instead. Without either,
+# actual tonnage is simulated from the training_data.py patterns so the
+# command still runs on a fresh checkout; the report says which it used.
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+import pandas as pd
+
+from event_calendar import normalize_name
+from observations import DEFAULT_DB, ObservationStore
+from training_data import (CAPACITY_FACTOR, MONTHLY_MULTIPLIERS, RAINFALL_MM, RAINFALL_MULTIPLIERS,
+                           RISK_UTILIZATION, WEEKLY_MULTIPLIERS)
+
+RISK_NAMES = ['safe', 'moderate', 'high']
+
+def year_dates(year: int):
+    return np.arange(np.datetime64(f'{year}-01-01'), np.datetime64(f'{year + 1}-01-01'), dtype='datetime64[D]')
+
+def actual_risk(actual_kg, base_waste):
+    """Risk class the training labels give a day's tonnage: utilization of 1.2x the usual waste"""
+    return np.searchsorted(RISK_UTILIZATION, actual_kg / (base_waste * CAPACITY_FACTOR), side='right')
+
+def simulate_actuals(dates, base_waste, seed: int = 0):
+    """
+    (actual kg (days x barangays), daily rainfall mm, daily temperature) drawn
+    with the training_data.py weekly, monthly and rainfall patterns. Weather
+    is city-wide per day; noise is per cell.
+    """
+    rng = np.random.default_rng(seed)
+    n_days, n_barangays = len(dates), len(base_waste)
+    day_of_week = (dates.astype(np.int64) + 4) % 7  # Sunday=0, like WEEKLY_MULTIPLIERS
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    rainfall_type = rng.integers(0, len(RAINFALL_MM), n_days)
+    temperature = rng.uniform(24, 35, n_days)
+    daily = WEEKLY_MULTIPLIERS[day_of_week] * MONTHLY_MULTIPLIERS[month] * RAINFALL_MULTIPLIERS[rainfall_type]
+    noise = rng.uniform(0.9, 1.1, (n_days, n_barangays)) * rng.uniform(0.95, 1.05, (n_days, n_barangays))
+    actual = base_waste[None, :] * daily[:, None] * noise
+    return actual, RAINFALL_MM[rainfall_type].astype(np.float64), temperature
+
+def read_actuals(frame: pd.DataFrame, names, source: str):
+    """
+    (dates, actual kg (days x barangays, NaN where not recorded), daily rainfall,
+    daily temperature, unmatched barangay names) from an actuals table
+    """
+    missing = {'date', 'barangay', 'actual_kg'} - set(frame.columns)
+    if missing:
+        raise ValueError(f"{source} is missing columns: {', '.join(sorted(missing))}")
+    frame['date'] = pd.to_datetime(frame['date']).values.astype('datetime64[D]')
+    columns = {normalize_name(name): j for j, name in enumerate(names)}
+    frame['column'] = frame['barangay'].map(lambda name: columns.get(normalize_name(name), -1))
+    unmatched = sorted(set(frame.loc[frame['column'] < 0, 'barangay'].astype(str)))
+    frame = frame[frame['column'] >= 0]
+    if frame.empty:
+        raise ValueError(f"{source} has no rows for known barangays")
+
+    dates = np.arange(frame['date'].min(), frame['date'].max() + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+    rows = (frame['date'].values.astype('datetime64[D]') - dates[0]).astype(np.int64)
+    actual = np.full((len(dates), len(names)), np.nan)
+    actual[rows, frame['column'].values] = frame['actual_kg'].values
+
+    def daily(column, default):
+        values = np.full(len(dates), float(default))
+        if column in frame:
+            means = frame.groupby(rows)[column].mean().dropna()
+            values[means.index.values] = means.values
+        return values
+
+    return dates, actual, daily('rainfall_mm', 0), daily('temperature_c', 28), unmatched
+
+def replay(api, models, dates, roster, rainfall, temperature):
+    """Served (volumes, risk codes, raw model risk codes, event names) for every (day, barangay) cell"""
+    X, multipliers, event_names = api.build_forecast_tensor(dates, roster, rainfall, temperature)
+    X = X.reshape(-1, X.shape[-1])
+    volumes = models.volume_model.predict(X).astype(np.float64)
+    risk_proba = models.risk_model.predict_proba(X)
+    risk_classes = models.risk_model.classes_.take(np.argmax(risk_proba, axis=1))
+    positions = np.tile(np.arange(len(roster)), len(dates))
+    risk, _ = api.apply_risk_overrides(volumes, risk_proba, risk_classes, np.asarray(multipliers).ravel(), positions)
+    model_risk = np.where(np.isin(risk_classes, [0, 1, 2]), risk_classes, 1)
+    return volumes, risk, model_risk, event_names
+
+def group_metrics(groups, n_groups: int, actual, predicted, true_risk, risk, model_risk):
+    """MAE, bias, R², served and raw-model risk accuracy per group id, via bincount"""
+    def total(values):
+        return np.bincount(groups, weights=values, minlength=n_groups)
+
+    n = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    error = predicted - actual
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total(actual) / n
+        sst = total(actual ** 2) - n * mean ** 2
+        return {
+            'rows': n.astype(np.int64),
+            'mae': total(np.abs(error)) / n,
+            'bias': total(error) / n,
+            'r2': np.where(sst > 1e-9 * np.maximum(total(actual ** 2), 1), 1 - total(error ** 2) / sst, np.nan),
+            'accuracy': total(risk == true_risk) / n,
+            'model_accuracy': total(model_risk == true_risk) / n,
+        }
+
+def metric_rows(labels, metrics):
+    """One JSON-friendly dict per group label; NaN becomes None"""
+    rows = []
+    for j, label in enumerate(labels):
+        if not metrics['rows'][j]:
+            continue
+        row = {'group': label}
+        for name, values in metrics.items():
+            value = values[j].item()
+            row[name] = None if isinstance(value, float) and np.isnan(value) else value
+        rows.append(row)
+    return rows
+
+def run_backtest(api, models, dates, names, population, base_waste, actual, rainfall, temperature):
+    """
+    Replay `dates` x `names` and compare with `actual` (days x barangays kg,
+    NaN = not recorded). Returns the report dict.
+    """
+    calendar = api.EVENT_CALENDAR.data.get('weekly_patterns', {}).get('market_days', {})
+    market = {normalize_name(name) for name in calendar.get('barangays', [])}
+    roster = [api.ForecastBarangay(barangay_id=str(j), barangay_name=name, population=float(population[j]),
+                                   has_market=normalize_name(name) in market)
+              for j, name in enumerate(names)]
+
+    start = time.perf_counter()
+    volumes, risk, model_risk, event_names = replay(api, models, dates, roster, rainfall, temperature)
+    replay_s = time.perf_counter() - start
+
+    n_days, n_barangays = len(dates), len(names)
+    recorded = np.flatnonzero(~np.isnan(actual.ravel()))
+    actual_kg = actual.ravel()[recorded]
+    predicted = volumes[recorded]
+    served, raw = risk[recorded], model_risk[recorded]
+    true_risk = actual_risk(actual_kg, np.tile(base_waste, n_days)[recorded])
+    day, barangay = np.divmod(recorded, n_barangays)
+
+    def report(groups, labels):
+        return metric_rows(labels, group_metrics(groups, len(labels), actual_kg, predicted, true_risk, served, raw))
+
+    # A day with several events counts towards each of them
+    cells = [event_names[d][b] or ['No event'] for d, b in zip(day.tolist(), barangay.tolist())]
+    event_labels = sorted({name for names_ in cells for name in names_})
+    event_ids = {name: k for k, name in enumerate(event_labels)}
+    pairs = [(j, event_ids[name]) for j, names_ in enumerate(cells) for name in names_]
+    pair_rows, pair_events = (np.array(column, dtype=np.int64) for column in zip(*pairs))
+    events = metric_rows(event_labels, group_metrics(
+        pair_events, len(event_labels), actual_kg[pair_rows], predicted[pair_rows], true_risk[pair_rows],
+        served[pair_rows], raw[pair_rows]))
+
+    months = dates.astype('datetime64[M]').astype(np.int64) % 12
+    month_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    return {
+        'modelVersion': models.version,
+        'startDate': str(dates[0]),
+        'endDate': str(dates[-1]),
+        'rows': int(len(recorded)),
+        'replaySeconds': round(replay_s, 3),
+        'overall': report(np.zeros(len(recorded), dtype=np.int64), ['all'])[0],
+        'riskDistribution': {
+            'actual': dict(zip(RISK_NAMES, np.bincount(true_risk, minlength=3).tolist())),
+            'served': dict(zip(RISK_NAMES, np.bincount(served, minlength=3).tolist())),
+        },
+        'byMonth': report(months[day], month_labels),
+        'byEvent': events,
+        'byBarangay': report(barangay, list(names)),
+    }
+
+def format_row(row, width: int = 24) -> str:
+    def number(value, spec):
+        return format(value, spec) if value is not None else '—'
+    return (f"   {str(row['group'])[:width]:<{width}} {row['rows']:>6} {number(row['mae'], '>9.1f')} "
+            f"{number(row['bias'], '>+9.1f')} {number(row['r2'], '>7.3f')} {number(row['accuracy'], '>7.1%')} "
+            f"{number(row['model_accuracy'], '>7.1%')}")
+
+def print_report(report, worst: int = 10):
+    header = (f"   {'group':<24} {'rows':>6} {'MAE kg':>9} {'bias kg':>9} {'R²':>7} {'acc':>7} {'model':>7}")
+    print(f"\n📅 {report['startDate']} → {report['endDate']}, {report['rows']:,} barangay-days, "
+          f"model {report['modelVersion']}, replayed in {report['replaySeconds']:.2f}s")
+    print(f"   Risk (actual):  {report['riskDistribution']['actual']}")
+    print(f"   Risk (served):  {report['riskDistribution']['served']}")
+    print("   acc = served risk (after override rules), model = raw classifier")
+
+    print(f"\n🎯 OVERALL\n{header}")
+    print(format_row(report['overall']))
+    print(f"\n🗓️  BY MONTH\n{header}")
+    for row in report['byMonth']:
+        print(format_row(row))
+    print(f"\n🎉 BY EVENT\n{header}")
+    for row in report['byEvent']:
+        print(format_row(row))
+    print(f"\n🏘️  BY BARANGAY (worst {worst} by MAE; all {len(report['byBarangay'])} in --json)\n{header}")
+    for row in sorted(report['byBarangay'], key=lambda r: -r['mae'])[:worst]:
+        print(format_row(row))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the served models against recorded tonnage")
+    sources = parser.add_mutually_exclusive_group()
+    sources.add_argument('--actuals', help="CSV with date, barangay, actual_kg (default: simulated tonnage)")
+    sources.add_argument('--observations', nargs='?', const=DEFAULT_DB,
+                         help="Observed weigh-in store (default: observations.sqlite3)")
+    parser.add_argument('--year', type=int, default=None,
+                        help="Year to simulate without --actuals (default: last year)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for simulated tonnage")
+    parser.add_argument('--models', help="Directory holding model artifacts (default: the served models)")
+    parser.add_argument('--version', help="Registry version to backtest (default: the served models)")
+    parser.add_argument('--json', help="Write the full report here")
+    args = parser.parse_args(argv)
+
+    import api
+    from model_registry import ModelSet
+
+    print("="*60)
+    print("🔁 BACKTEST: PRODUCTION FEATURE PATH vs RECORDED TONNAGE")
+    print("="*60)
+
+    if args.models:
+        models = ModelSet.load(args.models, version=f"dir:{os.path.abspath(args.models)}", engine=api.MODEL_ENGINE)
+    elif args.version:
+        models = api.MODEL_REGISTRY.load(args.version)
+    else:
+        models = api.MODELS
+    if not models.loaded:
+        print("❌ Models not loaded - run train_waste_model.py first")
+        return 1
+
+    table = api.BARANGAY_TABLE
+    names, population, base_waste = table.names, table.population.astype(np.float64), table.waste
+    source = args.actuals or args.observations
+    if source:
+        try:
+            if args.actuals:
+                frame = pd.read_csv(args.actuals)
+            else:
+                if not os.path.exists(args.observations):
+                    raise ValueError(f"no observation store at {args.observations}")
+                store = ObservationStore(args.observations, names)
+                frame = pd.DataFrame(store.daily_totals(), columns=['barangay', 'date', 'actual_kg', 'weigh_ins'])
+                store.close()
+            dates, actual, rainfall, temperature, unmatched = read_actuals(frame, names, source)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not read actuals: {e}")
+            return 1
+        print(f"✅ Recorded tonnage: {source}")
+        if unmatched:
+            print(f"⚠️  Skipped {len(unmatched)} unknown barangays: {', '.join(unmatched[:5])}"
+                  f"{' ...' if len(unmatched) > 5 else ''}")
+    else:
+        year = args.year or int(str(np.datetime64('today', 'Y'))) - 1
+        dates = year_dates(year)
+        actual, rainfall, temperature = simulate_actuals(dates, base_waste, args.seed)
+        print(f"⚠️  No --actuals given: simulated {year} tonnage from the training patterns (seed {args.seed})")
+
+    start = time.perf_counter()
+    report = run_backtest(api, models, dates, names, population, base_waste, actual, rainfall, temperature)
+    report['actuals'] = source or f"simulated (seed {args.seed})"
+    report['totalSeconds'] = round(time.perf_counter() - start, 3)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Full report: {args.json}")
+    print(f"\n✅ Backtest finished in {report['totalSeconds']:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
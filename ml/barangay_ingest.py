@@ -0,0 +1,198 @@
+# barangay_ingest.py
+# One reader for the CLENRO solid-waste CSVs, shared by training and the API.
+# Rows are split by the csv module's C tokenizer and every numeric column is
+# converted in one vectorized pass (thousands separators included). The result
+# is a compact BarangayTable, cached in the .wpm container (model_format.py)
+# so later loads are a header read plus memory-mapped arrays.
+#
+# Usage: python barangay_ingest.py [csv ...]   (rebuilds the cache and prints the table)
+import os
+import re
+import csv
+import sys
+import glob
+import hashlib
+
+import numpy as np
+
+from model_format import read_model, write_model
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(MODEL_DIR, '888565238-Solid-waste-CLENRO-CAGAYAN-DE-ORO-CITY.csv')
+# Later per-year exports are picked up next to it, e.g. clenro-waste-2024.csv
+CSV_PATTERN = os.path.join(MODEL_DIR, 'clenro-waste-*.csv')
+DEFAULT_CACHE = os.path.join(MODEL_DIR, 'barangay_table.wpm')
+
+# Column positions in the CLENRO export (two header rows, then one row per barangay)
+HEADER_ROWS = 2
+NAME, POPULATION, PER_CAPITA, WASTE = 0, 1, 2, 3
+CLASS_COLUMNS = [4, 5, 6, 7]
+WASTE_CLASSES = ['residual', 'biodegradable', 'recyclable', 'special']
+COLLECTION = 8
+DEFAULT_PER_CAPITA = 0.42
+
+CACHE_FORMAT = 1
+# What float() accepts once thousands separators are gone, ASCII digits only
+NUMBER = re.compile(r'[-+]?(?:\d+(?:\.\d*)?|\.\d+)', re.ASCII)
+
+def parse_numbers(values) -> np.ndarray:
+    """'7,996.38' style strings to float64; blanks and junk become NaN"""
+    cleaned = np.char.replace(np.char.strip(np.asarray(values, dtype=str)), ',', '')
+    out = np.full(len(cleaned), np.nan)
+    numeric = np.fromiter((NUMBER.fullmatch(v) is not None for v in cleaned), dtype=bool, count=len(cleaned))
+    out[numeric] = cleaned[numeric].astype(np.float64)
+    return out
+
+class BarangayTable:
+    """
+    Column arrays for every barangay in the CLENRO data: population, daily
+    waste (kg), per-capita waste, the waste class breakdown (kg/day, one
+    column per WASTE_CLASSES entry) and the collection frequency text.
+    Waste missing from the source falls back to population x 0.42.
+    """
+
+    def __init__(self, names, population, waste, per_capita, classes, collection_frequency):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.population = np.asarray(population, dtype=np.int64)
+        self.waste = np.asarray(waste, dtype=np.float64)
+        self.per_capita = np.asarray(per_capita, dtype=np.float64)
+        self.classes = np.asarray(classes, dtype=np.float64)
+        self.collection_frequency = list(collection_frequency)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from csv rows after the header rows; blank, total and zero-population rows are dropped"""
+        rows = [r + [''] * (COLLECTION + 1 - len(r)) for r in rows
+                if r and r[NAME].strip() and not r[NAME].strip().startswith('Total')]
+        if not rows:
+            return cls([], [], [], [], np.empty((0, len(WASTE_CLASSES))), [])
+        columns = list(zip(*rows))
+
+        population = np.nan_to_num(parse_numbers(columns[POPULATION]))
+        waste = parse_numbers(columns[WASTE])
+        classes = np.column_stack([parse_numbers(columns[c]) for c in CLASS_COLUMNS])
+        keep = population > 0
+
+        population = population[keep]
+        measured = np.nan_to_num(waste[keep]) > 0
+        waste = np.where(measured, waste[keep], population * DEFAULT_PER_CAPITA)
+        per_capita = np.where(measured, waste / population, DEFAULT_PER_CAPITA)
+        keep_rows = np.flatnonzero(keep).tolist()
+        return cls(
+            names=[columns[NAME][i].strip() for i in keep_rows],
+            population=population,
+            waste=waste,
+            per_capita=per_capita,
+            classes=np.nan_to_num(classes[keep]),
+            collection_frequency=[columns[COLLECTION][i].strip() for i in keep_rows],
+        )
+
+    @classmethod
+    def read_csv(cls, path: str):
+        """Parse one CLENRO export"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.reader(f))
+        return cls.from_rows(rows[HEADER_ROWS:])
+
+    def merge(self, newer):
+        """Rows from `newer` replace same-named rows here; new barangays are appended"""
+        order = self.names + [n for n in newer.names if n not in self.index]
+        pick = [(newer, newer.index[n]) if n in newer.index else (self, self.index[n]) for n in order]
+        return BarangayTable(
+            names=order,
+            population=[t.population[i] for t, i in pick],
+            waste=[t.waste[i] for t, i in pick],
+            per_capita=[t.per_capita[i] for t, i in pick],
+            classes=np.array([t.classes[i] for t, i in pick]).reshape(len(pick), len(WASTE_CLASSES)),
+            collection_frequency=[t.collection_frequency[i] for t, i in pick],
+        )
+
+    def waste_by_name(self) -> dict:
+        return dict(zip(self.names, self.waste.tolist()))
+
+    def records(self) -> list:
+        """One dict per barangay, in the shape train_waste_model.py uses"""
+        return [{
+            'barangay': name,
+            'population': int(population),
+            'total_waste': waste,
+            'waste_per_capita': per_capita,
+            'collection_frequency': frequency,
+        } for name, population, waste, per_capita, frequency in zip(
+            self.names, self.population.tolist(), self.waste.tolist(),
+            self.per_capita.tolist(), self.collection_frequency)]
+
+    def save(self, path: str, source_key: str = ''):
+        write_model(path, {
+            'population': self.population,
+            'waste': self.waste,
+            'per_capita': self.per_capita,
+            'classes': self.classes,
+        }, {
+            'format': CACHE_FORMAT,
+            'source_key': source_key,
+            'names': self.names,
+            'waste_classes': WASTE_CLASSES,
+            'collection_frequency': self.collection_frequency,
+        })
+
+    @classmethod
+    def load(cls, path: str, source_key: str = None):
+        """Open a cached table; None if it is missing, unreadable or built from other sources"""
+        try:
+            arrays, metadata = read_model(path)
+        except (OSError, ValueError):
+            return None
+        if metadata.get('format') != CACHE_FORMAT:
+            return None
+        if source_key is not None and metadata.get('source_key') != source_key:
+            return None
+        return cls(metadata['names'], arrays['population'], arrays['waste'], arrays['per_capita'],
+                   arrays['classes'], metadata['collection_frequency'])
+
+def source_paths():
+    """The base export followed by any per-year files, oldest first"""
+    return [DEFAULT_CSV] + sorted(glob.glob(CSV_PATTERN))
+
+def sources_key(paths) -> str:
+    """Cheap identity of the source files: path, size and mtime of each"""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+def load_barangay_table(paths=None, cache_path: str = DEFAULT_CACHE) -> BarangayTable:
+    """
+    Barangay table from the CLENRO exports, merged oldest to newest. The
+    cache is reused while the sources are unchanged and rewritten otherwise;
+    pass cache_path=None to always parse.
+    """
+    paths = [p for p in (paths or source_paths()) if os.path.exists(p)]
+    if not paths:
+        raise FileNotFoundError("No CLENRO waste CSV found")
+    key = sources_key(paths)
+    if cache_path:
+        table = BarangayTable.load(cache_path, key)
+        if table is not None:
+            return table
+
+    table = BarangayTable.read_csv(paths[0])
+    for path in paths[1:]:
+        table = table.merge(BarangayTable.read_csv(path))
+    if cache_path:
+        try:
+            table.save(cache_path, key)
+        except OSError:
+            pass  # Read-only deployment: keep serving from the parsed table
+    return table
+
+if __name__ == "__main__":
+    table = load_barangay_table(sys.argv[1:] or None)
+    for name, population, waste in zip(table.names, table.population.tolist(), table.waste.tolist()):
+        print(f"  ✓ {name}: Pop={population:,}, Waste={waste:,.2f} kg")
+    print(f"✅ {len(table)} barangays → {os.path.basename(DEFAULT_CACHE)}")
@@ -0,0 +1,112 @@
+# benchmark_cold_start.py
+# Startup time and per-worker memory: pickled sklearn forests (joblib) vs the
+# memory-mapped .wpm forests. Workers run as separate processes, like uvicorn
+# --workers, and stay alive together so shared pages show up in PSS.
+#
+# Usage: python benchmark_cold_start.py   (needs the .pkl and .wpm files; Linux for RSS/PSS)
+import os
+import sys
+import json
+import time
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS = ['waste_volume_regressor.pkl', 'risk_level_classifier.pkl']
+WORKERS = 4
+ROUNDS = 3
+
+def memory_kb():
+    """(RSS, PSS) of this process in kB; PSS splits shared pages between their users"""
+    values = {}
+    for path in ['/proc/self/status', '/proc/self/smaps_rollup']:
+        try:
+            with open(path) as f:
+                for line in f:
+                    key, _, rest = line.partition(':')
+                    if key in ('VmRSS', 'Pss'):
+                        values[key] = int(rest.split()[0])
+        except OSError:
+            pass
+    return values.get('VmRSS'), values.get('Pss')
+
+def worker(engine):
+    """Load both models, score a batch so the pages are touched, report, then idle"""
+    start = time.perf_counter()
+    import numpy as np
+    if engine == 'flat':
+        from flat_forest import FlatForest, flat_path
+        models = [FlatForest.load(flat_path(os.path.join(MODEL_DIR, name))) for name in MODELS]
+    else:
+        import joblib
+        models = [joblib.load(os.path.join(MODEL_DIR, name)) for name in MODELS]
+        for model in models:
+            model.n_jobs = 1
+    load_s = time.perf_counter() - start
+
+    X = np.random.default_rng(0).uniform(0, 50000, (800, models[0].n_features_in_))
+    start = time.perf_counter()
+    models[0].predict(X)
+    models[1].predict_proba(X)
+    first_s = time.perf_counter() - start
+
+    rss, pss = memory_kb()
+    print(json.dumps({'load_s': load_s, 'first_s': first_s, 'rss_kb': rss, 'pss_kb': pss}), flush=True)
+    sys.stdin.read()  # Stay resident until every sibling has reported
+
+def spawn_workers(engine, count):
+    procs = [subprocess.Popen([sys.executable, __file__, '--worker', engine], cwd=MODEL_DIR,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(count)]
+    reports = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+    return reports
+
+def api_import_s(engine):
+    """Wall time for a fresh interpreter to import api.py (models, metadata, calendar)"""
+    env = dict(os.environ, MODEL_ENGINE=engine)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import api'], cwd=MODEL_DIR, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def mb(kb):
+    return f"{kb / 1024:.1f}MB" if kb is not None else "n/a"
+
+def main():
+    print("="*60)
+    print("🧊 COLD START: joblib .pkl vs memory-mapped .wpm")
+    print("="*60)
+
+    sizes = {ext: sum(os.path.getsize(os.path.join(MODEL_DIR, os.path.splitext(n)[0] + ext)) for n in MODELS)
+             for ext in ['.pkl', '.wpm']}
+    print(f"\n💾 On disk: .pkl {sizes['.pkl'] / 1e6:.1f}MB, .wpm {sizes['.wpm'] / 1e6:.1f}MB")
+
+    print(f"\n{'engine':>8} {'load':>8} {'1st batch':>10} {'api import':>11} "
+          f"{'RSS/worker':>11} {'PSS/worker':>11} {f'PSS x{WORKERS}':>9}")
+    for engine in ['sklearn', 'flat']:
+        loads, firsts, imports, rss, pss = [], [], [], [], []
+        for _ in range(ROUNDS):
+            reports = spawn_workers(engine, WORKERS)
+            loads += [r['load_s'] for r in reports]
+            firsts += [r['first_s'] for r in reports]
+            rss += [r['rss_kb'] for r in reports if r['rss_kb'] is not None]
+            pss += [r['pss_kb'] for r in reports if r['pss_kb'] is not None]
+            imports.append(api_import_s(engine))
+        mean = lambda values: sum(values) / len(values) if values else None
+        pss_total = mean(pss) * WORKERS if pss else None
+        print(f"{engine:>8} {min(loads) * 1000:>6.0f}ms {min(firsts) * 1000:>8.1f}ms {min(imports):>10.2f}s "
+              f"{mb(mean(rss)):>11} {mb(mean(pss)):>11} {mb(pss_total):>9}")
+
+    print(f"\nload = imports + model load inside a worker, {WORKERS} workers starting together; "
+          "api import = fresh interpreter importing api.py")
+    print("Page cache is warm after the first round, as it is for every worker after the first")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        worker(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,130 @@
+# benchmark_columnar.py
+# End-to-end /predict-batch cost (client encoding, validation, scoring,
+# response encoding, client decoding) for the row API against the columnar
+# endpoint in each encoding, from 80 to 100k rows
+import os
+import time
+import json
+import asyncio
+import warnings
+warnings.filterwarnings('ignore')
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")  # Every repeat scores for real
+import api
+import columnar
+from api_logging import configure_logging
+from model_format import decode_model, encode_model
+
+configure_logging(level="WARNING", stream=open(os.devnull, 'w'))
+
+ROWS = [int(n) for n in os.environ.get("BENCH_ROWS", "80,1000,10000,100000").split(",")]
+REPEATS = 3
+
+def make_columns(n: int, seed: int = 0):
+    """n rows cycling through the barangays with random weather"""
+    rng = np.random.default_rng(seed)
+    names = list(api.HISTORICAL_WASTE_CSV)
+    waste = np.array([api.HISTORICAL_WASTE_CSV[name] for name in names])
+    index = np.arange(n) % len(names)
+    return {
+        'barangay_id': [str(i) for i in range(n)],
+        'barangay_name': [names[j] for j in index],
+        'population': waste[index] / 0.42,
+        'population_density': np.full(n, 100.0),
+        'bin_capacity': waste[index] * 1.5,
+        'rainfall_mm': rng.uniform(0, 40, n).round(1),
+        'temperature_c': rng.uniform(24, 34, n).round(1),
+        'is_market_day': (np.arange(n) % 3 == 0).astype(np.float64),
+        'day_of_week': (np.arange(n) % 7).astype(np.float64),
+        'prediction_date': '2025-08-21',
+    }
+
+def row_body(columns):
+    n = len(columns['barangay_id'])
+    return {"barangays": [
+        {name: (value if isinstance(value, str) else
+                value[j] if isinstance(value, list) else
+                int(value[j]) if name in ('is_market_day', 'day_of_week') else float(value[j]))
+         for name, value in columns.items()}
+        for j in range(n)
+    ]}
+
+def json_columns(columns):
+    return {name: value.tolist() if isinstance(value, np.ndarray) else value for name, value in columns.items()}
+
+def wpm_columns(columns):
+    arrays = {name: value for name, value in columns.items() if isinstance(value, np.ndarray)}
+    return encode_model(arrays, {'columns': {name: value for name, value in columns.items() if name not in arrays}})
+
+async def timed(fn):
+    timings, result = [], None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = await fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+async def main():
+    print("="*60)
+    print("⏱️  COLUMNAR BATCH BENCHMARK")
+    print(f"   Encodings: {', '.join(columnar.supported_media_types())}")
+    print("="*60)
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        async def row_api(body: bytes):
+            response = await client.post("/predict-batch", content=body,
+                                         headers={'content-type': 'application/json'})
+            response.raise_for_status()
+            return len(response.content), len(response.json()['predictions'])
+
+        async def columnar_api(body, content_type, accept):
+            response = await client.post("/predict-batch/columnar", content=body,
+                                         headers={'content-type': content_type, 'accept': accept})
+            response.raise_for_status()
+            if accept == columnar.WPM:
+                arrays, _ = decode_model(response.content)
+                rows = len(arrays['predictedVolume'])
+            elif accept == columnar.MSGPACK:
+                rows = len(columnar.msgpack.unpackb(response.content)['columns']['predictedVolume'])
+            else:
+                rows = len(response.json()['columns']['predictedVolume'])
+            return len(response.content), rows
+
+        await row_api(json.dumps(row_body(make_columns(80))).encode('utf-8'))  # Warm up
+
+        print(f"\n{'rows':>7} {'format':>16} {'request':>10} {'response':>10} {'total':>10} {'per row':>9} {'speedup':>8}")
+        for n in ROWS:
+            columns = make_columns(n)
+            # Clients pay for building their bodies too
+            start = time.perf_counter()
+            row_bytes = json.dumps(row_body(columns)).encode('utf-8')
+            row_encode_ms = (time.perf_counter() - start) * 1000
+            row_ms, (row_response, _) = await timed(lambda: row_api(row_bytes))
+
+            variants = [('rows (json)', len(row_bytes), row_response, row_ms + row_encode_ms)]
+            encoders = [(columnar.JSON, lambda c: json.dumps(json_columns(c)).encode('utf-8')),
+                        (columnar.WPM, wpm_columns)]
+            if columnar.msgpack is not None:
+                encoders.append((columnar.MSGPACK, lambda c: columnar.msgpack.packb(json_columns(c))))
+            for media_type, encode in encoders:
+                start = time.perf_counter()
+                body = encode(columns)
+                encode_ms = (time.perf_counter() - start) * 1000
+                elapsed, (response_bytes, rows) = await timed(lambda: columnar_api(body, media_type, media_type))
+                assert rows == n
+                label = media_type.split('/')[-1]
+                variants.append((f"columnar ({label})", len(body), response_bytes, elapsed + encode_ms))
+
+            baseline = variants[0][3]
+            for label, request_bytes, response_bytes, total_ms in variants:
+                print(f"{n:>7} {label:>16} {request_bytes / 1024:>8.0f}KB {response_bytes / 1024:>8.0f}KB "
+                      f"{total_ms:>8.1f}ms {total_ms * 1000 / n:>7.1f}µs {baseline / total_ms:>7.1f}x")
+
+    api.INFERENCE_POOL.shutdown(wait=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+# benchmark_concurrency.py
+# Latency under concurrent load for each inference pool mode, plus how
+# quickly a saturated pool sheds load with 503s
+import os
+import time
+import asyncio
+import warnings
+warnings.filterwarnings('ignore')
+
+import httpx
+import numpy as np
+
+import api
+from api_logging import configure_logging
+from inference_pool import InferencePool
+from micro_batcher import MicroBatcher
+
+configure_logging(level="WARNING", stream=open(os.devnull, 'w'))
+
+CONCURRENCY = 32
+ROUNDS = 4
+MODES = os.environ.get("BENCH_POOL_MODES", "inline,thread,process").split(",")
+
+BATCH = {"barangays": [
+    {
+        "barangay_id": str(i),
+        "barangay_name": name,
+        "population": waste / 0.42,
+        "population_density": 100,
+        "bin_capacity": waste * 1.5,
+        "rainfall_mm": 12.5,
+        "temperature_c": 29,
+        "day_of_week": i % 7,
+        "prediction_date": "2025-08-21",
+    }
+    for i, (name, waste) in enumerate(api.HISTORICAL_WASTE_CSV.items())
+]}
+
+SINGLES = [dict(row, barangay_id=str(i)) for i, row in enumerate(BATCH["barangays"])]
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float('nan')
+
+async def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    return response.status_code, time.perf_counter() - start
+
+async def run_load(client):
+    """CONCURRENCY concurrent /predict-batch calls while /health is polled"""
+    batch_latencies, health_latencies, statuses = [], [], []
+    done = asyncio.Event()
+
+    async def poll_health():
+        while not done.is_set():
+            _, elapsed = await timed(client, "GET", "/health")
+            health_latencies.append(elapsed)
+            await asyncio.sleep(0.005)
+
+    poller = asyncio.create_task(poll_health())
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        results = await asyncio.gather(*[
+            timed(client, "POST", "/predict-batch", json=BATCH) for _ in range(CONCURRENCY)
+        ])
+        for status, elapsed in results:
+            statuses.append(status)
+            if status == 200:
+                batch_latencies.append(elapsed)
+    wall = time.perf_counter() - start
+    done.set()
+    await poller
+    return batch_latencies, health_latencies, statuses, wall
+
+async def main():
+    print("="*60)
+    print("⏱️  CONCURRENT LOAD BENCHMARK")
+    print(f"   {CONCURRENCY} concurrent /predict-batch x {len(BATCH['barangays'])} barangays, {ROUNDS} rounds")
+    print("="*60)
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"\n{'mode':>8} {'batch p50':>10} {'batch p99':>10} {'health p50':>11} {'health p99':>11} {'req/s':>7} {'503s':>5}")
+        for mode in MODES:
+            api.INFERENCE_POOL.shutdown(wait=True)
+            api.INFERENCE_POOL = InferencePool(mode=mode, workers=4, queue_depth=CONCURRENCY,
+                                               initializer=api.single_threaded_models)
+            await client.post("/predict-batch", json=BATCH)  # Warm up workers
+            batch, health, statuses, wall = await run_load(client)
+            print(f"{mode:>8} {percentile(batch, 50):>8.1f}ms {percentile(batch, 99):>8.1f}ms "
+                  f"{percentile(health, 50):>9.1f}ms {percentile(health, 99):>9.1f}ms "
+                  f"{len(batch) / wall:>7.1f} {statuses.count(503):>5}")
+
+        # Saturation: a small queue should reject quickly rather than pile up
+        api.INFERENCE_POOL.shutdown(wait=True)
+        api.INFERENCE_POOL = InferencePool(mode='thread', workers=2, queue_depth=2)
+        results = await asyncio.gather(*[
+            timed(client, "POST", "/predict-batch", json=BATCH) for _ in range(CONCURRENCY)
+        ])
+        rejected = [elapsed for status, elapsed in results if status == 503]
+        print(f"\n🚦 Saturation (2 workers, queue 2): {len(rejected)}/{CONCURRENCY} rejected, "
+              f"p99 rejection latency {percentile(rejected, 99):.1f}ms")
+
+        # Micro-batching: concurrent single /predict calls with and without coalescing
+        api.INFERENCE_POOL = InferencePool(mode='thread', workers=4, queue_depth=256)
+        print(f"\n{'window':>8} {'clients':>8} {'p50':>9} {'p99':>9} {'req/s':>8} {'batch size':>11}")
+        for window_ms in [0, 2, 5]:
+            for clients in [1, 16, 64, 256]:
+                api.PREDICT_BATCHER = MicroBatcher(api.predict_many, api.run_inference,
+                                                   max_batch=64, window_ms=window_ms)
+                await client.post("/predict", json=SINGLES[0])  # Warm up
+                latencies = []
+                start = time.perf_counter()
+                for round_ in range(ROUNDS):
+                    results = await asyncio.gather(*[
+                        timed(client, "POST", "/predict", json=SINGLES[(round_ * clients + k) % len(SINGLES)])
+                        for k in range(clients)
+                    ])
+                    latencies.extend(elapsed for status, elapsed in results if status == 200)
+                wall = time.perf_counter() - start
+                label = "off" if window_ms == 0 else f"{window_ms}ms"
+                print(f"{label:>8} {clients:>8} {percentile(latencies, 50):>7.1f}ms {percentile(latencies, 99):>7.1f}ms "
+                      f"{len(latencies) / wall:>8.1f} {api.PREDICT_BATCHER.stats()['meanBatchSize']:>11}")
+        api.INFERENCE_POOL.shutdown(wait=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
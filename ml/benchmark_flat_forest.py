@@ -0,0 +1,74 @@
+# benchmark_flat_forest.py
+# Check the flattened NumPy forests against sklearn and compare their speed
+import os
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+import joblib
+import numpy as np
+
+from flat_forest import FlatForest, export_forest, flat_path
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+print("="*60)
+print("🌲 FLAT FOREST vs SKLEARN")
+print("="*60)
+
+volume_model = joblib.load(os.path.join(MODEL_DIR, 'waste_volume_regressor.pkl'))
+risk_model = joblib.load(os.path.join(MODEL_DIR, 'risk_level_classifier.pkl'))
+flat_volume = FlatForest(export_forest(volume_model))
+flat_risk = FlatForest(export_forest(risk_model))
+
+def random_features(n, seed=0):
+    """Rows spread over the training feature ranges"""
+    rng = np.random.default_rng(seed)
+    population = rng.uniform(10, 80000, n)
+    return np.column_stack([
+        population,
+        population * 0.42 * rng.uniform(0.5, 2.5, n),
+        rng.choice([0, 5, 20, 40], n) + rng.uniform(0, 5, n),
+        rng.uniform(24, 35, n),
+        rng.integers(0, 7, n),
+        rng.integers(1, 13, n),
+        rng.integers(1, 32, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+    ]).astype(np.float64)
+
+X = random_features(20000)
+identical_volume = np.array_equal(volume_model.predict(X), flat_volume.predict(X))
+identical_proba = np.array_equal(risk_model.predict_proba(X), flat_risk.predict_proba(X))
+identical_class = np.array_equal(risk_model.predict(X), flat_risk.predict(X))
+print(f"\n🔬 Bit-identical on {len(X):,} rows: volume={identical_volume}, "
+      f"proba={identical_proba}, class={identical_class}")
+
+wpm_path = flat_path(os.path.join(MODEL_DIR, 'waste_volume_regressor.pkl'))
+if os.path.exists(wpm_path):
+    identical_wpm = np.array_equal(volume_model.predict(X), FlatForest.load(wpm_path).predict(X))
+    print(f"🔬 Memory-mapped {os.path.basename(wpm_path)} bit-identical: {identical_wpm}")
+
+def best_of(fn, repeats=5):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+print(f"\n{'rows':>8} {'sk predict':>11} {'flat':>9} {'speedup':>8} {'sk proba':>10} {'flat':>9} {'speedup':>8}")
+for n in [1, 10, 80, 800, 8000, 80000]:
+    Xn = random_features(n, seed=n)
+    repeats = 5 if n <= 8000 else 2
+    sk_volume = best_of(lambda: volume_model.predict(Xn), repeats)
+    fl_volume = best_of(lambda: flat_volume.predict(Xn), repeats)
+    sk_risk = best_of(lambda: risk_model.predict_proba(Xn), repeats)
+    fl_risk = best_of(lambda: flat_risk.predict_proba(Xn), repeats)
+    print(f"{n:>8} {sk_volume * 1000:>9.2f}ms {fl_volume * 1000:>7.2f}ms {sk_volume / fl_volume:>7.1f}x "
+          f"{sk_risk * 1000:>8.2f}ms {fl_risk * 1000:>7.2f}ms {sk_risk / fl_risk:>7.1f}x")
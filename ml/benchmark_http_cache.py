@@ -0,0 +1,80 @@
+# benchmark_http_cache.py
+# Bytes on the wire and latency for a typical 80-barangay payload: plain,
+# compressed, and revalidated with If-None-Match (304)
+import os
+import time
+import asyncio
+import warnings
+warnings.filterwarnings('ignore')
+
+import httpx
+import numpy as np
+
+import api
+import http_cache
+from api_logging import configure_logging
+
+configure_logging(level="WARNING", stream=open(os.devnull, 'w'))
+
+REPEATS = 20
+
+BATCH = {"barangays": [
+    {
+        "barangay_id": str(i),
+        "barangay_name": name,
+        "population": waste / 0.42,
+        "population_density": 100,
+        "bin_capacity": waste * 1.5,
+        "rainfall_mm": 12.5,
+        "temperature_c": 29,
+        "day_of_week": i % 7,
+        "prediction_date": "2025-08-21",
+    }
+    for i, (name, waste) in enumerate(api.HISTORICAL_WASTE_CSV.items())
+]}
+
+FORECAST = {"days": 7, "barangays": [
+    {"barangay_id": b["barangay_id"], "barangay_name": b["barangay_name"], "population": b["population"]}
+    for b in BATCH["barangays"]
+]}
+
+ENDPOINTS = [
+    ("GET /api/metrics", "GET", "/api/metrics", None),
+    ("POST /predict-batch", "POST", "/predict-batch", BATCH),
+    ("POST /forecast-range (7d)", "POST", "/forecast-range", FORECAST),
+]
+
+async def measure(client, method, url, body, headers):
+    """(median ms, wire bytes, status)"""
+    timings, response = [], None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        response = await client.request(method, url, json=body, headers=headers)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000, response.num_bytes_downloaded, response.status_code
+
+async def main():
+    encodings = ['identity', 'gzip'] + (['br'] if http_cache.brotli is not None else [])
+    print("="*60)
+    print("⏱️  CONDITIONAL GET / COMPRESSION BENCHMARK")
+    print(f"   {len(BATCH['barangays'])} barangays, median of {REPEATS} requests")
+    print("="*60)
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.app.router.lifespan_context(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            print(f"\n{'endpoint':>26} {'variant':>10} {'status':>7} {'bytes':>9} {'saved':>7} {'latency':>9}")
+            for label, method, url, body in ENDPOINTS:
+                await client.request(method, url, json=body)  # Warm up
+                baseline = None
+                for encoding in encodings:
+                    ms, size, status = await measure(client, method, url, body, {'accept-encoding': encoding})
+                    baseline = baseline or size
+                    print(f"{label:>26} {encoding:>10} {status:>7} {size:>9,} {1 - size / baseline:>6.0%} {ms:>7.2f}ms")
+                etag = (await client.request(method, url, json=body)).headers['etag']
+                ms, size, status = await measure(client, method, url, body,
+                                                 {'accept-encoding': 'gzip', 'if-none-match': etag})
+                print(f"{label:>26} {'304':>10} {status:>7} {size:>9,} {1 - size / baseline:>6.0%} {ms:>7.2f}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+# benchmark_inference.py
+# Compare the batched /predict-batch engine against the old per-barangay loop
+import time
+import random
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+import api
+from prediction_cache import PredictionCache
+
+print("="*60)
+print("⏱️  BATCH INFERENCE BENCHMARK")
+print("="*60)
+
+if not api.MODELS.loaded:
+    print("❌ Models not loaded - run train_waste_model.py first")
+    raise SystemExit(1)
+
+# Scoring sections time the models, so keep the prediction cache out of them
+api.PREDICTION_CACHE = PredictionCache(max_entries=0)
+
+RISK_MAP = {0: 'safe', 1: 'moderate', 2: 'high'}
+
+def make_requests(n, seed=42):
+    """Build n requests cycling through all 80 barangays with random weather"""
+    rng = random.Random(seed)
+    names = list(api.HISTORICAL_WASTE_CSV)
+    requests = []
+    for i in range(n):
+        name = names[i % len(names)]
+        day = rng.randint(1, 28)
+        month = rng.randint(1, 12)
+        requests.append(api.PredictionRequest(
+            barangay_id=str(i),
+            barangay_name=name,
+            population=api.HISTORICAL_WASTE_CSV[name] / 0.42,
+            population_density=100,
+            bin_capacity=api.HISTORICAL_WASTE_CSV[name] * 1.5,
+            rainfall_mm=rng.uniform(0, 40),
+            temperature_c=rng.uniform(24, 35),
+            is_market_day=rng.randint(0, 1),
+            day_of_week=rng.randint(0, 6),
+            prediction_date=f"2025-{month:02d}-{day:02d}"
+        ))
+    return requests
+
+def legacy_score(barangays):
+    """The original loop: three model calls per barangay, rules applied row by row"""
+    results = []
+    for i, barangay in enumerate(barangays):
+        features_list, event_flags = api.calculate_features(barangay)
+        features = np.array([features_list])
+        volume_value = float(api.MODELS.volume_model.predict(features)[0])
+        risk_proba = api.MODELS.risk_model.predict_proba(features)
+        risk_value = int(api.MODELS.risk_model.predict(features)[0])
+        confidence_value = float(max(risk_proba[0]))
+        risk_level = RISK_MAP.get(risk_value, 'moderate')
+
+        if risk_proba[0][1] >= 0.5:
+            if volume_value > 20000:
+                risk_level, confidence_value = 'high', 0.95
+            elif volume_value > 10000:
+                risk_level, confidence_value = 'high', 0.88
+            elif volume_value > 5000:
+                risk_level, confidence_value = 'moderate', max(0.75, confidence_value)
+            elif volume_value < 1000:
+                risk_level, confidence_value = 'safe', 0.90
+            else:
+                risk_level, confidence_value = 'moderate', max(0.70, confidence_value)
+
+        if event_flags['event_multiplier'] > 1.8:
+            risk_level, confidence_value = 'high', 0.92
+        elif event_flags['event_multiplier'] > 1.3 and risk_level != 'high':
+            risk_level, confidence_value = 'moderate', max(0.80, confidence_value)
+
+        if i % 10 == 0 and volume_value > 3000:
+            risk_level, confidence_value = 'high', 0.85
+        elif i % 7 == 0 and volume_value < 2000:
+            risk_level, confidence_value = 'safe', 0.88
+
+        results.append((volume_value, risk_level, confidence_value))
+    return results
+
+print(f"\n{'N':>8} {'legacy (s)':>12} {'batched (s)':>12} {'speedup':>9}  identical")
+for n in [80, 800, 8000]:
+    requests = make_requests(n)
+
+    # The legacy loop is too slow to run in full at large N, so time a slice and extrapolate
+    legacy_n = min(n, 800)
+    start = time.perf_counter()
+    expected = legacy_score(requests[:legacy_n])
+    legacy_time = (time.perf_counter() - start) * n / legacy_n
+
+    start = time.perf_counter()
+    predictions = api.score_batch(requests)
+    batch_time = time.perf_counter() - start
+
+    got = [(p['predictedVolume'], p['overflowRisk'], p['confidence']) for p in predictions[:legacy_n]]
+    identical = got == expected
+    note = "" if legacy_n == n else f" (legacy extrapolated from {legacy_n})"
+    print(f"{n:>8} {legacy_time:>12.3f} {batch_time:>12.3f} {legacy_time / batch_time:>8.1f}x  {identical}{note}")
+
+# ============================================================================
+# MULTI-DAY FORECAST: /forecast-range vs one /predict-batch per day
+# ============================================================================
+print(f"\n{'days':>8} {'per-day (s)':>12} {'range (s)':>12} {'speedup':>9}")
+names = list(api.HISTORICAL_WASTE_CSV)
+forecast_barangays = [
+    api.ForecastBarangay(barangay_id=str(i), barangay_name=name,
+                         population=api.HISTORICAL_WASTE_CSV[name] / 0.42)
+    for i, name in enumerate(names)
+]
+for days in [7, 30, 90]:
+    range_request = api.ForecastRangeRequest(barangays=forecast_barangays, start_date="2025-01-01", days=days)
+
+    start = time.perf_counter()
+    for date in api.forecast_dates("2025-01-01", days=days).astype(str):
+        api.score_batch([api.PredictionRequest(
+            barangay_id=b.barangay_id, barangay_name=b.barangay_name, population=b.population,
+            population_density=100, bin_capacity=1, prediction_date=date
+        ) for b in forecast_barangays])
+    per_day_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    api.score_forecast_range(range_request)
+    range_time = time.perf_counter() - start
+    print(f"{days:>8} {per_day_time:>12.3f} {range_time:>12.3f} {per_day_time / range_time:>8.1f}x")
+
+# ============================================================================
+# LOGGING OVERHEAD: batch scoring + volume categories per log configuration
+# ============================================================================
+import os
+from api_logging import configure_logging
+
+print(f"\n{'N':>8} {'config':>22} {'time (s)':>10} {'overhead':>9}")
+devnull = open(os.devnull, 'w')
+for n in [80, 8000]:
+    requests = make_requests(n)
+    baseline = None
+    for level, rate in [("WARNING", 1.0), ("INFO", 1.0), ("DEBUG", 0.1), ("DEBUG", 1.0)]:
+        configure_logging(level=level, sample_rate=rate, stream=devnull)
+        start = time.perf_counter()
+        for _ in range(5):
+            api.calculate_volume_risk_categories(api.score_batch(requests))
+        elapsed = (time.perf_counter() - start) / 5
+        baseline = baseline or elapsed
+        label = f"{level} (sample {rate:g})"
+        print(f"{n:>8} {label:>22} {elapsed:>10.4f} {(elapsed / baseline - 1) * 100:>8.1f}%")
+configure_logging()
+
+# ============================================================================
+# PREDICTION CACHE: repeated requests, cold vs warm
+# ============================================================================
+print(f"\n{'workload':>24} {'no cache (s)':>13} {'cold (s)':>10} {'warm (s)':>10} {'speedup':>9}  identical")
+strip = lambda rows: [{k: v for k, v in row.items() if k != 'timestamp'} for row in rows]
+range_request = api.ForecastRangeRequest(barangays=forecast_barangays, start_date="2025-01-01", days=30)
+half_new = make_requests(800, seed=1)[:400] + make_requests(800, seed=2)[:400]
+workloads = [
+    ("dashboard batch x80", lambda: strip(api.score_batch(make_requests(80)))),
+    ("batch x8000", lambda: strip(api.score_batch(make_requests(8000)))),
+    ("30-day forecast-range", lambda: {d: strip(v) for d, v in api.score_forecast_range(range_request).items()}),
+]
+for label, workload in workloads:
+    api.PREDICTION_CACHE = PredictionCache(max_entries=0)
+    start = time.perf_counter()
+    expected = workload()
+    uncached = time.perf_counter() - start
+
+    api.PREDICTION_CACHE = PredictionCache(max_entries=50000)
+    start = time.perf_counter()
+    workload()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    got = workload()
+    warm = time.perf_counter() - start
+    print(f"{label:>24} {uncached:>13.3f} {cold:>10.3f} {warm:>10.3f} {uncached / warm:>8.1f}x  {got == expected}")
+
+api.PREDICTION_CACHE = PredictionCache(max_entries=50000)
+api.score_batch(make_requests(800, seed=1))
+start = time.perf_counter()
+api.score_batch(half_new)
+elapsed = time.perf_counter() - start
+stats = api.PREDICTION_CACHE.stats()
+print(f"\n   800 rows, half cached: {elapsed:.3f}s "
+      f"({stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries)")
+api.PREDICTION_CACHE = PredictionCache(max_entries=0)
+
+# ============================================================================
+# FORECAST CUBE: default-weather forecast-range answered by slicing
+# ============================================================================
+from forecast_cube import ForecastCubeStore
+
+print(f"\n{'days':>8} {'live (s)':>10} {'cube (s)':>10} {'speedup':>9}  identical")
+roster = api.forecast_cube_roster()
+api.FORECAST_CUBE = ForecastCubeStore(days=30)
+start = time.perf_counter()
+api.FORECAST_CUBE.install(api.build_forecast_cube(30, roster))
+print(f"   build: 30 days x {len(roster)} barangays in {time.perf_counter() - start:.3f}s")
+for days in [1, 7, 30]:
+    range_request = api.ForecastRangeRequest(barangays=roster, days=days)
+    start = time.perf_counter()
+    expected = {d: strip(v) for d, v in api.score_forecast_range(range_request).items()}
+    live = time.perf_counter() - start
+    start = time.perf_counter()
+    got = {d: strip(v) for d, v in api.forecast_from_cube(range_request).items()}
+    cube = time.perf_counter() - start
+    print(f"{days:>8} {live:>10.3f} {cube:>10.3f} {live / cube:>8.1f}x  {got == expected}")
+
+# ============================================================================
+# PREDICTION INTERVALS: P10/P50/P90 + std from per-tree volumes
+# ============================================================================
+def best_of(fn, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+print(f"\n{'N':>8} {'point (s)':>10} {'bands (s)':>10} {'ratio':>7}  identical points")
+for n in [80, 800, 8000, 80000]:
+    requests = make_requests(n)
+    point_time, expected = best_of(lambda: api.score_batch(requests))
+    bands_time, got = best_of(lambda: api.score_batch(requests, intervals=True))
+    identical = all(a['predictedVolume'] == b['predictedVolume'] and a['overflowRisk'] == b['overflowRisk']
+                    for a, b in zip(expected, got))
+    print(f"{n:>8} {point_time:>10.3f} {bands_time:>10.3f} {bands_time / point_time:>6.2f}x  {identical}")
+
+# ============================================================================
+# FEATURE ATTRIBUTION: per-row volume and risk contributions
+# ============================================================================
+print(f"\n{'N':>8} {'point (s)':>10} {'explain (s)':>12} {'ratio':>7}  max |base + sum - volume|")
+for n in [80, 800, 8000]:
+    requests = make_requests(n)
+    point_time, expected = best_of(lambda: api.score_batch(requests))
+    explain_time, got = best_of(lambda: api.explain_batch(requests))
+    error = max(abs(e['volumeBase'] + sum(c['volumeKg'] for c in e['contributions']) - e['predictedVolume'])
+                for e in got)
+    print(f"{n:>8} {point_time:>10.3f} {explain_time:>12.3f} {explain_time / point_time:>6.2f}x  {error:.3f}")
@@ -0,0 +1,162 @@
+# columnar.py
+# Column-per-field encodings for large /predict-batch calls.
+#
+# A columnar request is one object mapping each PredictionRequest field to an
+# array of values (or a single value shared by every row), so validation is
+# one np.asarray per column instead of one Pydantic model per barangay. The
+# response carries modelVersion and the timestamp once, plus one array per
+# output. Three encodings, chosen by Content-Type on the way in and by
+# Accept on the way out:
+#
+#   application/json       {"population": [...], "barangay_name": [...], ...}
+#   application/x-wpm      the .wpm container (model_format) in memory:
+#                          numeric columns as little-endian arrays, string
+#                          columns in the metadata under "columns"
+#   application/msgpack    same shape as JSON; needs the msgpack package
+#                          (in requirements.txt). Without it the type is not
+#                          offered and msgpack bodies get a 415
+import json
+
+import numpy as np
+
+from model_format import decode_model, encode_model
+
+try:
+    import msgpack
+except ImportError:  # Optional; the binary .wpm encoding needs nothing extra
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+WPM = 'application/x-wpm'
+MEDIA_ALIASES = {'application/x-msgpack': MSGPACK, 'application/vnd.msgpack': MSGPACK}
+
+class UnsupportedMediaType(ValueError):
+    """The request body uses an encoding this server cannot read"""
+
+def supported_media_types() -> list:
+    """Encodings offered by this server, most preferred first"""
+    return [JSON, WPM] + ([MSGPACK] if msgpack is not None else [])
+
+def _media_type(value: str) -> str:
+    media = (value or '').split(';')[0].strip().lower()
+    return MEDIA_ALIASES.get(media, media)
+
+def negotiate(accept: str = None):
+    """
+    Response encoding for an Accept header: the supported type with the
+    highest q-value (earliest listed on ties), JSON for a missing header or
+    a wildcard, None when nothing acceptable is supported.
+    """
+    if not accept:
+        return JSON
+    supported = supported_media_types()
+    best, best_q = None, 0.0
+    for part in accept.split(','):
+        media = _media_type(part)
+        q = 1.0
+        for param in part.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in ('*/*', 'application/*'):
+            media = JSON
+        if media in supported and q > best_q:
+            best, best_q = media, q
+    return best
+
+def decode_columns(body: bytes, content_type: str = None) -> dict:
+    """Raw {field: values} of a columnar request body"""
+    media = _media_type(content_type) or JSON
+    try:
+        if media == JSON:
+            columns = json.loads(body)
+        elif media == WPM:
+            arrays, metadata = decode_model(body)
+            columns = {**metadata.get('columns', {}), **arrays}
+        elif media == MSGPACK and msgpack is not None:
+            columns = msgpack.unpackb(body, raw=False)
+        else:
+            raise UnsupportedMediaType(
+                f"Unsupported Content-Type '{media}'; use one of {', '.join(supported_media_types())}")
+    except UnsupportedMediaType:
+        raise
+    except Exception as e:
+        raise ValueError(f"Could not decode {media} body: {e}")
+    if not isinstance(columns, dict):
+        raise ValueError("A columnar batch must be an object of {field: values}")
+    return columns
+
+def model_fields(model) -> list:
+    """[(name, kind, required, default)] of a Pydantic model; kind is 'str', 'int' or 'float'"""
+    fields = []
+    for name, info in model.model_fields.items():
+        kind = {int: 'int', float: 'float'}.get(info.annotation, 'str')
+        fields.append((name, kind, info.is_required(), None if info.is_required() else info.default))
+    return fields
+
+def _is_column(value) -> bool:
+    return isinstance(value, (list, tuple, np.ndarray)) and np.ndim(value) > 0
+
+def normalize_columns(raw: dict, fields) -> tuple:
+    """
+    (row count, {field: column}) with every field present: numeric fields as
+    float64 arrays, string fields as lists. Single values are broadcast and
+    missing optional fields take their default. Raises ValueError naming the
+    offending column.
+    """
+    known = {name for name, *_ in fields}
+    unknown = sorted(set(raw) - known)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    lengths = {name: len(value) for name, value in raw.items() if _is_column(value)}
+    if not lengths:
+        raise ValueError("At least one field must be given as an array")
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"Columns have different lengths: {lengths}")
+    n = next(iter(lengths.values()))
+
+    columns = {}
+    for name, kind, required, default in fields:
+        if name not in raw:
+            if required:
+                raise ValueError(f"Missing required column '{name}'")
+            value = default
+        else:
+            value = raw[name]
+        if kind == 'str':
+            if _is_column(value):
+                columns[name] = [default if v is None else str(v) for v in value]
+            else:
+                columns[name] = [default if value is None else str(value)] * n
+            continue
+        try:
+            column = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Column '{name}' must be numeric")
+        if column.ndim > 1:
+            raise ValueError(f"Column '{name}' must be one-dimensional")
+        if not np.isfinite(column).all():
+            raise ValueError(f"Column '{name}' contains missing or non-finite values")
+        if kind == 'int' and (column != np.round(column)).any():
+            raise ValueError(f"Column '{name}' must hold whole numbers")
+        columns[name] = np.broadcast_to(column, (n,)) if column.ndim == 0 else column
+    return n, columns
+
+def encode_columns(columns: dict, metadata: dict, media_type: str) -> bytes:
+    """
+    Response body for {output: array or list}. For .wpm, ndarray columns
+    become container arrays and the rest go in the metadata under "columns".
+    """
+    if media_type == WPM:
+        arrays = {name: value for name, value in columns.items() if isinstance(value, np.ndarray)}
+        other = {name: value for name, value in columns.items() if name not in arrays}
+        return encode_model(arrays, {**metadata, 'columns': other})
+    body = {**metadata, 'columns': {name: value.tolist() if isinstance(value, np.ndarray) else value
+                                    for name, value in columns.items()}}
+    if media_type == MSGPACK and msgpack is not None:
+        return msgpack.packb(body, use_bin_type=True)
+    return json.dumps(body, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,211 @@
+# event_calendar.py
+# Compiled view of cdo_events.json: dense (366 day-of-year x barangay) arrays
+# so event lookups for a whole batch or date range are a single fancy-index.
+import os
+import json
+from collections import namedtuple
+
+import numpy as np
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Day-of-year offsets in a leap year, so 02-29 gets its own slot
+LEAP_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+CompiledCalendar = namedtuple('CompiledCalendar', [
+    'data',              # Raw events JSON
+    'barangay_index',    # Normalized barangay name -> column
+    'multiplier',        # (366, B+1) float64 product of event multipliers
+    'is_fiesta',         # (366, B+1) int8
+    'is_holiday',        # (366, B+1) int8
+    'name_ids',          # (366, B+1) int32 index into name_sets
+    'name_sets',         # List of event-name tuples, entry 0 is ()
+    'market',            # (7, B+1) bool, indexed by weekday (Monday=0)
+    'market_multiplier',
+])
+
+def normalize_name(name) -> str:
+    """Case/whitespace-insensitive barangay key; bare integers mean 'Barangay N'"""
+    if isinstance(name, int):
+        name = f"Barangay {name}"
+    return " ".join(str(name).lower().split())
+
+def day_of_year_index(dates):
+    """0-365 slot of each datetime64 date, using leap-year numbering"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    months = dates.astype('datetime64[M]')
+    month = months.astype(np.int64) % 12
+    day = (dates - months).astype(np.int64)
+    return LEAP_MONTH_OFFSETS[month] + day
+
+def weekday_index(dates):
+    """Python weekday (Monday=0) of each datetime64 date"""
+    # 1970-01-01 was a Thursday
+    return (np.asarray(dates, dtype='datetime64[D]').astype(np.int64) + 3) % 7
+
+class EventCalendar:
+    """
+    Event calendar compiled from cdo_events.json.
+    Barangay names are matched exactly (ignoring case and extra whitespace),
+    so "Barangay 1" no longer picks up events for "Barangay 10"-"Barangay 19".
+    Names the calendar has never seen share one extra column that only
+    receives events affecting "all" barangays. The file is recompiled
+    automatically when its modification time changes.
+    """
+
+    def __init__(self, path: str, barangay_names=()):
+        self.path = path
+        self.barangay_names = list(barangay_names)
+        self._mtime = object()
+        self.compiled = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Recompile if the events file changed on disk; returns True if it did"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception:
+            data = {"events": [], "weekly_patterns": {}}
+
+        # Swap in a fully built calendar so readers never see a partial one
+        self.compiled = self._compile(data)
+        self._mtime = mtime
+        return True
+
+    @property
+    def data(self):
+        self.refresh()
+        return self.compiled.data
+
+    def _compile(self, data) -> CompiledCalendar:
+        events = data.get("events", [])
+        market_info = data.get("weekly_patterns", {}).get("market_days", {})
+
+        names = [normalize_name(n) for n in self.barangay_names]
+        for event in events:
+            if isinstance(event.get("affected_barangays"), list):
+                names.extend(normalize_name(b) for b in event["affected_barangays"])
+        names.extend(normalize_name(b) for b in market_info.get("barangays", []))
+        barangay_index = {}
+        for name in names:
+            barangay_index.setdefault(name, len(barangay_index))
+        n_columns = len(barangay_index) + 1  # Last column: unknown barangays
+
+        multiplier = np.ones((366, n_columns))
+        is_fiesta = np.zeros((366, n_columns), dtype=np.int8)
+        is_holiday = np.zeros((366, n_columns), dtype=np.int8)
+        cell_names = {}
+
+        for event in events:
+            days = []
+            for month_day in event.get("dates", []):
+                try:
+                    month, day = (int(part) for part in month_day.split("-"))
+                    days.append(LEAP_MONTH_OFFSETS[month - 1] + day - 1)
+                except (ValueError, IndexError):
+                    continue
+            affected = event.get("affected_barangays", [])
+            if affected == "all":
+                columns = list(range(n_columns))
+            elif isinstance(affected, list):
+                columns = sorted({barangay_index[normalize_name(b)] for b in affected})
+            else:
+                columns = []
+            if not days or not columns:
+                continue
+
+            rows, cols = np.ix_(np.unique(days), columns)
+            multiplier[rows, cols] *= event.get("waste_multiplier", 1.0)
+            if event.get("type") == "festival":
+                is_fiesta[rows, cols] = 1
+            elif event.get("type") == "holiday":
+                is_holiday[rows, cols] = 1
+            for d in np.unique(days):
+                for c in columns:
+                    cell_names.setdefault((d, c), []).append(event.get("name", "Unknown"))
+
+        name_sets = [()]
+        name_set_ids = {(): 0}
+        name_ids = np.zeros((366, n_columns), dtype=np.int32)
+        for (d, c), event_names in cell_names.items():
+            key = tuple(event_names)
+            if key not in name_set_ids:
+                name_set_ids[key] = len(name_sets)
+                name_sets.append(key)
+            name_ids[d, c] = name_set_ids[key]
+
+        market = np.zeros((7, n_columns), dtype=bool)
+        market_days = [DAY_NAMES.index(d) for d in market_info.get("days", []) if d in DAY_NAMES]
+        market_columns = [barangay_index[normalize_name(b)] for b in market_info.get("barangays", [])]
+        market[np.ix_(market_days, market_columns)] = True
+
+        return CompiledCalendar(
+            data=data,
+            barangay_index=barangay_index,
+            multiplier=multiplier,
+            is_fiesta=is_fiesta,
+            is_holiday=is_holiday,
+            name_ids=name_ids,
+            name_sets=name_sets,
+            market=market,
+            market_multiplier=float(market_info.get("multiplier", 1.0)),
+        )
+
+    def has_market(self, barangay_names) -> list:
+        """Whether each barangay is listed under weekly_patterns.market_days"""
+        listed = self.data.get("weekly_patterns", {}).get("market_days", {}).get("barangays", [])
+        listed = {normalize_name(b) for b in listed}
+        return [normalize_name(n) in listed for n in barangay_names]
+
+    def lookup(self, dates, barangay_names, with_names: bool = True):
+        """
+        Event flags for datetime64 `dates` broadcast against a 1-D list of
+        barangay names, e.g. dates[:, None] with B names gives (days, B)
+        arrays, and N dates with N names gives (N,) arrays. Keys match
+        check_events_for_barangay; 'event_names' are nested lists shaped
+        like the result and are skipped when with_names is False.
+        """
+        self.refresh()
+        compiled = self.compiled
+        unknown = len(compiled.barangay_index)
+        columns = np.array(
+            [compiled.barangay_index.get(normalize_name(n), unknown) for n in barangay_names],
+            dtype=np.intp
+        )
+        day_index = day_of_year_index(dates)
+        weekday = weekday_index(dates)
+
+        market = compiled.market[weekday, columns]
+        multiplier = compiled.multiplier[day_index, columns]
+        name_ids = compiled.name_ids[day_index, columns]
+        flags = {
+            'is_fiesta': compiled.is_fiesta[day_index, columns],
+            'is_holiday': compiled.is_holiday[day_index, columns],
+            'is_special_event': (name_ids != 0).astype(np.int8),
+            'is_weekend_market': market.astype(np.int8),
+            'event_multiplier': np.where(market, multiplier * compiled.market_multiplier, multiplier),
+        }
+        if with_names:
+            flags['event_names'] = self._expand_names(compiled, name_ids, market)
+        return flags
+
+    @staticmethod
+    def _expand_names(compiled, name_ids, market):
+        """Nested lists of event names (plus 'Market Day') shaped like name_ids"""
+        name_sets = compiled.name_sets
+        flat = [
+            list(name_sets[i]) + (["Market Day"] if m and "Market Day" not in name_sets[i] else [])
+            for i, m in zip(name_ids.ravel().tolist(), market.ravel().tolist())
+        ]
+        if name_ids.ndim <= 1:
+            return flat
+        width = name_ids.shape[-1]
+        return [flat[i:i + width] for i in range(0, len(flat), width)]
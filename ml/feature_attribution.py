@@ -0,0 +1,96 @@
+# feature_attribution.py
+# Per-prediction feature contributions for the volume and risk forests.
+#
+# FlatForest.contributions() walks every tree for the whole batch at once and
+# credits each split's change in predicted value to the split feature, so a
+# row's output is exactly the forest's base value plus its 14 contributions.
+# This module names the model features and shapes those arrays into the
+# /predict "factors" list and the /explain-batch response.
+import functools
+
+import numpy as np
+
+from flat_forest import FlatForest
+
+# Column order of calculate_features (and training_data.FEATURES)
+FEATURES = [
+    'population', 'base_waste', 'rainfall_mm', 'temperature_c',
+    'day_of_week', 'month', 'day_of_month',
+    'is_weekend', 'is_market_day', 'is_fiesta',
+    'is_holiday', 'is_payday', 'is_rainy_season', 'is_summer'
+]
+FEATURE_LABELS = {
+    'population': 'Population',
+    'base_waste': 'Historical Waste',
+    'rainfall_mm': 'Rainfall',
+    'temperature_c': 'Temperature',
+    'day_of_week': 'Day of Week',
+    'month': 'Month',
+    'day_of_month': 'Day of Month',
+    'is_weekend': 'Weekend',
+    'is_market_day': 'Market Day',
+    'is_fiesta': 'Fiesta',
+    'is_holiday': 'Holiday',
+    'is_payday': 'Payday',
+    'is_rainy_season': 'Rainy Season',
+    'is_summer': 'Summer',
+}
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+@functools.lru_cache(maxsize=4)
+def _flattened(model) -> FlatForest:
+    return FlatForest.from_model(model)
+
+def forest_contributions(model, X):
+    """(bias, rows x features x outputs contributions); sklearn forests are flattened once and kept"""
+    flat = model if isinstance(model, FlatForest) else _flattened(model)
+    return flat.contributions(np.asarray(X, dtype=np.float64))
+
+def format_value(feature: str, value: float) -> str:
+    if feature == 'population':
+        return f"{value:,.0f}"
+    if feature == 'base_waste':
+        return f"{value:.0f} kg"
+    if feature == 'rainfall_mm':
+        return f"{value:g} mm"
+    if feature == 'temperature_c':
+        return f"{value:g} °C"
+    if feature == 'day_of_week':
+        return WEEKDAYS[int(value) % 7]
+    if feature.startswith('is_'):
+        return 'Yes' if value else 'No'
+    return f"{value:g}"
+
+def top_factors(volume_contributions, features, top: int = 4) -> list:
+    """
+    One row's largest volume contributions as /predict "factors";
+    importance is the feature's share of the row's total absolute change
+    """
+    total = float(np.abs(volume_contributions).sum()) or 1.0
+    order = np.argsort(-np.abs(volume_contributions), kind='stable')[:top]
+    return [{
+        "feature": FEATURE_LABELS[FEATURES[f]],
+        "value": format_value(FEATURES[f], features[f]),
+        "importance": round(abs(float(volume_contributions[f])) / total, 3),
+        "contributionKg": round(float(volume_contributions[f]), 2),
+    } for f in order.tolist()]
+
+def explanation(volume_bias: float, volume_contributions, risk_bias, risk_contributions, risk_index: int,
+                features) -> dict:
+    """
+    One row's full attribution: the forests' base values and every
+    feature's contribution to the volume (kg) and to the probability of
+    the risk class the model picked, largest volume effect first
+    """
+    order = np.argsort(-np.abs(volume_contributions), kind='stable')
+    return {
+        "volumeBase": round(float(volume_bias), 2),
+        "riskProbabilityBase": round(float(risk_bias[risk_index]), 4),
+        "contributions": [{
+            "feature": FEATURES[f],
+            "label": FEATURE_LABELS[FEATURES[f]],
+            "value": float(features[f]),
+            "volumeKg": round(float(volume_contributions[f]), 2),
+            "riskProbability": round(float(risk_contributions[f, risk_index]), 4),
+        } for f in order.tolist()],
+    }
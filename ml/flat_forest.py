@@ -0,0 +1,259 @@
+# flat_forest.py
+# Flattened RandomForest inference in pure NumPy.
+#
+# export_forest() turns a fitted sklearn RandomForestRegressor/Classifier into
+# contiguous node arrays (feature, threshold, left, right, value) covering all
+# trees; FlatForest evaluates every tree for every row at once, one tree level
+# per step. Loading and predicting never import sklearn, and the results are
+# bit-identical to the sklearn estimator the arrays were exported from.
+# Saved forests use the .wpm container (model_format.py) and are memory-mapped
+# on load, so worker processes share the node arrays.
+#
+# Usage: python flat_forest.py   (exports the two .pkl models next to it to .wpm)
+import os
+import sys
+
+import numpy as np
+
+from model_format import read_model, write_model
+
+FORMAT_VERSION = 2
+
+# Rows evaluated per step; bounds the (trees x rows) index matrices in memory
+CHUNK_ROWS = 1024
+
+def _preorder(tree) -> np.ndarray:
+    """Node ids in left-first preorder, so every left child directly follows its parent"""
+    order, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if tree.children_left[node] >= 0:
+            stack.append(tree.children_right[node])
+            stack.append(tree.children_left[node])
+    return np.array(order, dtype=np.int64)
+
+def export_forest(model) -> dict:
+    """
+    Flatten a fitted RandomForestRegressor or RandomForestClassifier.
+    Nodes are laid out in preorder with global child indices, so a left
+    child is always node + 1. Leaves point at themselves with a NaN
+    threshold: no value compares <= NaN, so every row at a leaf (even one
+    holding -inf) takes the right branch back to the leaf, and the
+    level-by-level walk can keep going once a row has reached it.
+    """
+    import sklearn
+
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    is_classifier = hasattr(model, 'classes_')
+    n_classes = len(model.classes_) if is_classifier else 1
+    old_value_layout = tuple(int(p) for p in sklearn.__version__.split('.')[:2]) < (1, 4)
+
+    sizes = np.array([t.node_count for t in trees], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    feature, threshold, left, right, missing_left, values = [], [], [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        order = _preorder(tree)
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        nodes = np.arange(len(order), dtype=np.int64) + offset
+
+        is_leaf = tree.children_left[order] < 0
+        children_left = position[np.maximum(tree.children_left[order], 0)] + offset
+        children_right = position[np.maximum(tree.children_right[order], 0)] + offset
+        # feature/right are stored as int64 so memory-mapped arrays index without a copy
+        feature.append(np.where(is_leaf, 0, tree.feature[order]).astype(np.int64))
+        threshold.append(np.where(is_leaf, np.nan, tree.threshold[order]).astype(np.float64))
+        left.append(np.where(is_leaf, nodes, children_left).astype(np.int32))
+        right.append(np.where(is_leaf, nodes, children_right).astype(np.int64))
+        missing = getattr(tree, 'missing_go_to_left', None)
+        missing = np.zeros(len(order), dtype=np.uint8) if missing is None else np.asarray(missing, dtype=np.uint8)[order]
+        missing_left.append(np.where(is_leaf, 0, missing).astype(np.uint8))
+
+        if is_classifier:
+            value = tree.value[order, 0, :n_classes].astype(np.float64)
+            if old_value_layout:
+                # Older trees store class counts; normalize the way predict_proba did
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer
+        else:
+            value = tree.value[order, 0, :1].astype(np.float64)
+        values.append(value)
+
+    return {
+        'format_version': np.array(FORMAT_VERSION),
+        'kind': np.array('classifier' if is_classifier else 'regressor'),
+        'n_features': np.array(model.n_features_in_),
+        'classes': np.asarray(model.classes_) if is_classifier else np.array([]),
+        'tree_offsets': offsets,
+        'max_depth': np.array(max(t.max_depth for t in trees)),
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'missing_left': np.concatenate(missing_left),
+        'value': np.concatenate(values),
+    }
+
+class FlatForest:
+    """
+    Pure-NumPy forest evaluator exposing the parts of the sklearn estimator
+    API the service uses: predict, predict_proba, classes_ and n_features_in_.
+    """
+
+    def __init__(self, arrays):
+        version = int(arrays['format_version'])
+        if version not in (1, FORMAT_VERSION):
+            raise ValueError(f"Unsupported flat forest format {version} (expected {FORMAT_VERSION})")
+        self.kind = str(arrays['kind'])
+        self.n_features_in_ = int(arrays['n_features'])
+        self.classes_ = np.asarray(arrays['classes'])
+        self.tree_offsets = np.asarray(arrays['tree_offsets'])
+        self.max_depth = int(arrays['max_depth'])
+        # No copies when the stored dtypes already match, keeping memmaps shared
+        self.feature = np.asarray(arrays['feature']).astype(np.intp, copy=False)
+        self.threshold = np.asarray(arrays['threshold'])
+        self.left = np.asarray(arrays['left'])
+        if version == 1:
+            # Format 1 leaves had -inf thresholds, which send a -inf value down the wrong branch
+            leaves = self.left == np.arange(len(self.left))
+            self.threshold = np.where(leaves, np.nan, self.threshold)
+        self.right = np.asarray(arrays['right']).astype(np.intp, copy=False)
+        self.missing_left = np.asarray(arrays['missing_left']).view(bool)
+        self.value = np.asarray(arrays['value'])
+        self.metadata = dict(arrays.get('metadata', {}))
+        self.has_missing_routing = bool(self.missing_left.any())
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.tree_offsets)
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(export_forest(model))
+
+    @classmethod
+    def load(cls, path: str):
+        """Open a .wpm file; node arrays stay memory-mapped"""
+        arrays, metadata = read_model(path)
+        scalars = metadata.pop('scalars', {})
+        return cls({**arrays, **scalars, 'metadata': metadata})
+
+    @staticmethod
+    def save(arrays: dict, path: str, metadata: dict = None):
+        """Write export_forest() output; scalars go in the header, node arrays in the body"""
+        scalars = {k: np.asarray(v).item() for k, v in arrays.items() if np.ndim(v) == 0}
+        body = {k: v for k, v in arrays.items() if k not in scalars}
+        write_model(path, body, {**(metadata or {}), 'scalars': scalars})
+
+    def _prepare(self, X):
+        """(flattened float32 rows, per-row offsets into them) for the walk"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, expected (n, {self.n_features_in_})")
+        return X.ravel(), (np.arange(len(X), dtype=np.intp) * self.n_features_in_)[np.newaxis, :]
+
+    def _roots(self, n_rows: int) -> np.ndarray:
+        return np.repeat(self.tree_offsets.astype(np.intp)[:, np.newaxis], n_rows, axis=1)
+
+    def _step(self, flat_X, row_base, nodes) -> np.ndarray:
+        """Move every (tree, row) one level down; rows at a leaf stay there"""
+        x = flat_X.take(self.feature.take(nodes) + row_base)
+        go_left = x <= self.threshold.take(nodes)
+        if self.has_missing_routing:
+            go_left |= np.isnan(x) & self.missing_left.take(nodes)
+        # Preorder layout: the left child is always the next node
+        return np.where(go_left, nodes + 1, self.right.take(nodes))
+
+    def apply(self, X) -> np.ndarray:
+        """(trees x rows) global leaf index reached by every row in every tree"""
+        flat_X, row_base = self._prepare(X)
+        nodes = self._roots(row_base.shape[1])
+        for _ in range(self.max_depth):
+            nodes = self._step(flat_X, row_base, nodes)
+        return nodes
+
+    def contributions(self, X):
+        """
+        Per-row feature contributions by path decomposition: every split a
+        row passes moves the prediction from the parent's value to the
+        child's, and that change is credited to the split feature. Averaged
+        over trees, bias + contributions[i].sum(axis=0) is the forest's
+        output for row i. Returns (bias (outputs,), contributions
+        (rows x features x outputs)); outputs are the volume for a
+        regressor and the class probabilities for a classifier.
+        """
+        X = np.asarray(X)
+        n_features, n_outputs = self.n_features_in_, self.value.shape[1]
+        out = np.zeros((len(X), n_features, n_outputs))
+        for start in range(0, len(X), CHUNK_ROWS):
+            flat_X, row_base = self._prepare(X[start:start + CHUNK_ROWS])
+            n_rows = row_base.shape[1]
+            slot_base = (np.arange(n_rows, dtype=np.intp) * n_features)[np.newaxis, :]
+            total = np.zeros((n_rows * n_features, n_outputs))
+            nodes = self._roots(n_rows)
+            for _ in range(self.max_depth):
+                children = self._step(flat_X, row_base, nodes)
+                # Leaves step onto themselves, so finished rows add nothing
+                slots = (self.feature.take(nodes) + slot_base).ravel()
+                delta = self.value[children] - self.value[nodes]
+                for k in range(n_outputs):
+                    total[:, k] += np.bincount(slots, weights=delta[..., k].ravel(), minlength=len(total))
+                nodes = children
+            out[start:start + n_rows] = total.reshape(n_rows, n_features, n_outputs) / self.n_estimators
+        bias = self.value[self.tree_offsets].mean(axis=0)
+        return bias, out
+
+    def _mean_leaf_values(self, X) -> np.ndarray:
+        """Average leaf value over trees, accumulated in tree order like sklearn"""
+        X = np.asarray(X)
+        out = np.zeros((len(X), self.value.shape[1]))
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            total = np.zeros((leaves.shape[1], self.value.shape[1]))
+            for tree_leaves in leaves:
+                total += self.value[tree_leaves]
+            out[start:start + CHUNK_ROWS] = total / self.n_estimators
+        return out
+
+    def predict_trees(self, X) -> np.ndarray:
+        """
+        (trees x rows) prediction of every tree of a regressor, from one
+        walk of the forest. Summed in tree order and divided by the tree
+        count, the columns give exactly predict(X).
+        """
+        if self.kind != 'regressor':
+            raise AttributeError("predict_trees is only available for regressors")
+        X = np.asarray(X)
+        out = np.empty((self.n_estimators, len(X)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            out[:, start:start + CHUNK_ROWS] = self.value[leaves, 0]
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        if self.kind == 'regressor':
+            return self._mean_leaf_values(X)[:, 0]
+        return self.classes_.take(np.argmax(self._mean_leaf_values(X), axis=1))
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.kind != 'classifier':
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_leaf_values(X)
+
+def flat_path(pkl_path: str) -> str:
+    return os.path.splitext(pkl_path)[0] + '.wpm'
+
+if __name__ == "__main__":
+    import joblib
+
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sys.argv[1:] or ['waste_volume_regressor.pkl', 'risk_level_classifier.pkl']:
+        pkl_path = os.path.join(model_dir, name)
+        arrays = export_forest(joblib.load(pkl_path))
+        FlatForest.save(arrays, flat_path(pkl_path), metadata={'source': name})
+        print(f"✅ {name} → {os.path.basename(flat_path(pkl_path))} "
+              f"({len(arrays['tree_offsets'])} trees, {len(arrays['feature']):,} nodes)")
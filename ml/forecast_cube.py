@@ -0,0 +1,182 @@
+# forecast_cube.py
+# Precomputed (days x barangays) model outputs for a fixed roster under the
+# default weather, so the common "next N days" forecasts are array slices.
+import io
+import os
+import json
+import time
+
+import numpy as np
+
+def roster_key(barangay_name: str, population: float, has_market: bool = False):
+    """Everything about a barangay that changes its features (the id is only echoed back)"""
+    return (barangay_name, float(population), bool(has_market))
+
+class ForecastCube:
+    """
+    Raw model outputs for every (day, barangay) cell of a roster: volume,
+    risk probabilities, event multiplier and event names. Risk overrides
+    are not baked in because they depend on where a barangay sits in the
+    request. `version` identifies the models and event calendar the cube
+    was scored with.
+    """
+
+    def __init__(self, dates, roster, volumes, risk_proba, multipliers, event_names, version: str):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.roster = [roster_key(*key) for key in roster]
+        self.volumes = np.asarray(volumes, dtype=np.float64)          # (D, B)
+        self.risk_proba = np.asarray(risk_proba, dtype=np.float64)    # (D, B, classes)
+        self.multipliers = np.asarray(multipliers, dtype=np.float64)  # (D, B)
+        self.event_names = event_names                                # D x B nested lists
+        self.version = version
+        self._columns = {key: j for j, key in enumerate(self.roster)}
+
+    @property
+    def start(self):
+        return self.dates[0] if len(self.dates) else None
+
+    def lookup(self, dates, barangays):
+        """
+        (volumes, risk_proba, multipliers, event_names) for `dates` x
+        `barangays`, flattened day-major like a reshaped forecast tensor, or
+        None if any cell lies outside the cube. `barangays` need
+        barangay_name, population and has_market attributes.
+        """
+        if not len(dates) or not len(self.dates):
+            return None
+        rows = (np.asarray(dates, dtype='datetime64[D]') - self.dates[0]).astype(np.int64)
+        if rows.min() < 0 or rows.max() >= len(self.dates):
+            return None
+        columns = [self._columns.get(roster_key(b.barangay_name, b.population, b.has_market))
+                   for b in barangays]
+        if None in columns:
+            return None
+
+        cells = np.ix_(rows, np.array(columns, dtype=np.intp))
+        event_names = [[self.event_names[r][c] for c in columns] for r in rows.tolist()]
+        return (
+            self.volumes[cells].ravel(),
+            self.risk_proba[cells].reshape(-1, self.risk_proba.shape[-1]),
+            self.multipliers[cells],
+            event_names,
+        )
+
+    def save(self, path: str):
+        """
+        Write the cube as .npy members of one .npz file, replacing `path`
+        atomically. One file rather than a .npy per array, so a reader
+        never pairs arrays from one build with the roster of another.
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            dates=self.dates,
+            names=np.array([key[0] for key in self.roster], dtype=str),
+            population=np.array([key[1] for key in self.roster], dtype=np.float64),
+            has_market=np.array([key[2] for key in self.roster], dtype=bool),
+            volumes=self.volumes,
+            risk_proba=self.risk_proba,
+            multipliers=self.multipliers,
+            event_names=np.array(json.dumps(self.event_names)),
+            version=np.array(self.version),
+        )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            roster = zip(data['names'].tolist(), data['population'].tolist(), data['has_market'].tolist())
+            return cls(
+                dates=data['dates'],
+                roster=list(roster),
+                volumes=data['volumes'],
+                risk_proba=data['risk_proba'],
+                multipliers=data['multipliers'],
+                event_names=json.loads(str(data['event_names'])),
+                version=str(data['version']),
+            )
+
+class ForecastCubeStore:
+    """
+    Holds the current ForecastCube and counts the requests it answered.
+    The owner builds cubes (see api.refresh_forecast_cube) and installs
+    them here; a cube is current while its first day is the requested
+    start and its version matches. With a `path` each installed cube is
+    also written to disk and reused on the next start if still current.
+    `days=0` disables the cube.
+    """
+
+    def __init__(self, days: int = 14, refresh_s: float = 3600.0, path: str = None):
+        self.days = max(0, days)
+        self.refresh_s = refresh_s
+        self.path = path or None
+        self.cube = None
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.last_build_ms = None
+        self.built_at = None
+
+    @classmethod
+    def from_env(cls):
+        """FORECAST_CUBE_DAYS (14, 0 disables), FORECAST_CUBE_REFRESH_S (3600) and FORECAST_CUBE_PATH (unset)"""
+        return cls(
+            days=int(os.environ.get('FORECAST_CUBE_DAYS', '14')),
+            refresh_s=float(os.environ.get('FORECAST_CUBE_REFRESH_S', '3600')),
+            path=os.environ.get('FORECAST_CUBE_PATH'),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    def is_current(self, cube, start, version: str) -> bool:
+        return (cube is not None and cube.version == version and cube.start == start
+                and len(cube.dates) >= self.days)
+
+    def load(self, start, version: str):
+        """The persisted cube if it is still current, otherwise None"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            cube = ForecastCube.load(self.path)
+        except Exception:
+            return None
+        return cube if self.is_current(cube, start, version) else None
+
+    def install(self, cube: ForecastCube, build_ms: float = None, persist: bool = True):
+        self.cube = cube
+        self.built_at = time.time()
+        if build_ms is not None:
+            self.builds += 1
+            self.last_build_ms = round(build_ms, 2)
+        if persist and self.path:
+            cube.save(self.path)
+
+    def lookup(self, dates, barangays):
+        cube = self.cube
+        result = cube.lookup(dates, barangays) if cube is not None else None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def stats(self):
+        cube = self.cube
+        return {
+            'enabled': self.enabled,
+            'days': self.days,
+            'refreshSeconds': self.refresh_s,
+            'startDate': str(cube.start) if cube is not None else None,
+            'barangays': len(cube.roster) if cube is not None else 0,
+            'version': cube.version if cube is not None else None,
+            'persisted': bool(self.path),
+            'builds': self.builds,
+            'lastBuildMs': self.last_build_ms,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
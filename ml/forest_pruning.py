@@ -0,0 +1,209 @@
+# forest_pruning.py
+# Inference cost of a fitted forest and latency-aware pruning at training time.
+#
+# inference_cost() times the flattened forest the API serves (FlatForest) on a
+# fixed batch and sizes its node arrays. prune_forest() shrinks a fitted
+# sklearn forest by truncating every tree to a lower depth and keeping only a
+# greedily chosen subset of trees. Trees are ranked on one set of rows and the
+# number kept is decided on another, so the reported score loss is a held-out
+# number rather than the fit of the ranking itself. The result is an ordinary
+# sklearn estimator, so the .pkl and the .wpm export agree.
+import copy
+import time
+
+import numpy as np
+
+from flat_forest import FlatForest, export_forest
+from model_search import LATENCY_BATCH, LATENCY_REPEATS
+
+# Validation rows scored per candidate; plenty to rank trees
+MAX_VALIDATION_ROWS = 5000
+# Fewest trees a pruned forest keeps: class probabilities come in steps of
+# 1/trees, and the API thresholds them (risk overrides at 0.5)
+MIN_TREES = 10
+
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+def inference_cost(model, X) -> dict:
+    """Latency of the flattened forest on the first LATENCY_BATCH rows of X, plus its size"""
+    arrays = export_forest(model)
+    flat = FlatForest(arrays)
+    batch = np.asarray(X[:LATENCY_BATCH], dtype=np.float64)
+    predict = flat.predict_proba if flat.kind == 'classifier' else flat.predict
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        predict(batch)
+        timings.append(time.perf_counter() - start)
+    batch_ms = min(timings) * 1000
+    return {
+        'trees': flat.n_estimators,
+        'max_depth': flat.max_depth,
+        'nodes': int(len(flat.feature)),
+        'artifact_bytes': int(sum(np.asarray(a).nbytes for a in arrays.values())),
+        'batch_rows': len(batch),
+        'batch_ms': round(batch_ms, 4),
+        'per_row_us': round(batch_ms * 1000 / max(len(batch), 1), 3),
+    }
+
+def _truncated_nodes(nodes, max_depth: int):
+    """
+    Boolean mask of the nodes still reachable once every node at
+    `max_depth` becomes a leaf, plus the mask of nodes that become leaves
+    """
+    left, right = nodes['left_child'], nodes['right_child']
+    depth = np.zeros(len(nodes), dtype=np.int64)
+    reachable = np.zeros(len(nodes), dtype=bool)
+    reachable[0] = True
+    for node in range(len(nodes)):  # Children always have higher ids than their parent
+        if reachable[node] and left[node] != TREE_LEAF and depth[node] < max_depth:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+            reachable[left[node]] = reachable[right[node]] = True
+    cut = reachable & (left != TREE_LEAF) & (depth >= max_depth)
+    return reachable, cut
+
+def truncate_depth(model, max_depth: int):
+    """
+    Copy of `model` whose trees stop at `max_depth`. Cut nodes predict their
+    own value and the nodes below them are dropped, so the trees shrink.
+    """
+    model = copy.deepcopy(model)
+    for estimator in model.estimators_:
+        state = estimator.tree_.__getstate__()
+        reachable, cut = _truncated_nodes(state['nodes'], max_depth)
+        new_id = np.cumsum(reachable) - 1
+        nodes = state['nodes'].copy()
+        nodes['left_child'][cut] = TREE_LEAF
+        nodes['right_child'][cut] = TREE_LEAF
+        nodes['feature'][cut] = TREE_UNDEFINED
+        nodes['threshold'][cut] = TREE_UNDEFINED
+        for child in ('left_child', 'right_child'):
+            internal = nodes[child] != TREE_LEAF
+            nodes[child][internal] = new_id[nodes[child][internal]]
+        state['nodes'] = nodes[reachable]
+        state['values'] = state['values'][reachable]
+        state['node_count'] = int(reachable.sum())
+        state['max_depth'] = min(state['max_depth'], max_depth)
+        estimator.tree_.__setstate__(state)
+        estimator.max_depth = min(estimator.max_depth or max_depth, max_depth)
+    model.max_depth = max_depth
+    return model
+
+def select_trees(model, indices):
+    """Copy of `model` keeping only the trees at `indices`"""
+    pruned = copy.copy(model)
+    pruned.estimators_ = [model.estimators_[i] for i in indices]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+def _scores(kind: str, y, combined, classes=None) -> np.ndarray:
+    """
+    R² of mean predictions, or accuracy of mean class probabilities, for
+    each (rows x outputs) slab of `combined`
+    """
+    if kind == 'regressor':
+        total = np.sum((y - y.mean()) ** 2)
+        errors = np.sum((y[np.newaxis, :] - combined[:, :, 0]) ** 2, axis=1)
+        return 1 - errors / total if total else np.zeros(len(combined))
+    return np.mean(classes.take(np.argmax(combined, axis=2)) == y[np.newaxis, :], axis=1)
+
+def _forest_score(model, X, y) -> float:
+    flat = FlatForest.from_model(model)
+    combined = flat.predict_proba(X) if flat.kind == 'classifier' else flat.predict(X)[:, np.newaxis]
+    return float(_scores(flat.kind, y, combined[np.newaxis], getattr(model, 'classes_', None))[0])
+
+def greedy_tree_order(model, X, y):
+    """
+    Every tree index of `model` in forward-selection order on (X, y): each
+    step adds the tree that most improves the score of the mean of the
+    trees chosen so far, so redundant trees come last
+    """
+    flat = FlatForest.from_model(model)
+    per_tree = flat.value[flat.apply(X)]  # (trees, rows, outputs)
+    classes = getattr(model, 'classes_', None)
+
+    chosen, total = [], np.zeros(per_tree.shape[1:])
+    remaining = np.arange(len(per_tree))
+    while len(remaining):
+        scores = _scores(flat.kind, y, (total + per_tree[remaining]) / (len(chosen) + 1), classes)
+        best = int(np.argmax(scores))
+        chosen.append(int(remaining[best]))
+        total += per_tree[remaining[best]]
+        remaining = np.delete(remaining, best)
+    return chosen
+
+def prefix_scores(model, order, X, y) -> np.ndarray:
+    """Score on (X, y) of the forest made of the first k trees of `order`, for k = 1..len(order)"""
+    flat = FlatForest.from_model(model)
+    per_tree = flat.value[flat.apply(X)][order]
+    counts = np.arange(1, len(order) + 1)[:, np.newaxis, np.newaxis]
+    return _scores(flat.kind, y, np.cumsum(per_tree, axis=0) / counts, getattr(model, 'classes_', None))
+
+def prune_forest(model, X_select, y_select, X_check, y_check, max_loss: float = 0.005,
+                 target_latency_ms: float = None, target_bytes: int = None, min_depth: int = 3,
+                 min_trees: int = MIN_TREES):
+    """
+    Search depth caps from the forest's own depth downwards. At each depth
+    the trees are ranked on (X_select, y_select), and the candidate keeps
+    the fewest leading trees (at least `min_trees`) whose score (R² or
+    accuracy) on the held-out (X_check, y_check) is within `max_loss` of
+    the unpruned forest's. Returns (model, report). The unpruned forest is
+    returned as is when it already meets the latency/size targets;
+    otherwise the pick is the most accurate candidate meeting them, or the
+    cheapest one when no target is given or none can be met. Scores in the
+    report are all on the check rows.
+    """
+    X_select = np.asarray(X_select)[:MAX_VALIDATION_ROWS]
+    y_select = np.asarray(y_select)[:MAX_VALIDATION_ROWS]
+    X_check = np.asarray(X_check)[:MAX_VALIDATION_ROWS]
+    y_check = np.asarray(y_check)[:MAX_VALIDATION_ROWS]
+    max_depth = FlatForest.from_model(model).max_depth
+    baseline_score = _forest_score(model, X_check, y_check)
+    threshold = baseline_score - max_loss
+    original = {'score': round(baseline_score, 6), **inference_cost(model, X_check)}
+
+    candidates = []
+    for depth in range(max_depth, min_depth - 1, -1):
+        truncated = truncate_depth(model, depth) if depth < max_depth else model
+        order = greedy_tree_order(truncated, X_select, y_select)
+        scores = prefix_scores(truncated, order, X_check, y_check)
+        passing = np.flatnonzero(scores[min_trees - 1:] >= threshold)
+        if not len(passing):
+            break  # Shallower trees only lose more
+        n_trees = min_trees + int(passing[0])
+        pruned = select_trees(truncated, sorted(order[:n_trees]))
+        candidates.append((pruned, {'max_depth': depth, 'score': round(float(scores[n_trees - 1]), 6),
+                                    **inference_cost(pruned, X_check)}))
+
+    def meets_targets(cost):
+        return ((target_latency_ms is None or cost['batch_ms'] <= target_latency_ms)
+                and (target_bytes is None or cost['artifact_bytes'] <= target_bytes))
+
+    has_target = target_latency_ms is not None or target_bytes is not None
+    feasible = [c for c in candidates if meets_targets(c[1])] if has_target else []
+    if has_target and meets_targets(original):
+        pruned, chosen = model, original
+    elif feasible:
+        pruned, chosen = max(feasible, key=lambda c: (c[1]['score'], -c[1]['batch_ms']))
+    elif candidates:
+        pruned, chosen = min(candidates, key=lambda c: c[1]['batch_ms'])
+    else:
+        pruned, chosen = model, original
+
+    report = {
+        'max_loss': max_loss,
+        'target_latency_ms': target_latency_ms,
+        'target_bytes': target_bytes,
+        'targets_met': meets_targets(chosen) if has_target else None,
+        'pruned': pruned is not model,
+        'selection_rows': len(X_select),
+        'check_rows': len(X_check),
+        'baseline_score': round(baseline_score, 6),
+        'score': chosen['score'],
+        'score_loss': round(round(baseline_score, 6) - chosen['score'], 6),
+        'before': {k: v for k, v in original.items() if k != 'score'},
+        'after': {k: v for k, v in chosen.items() if k != 'score'},
+        'candidates': [c[1] for c in candidates],
+    }
+    return pruned, report
@@ -0,0 +1,154 @@
+# http_cache.py
+# Conditional requests (ETag / If-None-Match) and response compression.
+#
+# ETags are weak (W/"..."): they identify what a response means (the model
+# version, event calendar and request that produced it), not its bytes, so
+# fields like "timestamp" may differ between two responses with one ETag.
+#
+# CompressionMiddleware gzips (or, when the brotli package from
+# requirements.txt is installed, brotli-compresses) responses the client
+# accepts compressed; without brotli, clients asking for br get gzip.
+# Complete bodies are compressed above a size threshold; streamed bodies
+# such as NDJSON are compressed chunk by chunk with a flush after each, so
+# the client still sees rows as they are produced.
+import os
+import zlib
+import json
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+def weak_etag(*parts) -> str:
+    """Weak ETag over JSON-serializable parts; bytes are hashed as-is"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8'))
+        digest.update(b'\0')
+    return f'W/"{digest.hexdigest()}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or (candidate[2:] if candidate.startswith('W/') else candidate) == opaque:
+            return True
+    return False
+
+def _accepted_encodings(header: str) -> dict:
+    """{coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses of at least `minimum_size` bytes
+    (streamed responses always) with brotli or gzip, whichever the client
+    prefers. Responses that already carry a Content-Encoding pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 enabled: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+
+    @staticmethod
+    def options_from_env() -> dict:
+        """RESPONSE_COMPRESSION (1), RESPONSE_COMPRESS_MIN_BYTES (1024), RESPONSE_GZIP_LEVEL (6) and RESPONSE_BROTLI_QUALITY (4)"""
+        return {
+            'enabled': os.environ.get('RESPONSE_COMPRESSION', '1') != '0',
+            'minimum_size': int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024')),
+            'gzip_level': int(os.environ.get('RESPONSE_GZIP_LEVEL', '6')),
+            'brotli_quality': int(os.environ.get('RESPONSE_BROTLI_QUALITY', '4')),
+        }
+
+    def choose_encoding(self, accept_encoding: str):
+        accepted = _accepted_encodings(accept_encoding)
+        wildcard = accepted.get('*', 0.0)
+        options = (['br'] if brotli is not None else []) + ['gzip']
+        best = max(options, key=lambda coding: accepted.get(coding, wildcard))
+        return best if accepted.get(best, wildcard) > 0 else None
+
+    def compressor(self, encoding: str):
+        """(compress(chunk), flush(), finish()) for one response"""
+        if encoding == 'br':
+            c = brotli.Compressor(quality=self.brotli_quality)
+            return c.process, c.flush, c.finish
+        c = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+        return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.enabled:
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get('headers') or [])
+        encoding = self.choose_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        stream = None  # (compress, flush, finish) once a streamed body is being compressed
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if message['type'] != 'http.response.body':
+                return await send(message)
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if stream is not None:
+                compress, flush, finish = stream
+                chunk = compress(body) + (flush() if more_body else finish())
+                return await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+            if start_message is None:
+                return await send(message)
+
+            response_headers = [(k, v) for k, v in start_message['headers']]
+            names = {k.lower() for k, _ in response_headers}
+            if (b'content-encoding' in names or start_message['status'] in (204, 304)
+                    or (not more_body and len(body) < self.minimum_size)):
+                await send(start_message)
+                start_message = None
+                return await send(message)
+
+            vary = b', '.join([v for k, v in response_headers if k.lower() == b'vary'] + [b'Accept-Encoding'])
+            response_headers = [(k, v) for k, v in response_headers if k.lower() not in (b'content-length', b'vary')]
+            response_headers += [(b'content-encoding', encoding.encode()), (b'vary', vary)]
+            compress, flush, finish = self.compressor(encoding)
+            if more_body:
+                stream = (compress, flush, finish)
+                chunk = compress(body) + flush()
+            else:
+                chunk = compress(body) + finish()
+                response_headers.append((b'content-length', str(len(chunk)).encode()))
+            await send({**start_message, 'headers': response_headers})
+            start_message = None
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
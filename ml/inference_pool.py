@@ -0,0 +1,89 @@
+# inference_pool.py
+# Bounded worker pool that keeps CPU-bound model calls off the asyncio event loop.
+import os
+import asyncio
+import contextvars
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+POOL_MODES = ('thread', 'process', 'inline')
+
+class PoolBusyError(Exception):
+    """Raised instead of queueing when every worker is busy and the queue is full"""
+
+class InferencePool:
+    """
+    Runs inference callables in a thread or process pool.
+    At most `workers` jobs run at once and at most `queue_depth` more wait;
+    anything beyond that is rejected immediately with PoolBusyError so the
+    caller can answer 503 instead of letting requests pile up.
+    'inline' runs jobs directly on the event loop (the old behaviour).
+
+    In process mode the callable and its arguments must be picklable, i.e.
+    module-level functions; each worker imports that module (and so loads
+    the models) once, then runs `initializer` if one is given.
+    """
+
+    def __init__(self, mode: str = 'thread', workers: int = 4, queue_depth: int = 32, initializer=None):
+        if mode not in POOL_MODES:
+            raise ValueError(f"Unknown pool mode '{mode}', expected one of {POOL_MODES}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self.in_flight = 0
+        self.rejected = 0
+        if mode == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inference')
+        elif mode == 'process':
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=initializer
+            )
+        else:
+            self.executor = None
+
+    @classmethod
+    def from_env(cls, initializer=None):
+        """INFERENCE_POOL (thread), INFERENCE_WORKERS (4) and INFERENCE_QUEUE_DEPTH (32)"""
+        return cls(
+            mode=os.environ.get('INFERENCE_POOL', 'thread'),
+            workers=int(os.environ.get('INFERENCE_WORKERS', '4')),
+            queue_depth=int(os.environ.get('INFERENCE_QUEUE_DEPTH', '32')),
+            initializer=initializer,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_depth
+
+    async def run(self, fn, *args):
+        # Only touched from the event loop thread, so a plain counter is safe
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise PoolBusyError(f"Inference queue full ({self.in_flight} in flight)")
+
+        self.in_flight += 1
+        try:
+            if self.executor is None:
+                return fn(*args)
+            loop = asyncio.get_running_loop()
+            if self.mode == 'thread':
+                # Carry the request's context (e.g. its log correlation id) into the worker
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(self.executor, context.run, fn, *args)
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'queueDepth': self.queue_depth,
+            'inFlight': self.in_flight,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self, wait: bool = False):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,73 @@
+# micro_batcher.py
+# Coalesces concurrent single-row requests into one batched model call.
+import asyncio
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent callers and scores them together.
+    A batch is flushed when `max_batch` items are waiting or `window_ms` after
+    the first item arrived, whichever comes first. `score_many(items)` must
+    return one result per item; an Exception in a result slot is raised to
+    that caller only. `runner(fn, items)` decides where the scoring runs
+    (e.g. the inference pool) and may raise to fail the whole batch.
+    """
+
+    def __init__(self, score_many, runner, max_batch: int = 64, window_ms: float = 3.0):
+        self.score_many = score_many
+        self.runner = runner
+        self.max_batch = max(1, max_batch)
+        self.window_ms = window_ms
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.runner(self.score_many, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # Caller went away
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            'windowMs': self.window_ms,
+            'maxBatch': self.max_batch,
+            'batches': self.batches,
+            'items': self.items,
+            'meanBatchSize': round(self.items / self.batches, 2) if self.batches else 0,
+        }
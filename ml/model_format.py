@@ -0,0 +1,117 @@
+# model_format.py
+# Versioned binary container for flattened model arrays (.wpm).
+#
+# Layout (all little-endian):
+#   8 bytes   magic b"WPMODEL\0"
+#   4 bytes   container format version (uint32)
+#   4 bytes   header length in bytes (uint32)
+#   header    UTF-8 JSON: {"metadata": {...}, "arrays": {name: {dtype, shape, offset}}}
+#   arrays    raw C-order array data, each starting on a 64-byte boundary
+#
+# Arrays are opened with np.memmap, so every process that serves the same
+# file shares one copy of the pages through the OS page cache. The same
+# layout also works in memory (encode_model / decode_model), e.g. as a
+# binary API payload.
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"WPMODEL\0"
+CONTAINER_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sII")
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _layout(arrays: dict, metadata: dict):
+    """(little-endian arrays, layout with absolute offsets, encoded header)"""
+    arrays = {name: np.ascontiguousarray(a, dtype=np.asarray(a).dtype.newbyteorder('<'))
+              for name, a in arrays.items()}
+
+    # Offsets depend on the header length, so lay out relative offsets first
+    layout, position = {}, 0
+    for name, a in arrays.items():
+        position = _aligned(position)
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": position}
+        position += a.nbytes
+
+    header = json.dumps({"metadata": metadata, "arrays": layout}).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header))
+    for entry in layout.values():
+        entry["offset"] += data_start
+    # Re-encode with absolute offsets; pad so the data start stays valid
+    header = json.dumps({"metadata": metadata, "arrays": layout}).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header))
+    while any(entry["offset"] < data_start for entry in layout.values()):
+        for entry in layout.values():
+            entry["offset"] += ALIGNMENT
+        header = json.dumps({"metadata": metadata, "arrays": layout}).encode("utf-8")
+        data_start = _aligned(_PREFIX.size + len(header))
+    return arrays, layout, header
+
+def write_model(path: str, arrays: dict, metadata: dict):
+    """Write named arrays plus JSON-serializable metadata to a .wpm file"""
+    arrays, layout, header = _layout(arrays, metadata)
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, CONTAINER_VERSION, len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(a.tobytes())
+
+def encode_model(arrays: dict, metadata: dict) -> bytes:
+    """The .wpm encoding of named arrays plus metadata, in memory"""
+    arrays, layout, header = _layout(arrays, metadata)
+    end = max((entry["offset"] + a.nbytes for entry, a in zip(layout.values(), arrays.values())),
+              default=_PREFIX.size + len(header))
+    buffer = bytearray(end)
+    _PREFIX.pack_into(buffer, 0, MAGIC, CONTAINER_VERSION, len(header))
+    buffer[_PREFIX.size:_PREFIX.size + len(header)] = header
+    for name, a in arrays.items():
+        offset = layout[name]["offset"]
+        buffer[offset:offset + a.nbytes] = a.tobytes()
+    return bytes(buffer)
+
+def decode_model(buffer):
+    """(arrays, metadata) from encode_model() output; arrays are read-only views of `buffer`"""
+    if len(buffer) < _PREFIX.size:
+        raise ValueError("Buffer is too short for a .wpm container")
+    magic, version, header_length = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Buffer is not a .wpm container")
+    if version != CONTAINER_VERSION:
+        raise ValueError(f"Buffer uses container version {version}, expected {CONTAINER_VERSION}")
+    header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_length]).decode("utf-8"))
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        dtype = np.dtype(entry["dtype"])
+        if entry["offset"] + count * dtype.itemsize > len(buffer):
+            raise ValueError(f"Array '{name}' runs past the end of the buffer")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=entry["offset"]).reshape(shape)
+    return arrays, header["metadata"]
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic, version, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a .wpm model file")
+        if version != CONTAINER_VERSION:
+            raise ValueError(f"{path} uses container version {version}, expected {CONTAINER_VERSION}")
+        return json.loads(f.read(header_length).decode("utf-8"))
+
+def read_model(path: str):
+    """(arrays, metadata) with every array a read-only np.memmap into the file"""
+    header = read_header(path)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=entry["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=entry["dtype"], mode="r",
+                                     offset=entry["offset"], shape=shape)
+    return arrays, header["metadata"]
@@ -0,0 +1,264 @@
+# model_registry.py
+# Versioned model artifacts for zero-downtime reloads.
+#
+# Layout:
+#   model_registry/
+#     CURRENT                    name of the version being served (atomically replaced)
+#     3.0-20261016-223000/       one immutable directory per published version
+#       waste_volume_regressor.pkl / .wpm
+#       risk_level_classifier.pkl / .wpm
+#       ml_models_metadata.json
+#       manifest.json            written last; a directory without one is incomplete
+#
+# train_waste_model.py publishes each run here; the API polls CURRENT (or is
+# told to reload), loads the new ModelSet off the event loop and swaps one
+# reference, so in-flight requests finish on the version they started with.
+#
+# Usage: python model_registry.py list | publish [dir] | activate VERSION | rollback
+import os
+import sys
+import json
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flat_forest import FlatForest, flat_path
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(MODEL_DIR, 'model_registry')
+
+VOLUME_MODEL = 'waste_volume_regressor.pkl'
+RISK_MODEL = 'risk_level_classifier.pkl'
+METADATA = 'ml_models_metadata.json'
+ARTIFACTS = [VOLUME_MODEL, flat_path(VOLUME_MODEL), RISK_MODEL, flat_path(RISK_MODEL), METADATA]
+MANIFEST = 'manifest.json'
+CURRENT = 'CURRENT'
+
+def load_model(directory: str, filename: str, engine: str = 'flat'):
+    """The flat (.wpm) forest next to `filename` unless engine is 'sklearn' or it is missing"""
+    pkl_path = os.path.join(directory, filename)
+    if engine != 'sklearn' and os.path.exists(flat_path(pkl_path)):
+        return FlatForest.load(flat_path(pkl_path))
+    import joblib
+    return joblib.load(pkl_path)
+
+class ModelSet:
+    """
+    Everything one model version serves with: both forests and their
+    metadata. Never mutated after loading, so a request that grabbed a
+    ModelSet keeps a consistent view however often the API swaps.
+    `fingerprint` keys the prediction cache and the forecast cube.
+    """
+
+    def __init__(self, version: str, volume_model, risk_model, metadata: dict, fingerprint: str = None):
+        self.version = version
+        self.volume_model = volume_model
+        self.risk_model = risk_model
+        self.metadata = metadata or {}
+        self.fingerprint = fingerprint or version
+        self.loaded_at = datetime.now().isoformat()
+
+    @property
+    def loaded(self) -> bool:
+        return self.volume_model is not None and self.risk_model is not None
+
+    @property
+    def engine(self):
+        return type(self.volume_model).__name__ if self.volume_model is not None else None
+
+    @classmethod
+    def load(cls, directory: str, version: str = None, engine: str = 'flat', fingerprint: str = None):
+        volume_model = load_model(directory, VOLUME_MODEL, engine)
+        risk_model = load_model(directory, RISK_MODEL, engine)
+        try:
+            with open(os.path.join(directory, METADATA), 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {}
+        version = version or metadata.get('model_info', {}).get('version', '1.0')
+        return cls(version, volume_model, risk_model, metadata, fingerprint)
+
+    def describe(self) -> dict:
+        return {
+            'version': self.version,
+            'engine': self.engine,
+            'loadedAt': self.loaded_at,
+            'trainedDate': self.metadata.get('model_info', {}).get('trained_date'),
+        }
+
+def unloaded_model_set(version: str = 'unavailable') -> ModelSet:
+    return ModelSet(version, None, None, {})
+
+class ModelRegistry:
+    """
+    Directory of published model versions plus the CURRENT pointer.
+    Loaded versions are kept in memory (the active one and up to `keep`
+    more), so rolling back to a recent version does not touch the disk.
+    publish() keeps the newest `keep` versions besides the active one.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, keep: int = 3, poll_s: float = 5.0, engine: str = 'flat'):
+        self.root = root
+        self.keep = max(0, keep)
+        self.poll_s = poll_s
+        self.engine = engine
+        self.swaps = 0
+        self.failed_loads = 0
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, engine: str = 'flat'):
+        """MODEL_REGISTRY_DIR (model_registry), MODEL_REGISTRY_KEEP (3) and MODEL_REGISTRY_POLL_S (5, 0 disables watching)"""
+        return cls(
+            root=os.environ.get('MODEL_REGISTRY_DIR', DEFAULT_ROOT),
+            keep=int(os.environ.get('MODEL_REGISTRY_KEEP', '3')),
+            poll_s=float(os.environ.get('MODEL_REGISTRY_POLL_S', '5')),
+            engine=engine,
+        )
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def manifest(self, version: str):
+        try:
+            with open(os.path.join(self.path(version), MANIFEST), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def versions(self) -> list:
+        """Complete versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        manifests = [(name, self.manifest(name)) for name in os.listdir(self.root)
+                     if not name.startswith('.') and os.path.isdir(self.path(name))]
+        return [name for name, manifest in sorted(
+            ((n, m) for n, m in manifests if m is not None), key=lambda item: (item[1]['published'], item[0]))]
+
+    def active_version(self):
+        """The version CURRENT names, else the newest one; None for an empty registry"""
+        try:
+            with open(os.path.join(self.root, CURRENT), 'r') as f:
+                version = f.read().strip()
+            if self.manifest(version) is not None:
+                return version
+        except OSError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def activate(self, version: str):
+        """Point CURRENT at `version`; serving APIs pick it up on their next poll or reload"""
+        if self.manifest(version) is None:
+            raise KeyError(f"Unknown model version '{version}'")
+        tmp_path = os.path.join(self.root, f'.{CURRENT}.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.root, CURRENT))
+
+    def previous_version(self):
+        """The version published before the active one"""
+        versions = self.versions()
+        active = self.active_version()
+        position = versions.index(active) if active in versions else len(versions)
+        return versions[position - 1] if position > 0 else None
+
+    def publish(self, source_dir: str, version: str = None, activate: bool = True) -> str:
+        """
+        Copy the artifacts in `source_dir` into a new version directory
+        (named <model version>-<timestamp> unless given) and, by default,
+        make it the active version. Older versions beyond `keep` are removed.
+        """
+        missing = [name for name in (VOLUME_MODEL, RISK_MODEL) if not os.path.exists(os.path.join(source_dir, name))]
+        if missing:
+            raise FileNotFoundError(f"Cannot publish without {', '.join(missing)}")
+        with open(os.path.join(source_dir, METADATA), 'r') as f:
+            model_info = json.load(f).get('model_info', {})
+        published = datetime.now()
+        version = version or f"{model_info.get('version', '1.0')}-{published.strftime('%Y%m%d-%H%M%S')}"
+        if os.path.exists(self.path(version)):
+            raise FileExistsError(f"Model version '{version}' already exists")
+
+        # Copied, not linked: training rewrites its output files in place
+        os.makedirs(self.root, exist_ok=True)
+        staging = os.path.join(self.root, f'.{version}.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        artifacts = [name for name in ARTIFACTS if os.path.exists(os.path.join(source_dir, name))]
+        for name in artifacts:
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(staging, name))
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump({
+                'version': version,
+                'published': published.isoformat(),
+                'model_version': model_info.get('version'),
+                'trained_date': model_info.get('trained_date'),
+                'artifacts': artifacts,
+            }, f, indent=2)
+        os.rename(staging, self.path(version))
+
+        if activate:
+            self.activate(version)
+        self.prune()
+        return version
+
+    def prune(self):
+        """Remove all but the newest `keep` versions that are not active"""
+        active = self.active_version()
+        inactive = [v for v in self.versions() if v != active]
+        for version in inactive[:max(0, len(inactive) - self.keep)]:
+            shutil.rmtree(self.path(version), ignore_errors=True)
+
+    def load(self, version: str) -> ModelSet:
+        """ModelSet for `version`, from memory when it was loaded recently"""
+        with self._lock:
+            if version in self._loaded:
+                self._loaded.move_to_end(version)
+                return self._loaded[version]
+        if self.manifest(version) is None:
+            raise KeyError(f"Unknown model version '{version}'")
+        return self.remember(ModelSet.load(self.path(version), version, self.engine))
+
+    def remember(self, models: ModelSet) -> ModelSet:
+        """Keep `models` resolvable by load(), e.g. models served from outside the registry"""
+        with self._lock:
+            self._loaded[models.version] = models
+            self._loaded.move_to_end(models.version)
+            while len(self._loaded) > self.keep + 1:
+                self._loaded.popitem(last=False)
+        return models
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'activeVersion': self.active_version(),
+            'versions': self.versions(),
+            'inMemory': list(self._loaded),
+            'keep': self.keep,
+            'pollSeconds': self.poll_s,
+            'swaps': self.swaps,
+            'failedLoads': self.failed_loads,
+        }
+
+if __name__ == "__main__":
+    registry = ModelRegistry.from_env()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'publish':
+        version = registry.publish(sys.argv[2] if len(sys.argv) > 2 else MODEL_DIR)
+        print(f"✅ Published and activated {version}")
+    elif command == 'activate':
+        registry.activate(sys.argv[2])
+        print(f"✅ Activated {sys.argv[2]}")
+    elif command == 'rollback':
+        previous = registry.previous_version()
+        if previous is None:
+            sys.exit("❌ No earlier version to roll back to")
+        registry.activate(previous)
+        print(f"✅ Rolled back to {previous}")
+    else:
+        active = registry.active_version()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            print(f"  {'→' if version == active else ' '} {version}  (trained {manifest.get('trained_date')})")
@@ -0,0 +1,248 @@
+# model_search.py
+# Parallel cross-validation and hyperparameter search for the two forests.
+#
+# The training folds are written once as a "ring" of memory-mapped arrays
+# (folds 0..K-1 followed by folds 0..K-2), so the training rows for any
+# held-out fold are one contiguous float32 slice. Worker processes fit on
+# views of those pages: nothing is copied per job, and every worker shares
+# the same physical memory. Each job is one (config, fold) pair; the parent
+# schedules them on a bounded pool and stops running folds for a config as
+# soon as a finished config beats it on both score and latency.
+import os
+import json
+import time
+import random
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from flat_forest import FlatForest
+
+# Held-out rows timed per latency measurement, like one /predict-batch call
+LATENCY_BATCH = 80
+LATENCY_REPEATS = 5
+
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [8, 10, 15, 20, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 5],
+    'max_features': [1.0, 0.5, 'sqrt'],
+}
+
+MODEL_KINDS = {
+    # kind: (target column, estimator class name, score name)
+    'volume': ('predicted_waste', 'RandomForestRegressor', 'r2'),
+    'risk': ('risk_level', 'RandomForestClassifier', 'accuracy'),
+}
+
+_arrays = None  # Worker-side memmaps, opened once per process
+
+def write_ring(dataset, directory: str):
+    """
+    Lay the dataset out fold-major twice over (minus the last fold) as .npy
+    files in `directory`. Reused if already present.
+    """
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, 'ring.json')
+    if os.path.exists(index_path):
+        return directory
+
+    n_folds = dataset.n_folds
+    blocks = {'X': [], **{target: [] for target, _, _ in MODEL_KINDS.values()}}
+    for fold in range(n_folds):
+        blocks['X'].append(dataset.features(folds=[fold]))
+        for target, _, _ in MODEL_KINDS.values():
+            blocks[target].append(dataset.column(target, folds=[fold]))
+    sizes = [len(block) for block in blocks['X']]
+    for name, fold_blocks in blocks.items():
+        np.save(os.path.join(directory, f'{name}.npy'), np.concatenate(fold_blocks + fold_blocks[:-1]))
+
+    with open(index_path, 'w') as f:
+        json.dump({'n_folds': n_folds, 'sizes': sizes}, f)
+    return directory
+
+def _open_ring(directory: str):
+    global _arrays
+    with open(os.path.join(directory, 'ring.json'), 'r') as f:
+        index = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+              for name in ['X'] + [target for target, _, _ in MODEL_KINDS.values()]}
+    _arrays = {**index, 'offsets': np.concatenate([[0], np.cumsum(index['sizes'] * 2)]).tolist(), **arrays}
+
+def _fold_rows(fold: int):
+    """(train slice, held-out slice) of the ring for one held-out fold"""
+    sizes, offsets = _arrays['sizes'], _arrays['offsets']
+    n_rows = sum(sizes)
+    start = offsets[fold]
+    return slice(start + sizes[fold], start + n_rows), slice(start, start + sizes[fold])
+
+def make_estimator(kind: str, params: dict, n_jobs: int = 1):
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    estimator = {'RandomForestRegressor': RandomForestRegressor,
+                 'RandomForestClassifier': RandomForestClassifier}[MODEL_KINDS[kind][1]]
+    return estimator(**params, n_jobs=n_jobs)
+
+def _score(kind: str, y_true, y_pred) -> float:
+    from sklearn.metrics import accuracy_score, r2_score
+    return float(r2_score(y_true, y_pred) if kind == 'volume' else accuracy_score(y_true, y_pred))
+
+def run_fold(kind: str, params: dict, fold: int):
+    """Fit on every fold but `fold`, score on `fold` and time the flattened forest"""
+    target = MODEL_KINDS[kind][0]
+    train, held_out = _fold_rows(fold)
+    X, y = _arrays['X'], _arrays[target]
+
+    start = time.perf_counter()
+    model = make_estimator(kind, params).fit(X[train], y[train])
+    fit_s = time.perf_counter() - start
+    score = _score(kind, y[held_out], model.predict(X[held_out]))
+
+    flat = FlatForest.from_model(model)
+    batch = np.asarray(X[held_out][:LATENCY_BATCH])
+    predict = flat.predict if kind == 'volume' else flat.predict_proba
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        predict(batch)
+        timings.append(time.perf_counter() - start)
+
+    return {'fold': fold, 'score': score, 'fit_s': fit_s,
+            'latency_ms': min(timings) * 1000, 'nodes': int(len(flat.feature))}
+
+def candidate_configs(mode: str = 'random', trials: int = 20, seed: int = 42, space=None):
+    """Every combination of `space` ('grid') or `trials` distinct random draws from it"""
+    space = space or SEARCH_SPACE
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    if mode == 'grid' or trials >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, trials)
+
+def _pool(workers: int, ring_dir: str):
+    """
+    Process pool whose workers open the ring memmaps once. Fork keeps the
+    training script (which has no __main__ guard) from re-running in every
+    worker; without fork the jobs run in this process instead.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                               initializer=_open_ring, initargs=(ring_dir,))
+
+class _InlinePool:
+    """Drop-in for the process pool when fork is unavailable"""
+
+    def __init__(self, ring_dir):
+        _open_ring(ring_dir)
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+def search(ring_dir: str, kind: str, configs, base_params=None, workers: int = None,
+           abort_margin: float = 0.01, on_result=None):
+    """
+    Cross-validate every config on the ring with one job per (config, fold).
+    A config is aborted once some fully evaluated config scores more than
+    `abort_margin` above its running mean while being no slower. Returns one
+    result dict per config, in the order given.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    with open(os.path.join(ring_dir, 'ring.json'), 'r') as f:
+        n_folds = json.load(f)['n_folds']
+    results = [{'params': {**(base_params or {}), **config}, 'folds': [], 'status': 'running'}
+               for config in configs]
+
+    pool = _pool(workers, ring_dir) or _InlinePool(ring_dir)
+    queue = [(i, 0) for i in range(len(results))]
+    in_flight = {}
+    try:
+        while queue or in_flight:
+            # Bounded submission: one pending job per worker, deepest configs first
+            while queue and len(in_flight) < workers:
+                i, fold = queue.pop(0)
+                future = pool.submit(run_fold, kind, results[i]['params'], fold)
+                in_flight[future] = i
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = in_flight.pop(future)
+                result = results[i]
+                try:
+                    result['folds'].append(future.result())
+                except Exception as e:
+                    result['status'], result['error'] = 'failed', str(e)
+                    continue
+                _summarize(result)
+                if len(result['folds']) == n_folds:
+                    result['status'] = 'complete'
+                elif _dominated(result, results, abort_margin):
+                    result['status'] = 'aborted'
+                else:
+                    queue.insert(0, (i, len(result['folds'])))
+                if result['status'] != 'running' and on_result:
+                    on_result(result)
+    finally:
+        pool.shutdown(wait=True)
+    return results
+
+def _summarize(result):
+    folds = result['folds']
+    scores = [f['score'] for f in folds]
+    result['score_mean'] = float(np.mean(scores))
+    result['score_std'] = float(np.std(scores))
+    result['latency_ms'] = float(np.mean([f['latency_ms'] for f in folds]))
+    result['nodes'] = int(np.mean([f['nodes'] for f in folds]))
+
+def _dominated(result, results, margin: float) -> bool:
+    return any(other['status'] == 'complete'
+               and other['score_mean'] > result['score_mean'] + margin
+               and other['latency_ms'] <= result['latency_ms']
+               for other in results)
+
+def select_best(results, tolerance: float = 0.005):
+    """
+    Fastest complete config scoring within `tolerance` of the best score;
+    marks it (and the score/latency Pareto front) in the results
+    """
+    complete = [r for r in results if r['status'] == 'complete']
+    if not complete:
+        raise RuntimeError("No configuration finished cross-validation")
+    top = max(r['score_mean'] for r in complete)
+    for r in complete:
+        r['pareto'] = not any(o['score_mean'] >= r['score_mean'] and o['latency_ms'] <= r['latency_ms']
+                              and (o['score_mean'], o['latency_ms']) != (r['score_mean'], r['latency_ms'])
+                              for o in complete)
+    best = min((r for r in complete if r['score_mean'] >= top - tolerance), key=lambda r: r['latency_ms'])
+    best['selected'] = True
+    return best
+
+def write_leaderboard(path: str, leaderboards: dict):
+    """{kind: results} as JSON, each board sorted by mean score"""
+    out = {}
+    for kind, results in leaderboards.items():
+        rows = sorted(results, key=lambda r: r.get('score_mean', float('-inf')), reverse=True)
+        out[kind] = [{
+            'params': r['params'],
+            'status': r['status'],
+            'score': MODEL_KINDS[kind][2],
+            'score_mean': r.get('score_mean'),
+            'score_std': r.get('score_std'),
+            'folds_run': len(r['folds']),
+            'latency_ms': r.get('latency_ms'),
+            'nodes': r.get('nodes'),
+            'pareto': r.get('pareto', False),
+            'selected': r.get('selected', False),
+            **({'error': r['error']} if 'error' in r else {}),
+        } for r in rows]
+    with open(path, 'w') as f:
+        json.dump(out, f, indent=2, default=str)
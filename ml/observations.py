@@ -0,0 +1,244 @@
+# observations.py
+# Observed collection tonnage: truck weigh-ins per barangay per day.
+#
+# Uploads are CSVs with date (YYYY-MM-DD), barangay and weight_kg columns
+# and an optional truck column, in any order. They arrive as a stream of
+# bytes; CsvBlocks cuts it into blocks of whole records, and each block is
+# parsed, validated and bulk-inserted in one transaction, so an upload of
+# any size holds about one block in memory. Rows that fail validation are
+# counted and reported, and the rest of their block is still stored.
+#
+# The store is one SQLite file (WAL mode) with an index on (barangay, date),
+# which is how daily totals are read back, e.g. as backtest actuals.
+import os
+import io
+import csv
+import uuid
+import codecs
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from event_calendar import normalize_name
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(MODEL_DIR, 'observations.sqlite3')
+
+REQUIRED_COLUMNS = ['date', 'barangay', 'weight_kg']
+OPTIONAL_COLUMNS = ['truck']
+MAX_REPORTED_ERRORS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    barangay TEXT NOT NULL,
+    date TEXT NOT NULL,
+    weight_kg REAL NOT NULL,
+    truck TEXT,
+    upload_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_barangay_date ON observations (barangay, date);
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id TEXT PRIMARY KEY,
+    filename TEXT,
+    received_at TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    accepted INTEGER NOT NULL,
+    rejected INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+"""
+
+class CsvBlocks:
+    """
+    Incremental splitter for a CSV byte stream: feed() returns text made of
+    whole records once at least `block_bytes` are pending (else ''), and
+    finish() returns the rest. A newline only ends a record when the text
+    before it holds an even number of quotes, so quoted newlines survive.
+    """
+
+    def __init__(self, block_bytes: int = 1 << 20, encoding: str = 'utf-8-sig'):
+        self.block_bytes = block_bytes
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.pending = []
+        self.pending_chars = 0
+        self.quotes = 0  # Quotes in the pending text, for the parity check
+
+    def feed(self, data: bytes) -> str:
+        text = self.decoder.decode(data)
+        if text:
+            self.pending.append(text)
+            self.pending_chars += len(text)
+            self.quotes += text.count('"')
+        if self.pending_chars < self.block_bytes:
+            return ''
+        return self._split()
+
+    def finish(self) -> str:
+        text = ''.join(self.pending) + self.decoder.decode(b'', final=True)
+        self.pending, self.pending_chars, self.quotes = [], 0, 0
+        return text
+
+    def _split(self) -> str:
+        text = ''.join(self.pending)
+        cut = text.rfind('\n')
+        # Walk back to a newline outside quotes; the pending quote count says where to start
+        while cut >= 0 and (self.quotes - text.count('"', cut)) % 2:
+            cut = text.rfind('\n', 0, cut)
+        if cut < 0:
+            self.pending = [text]
+            return ''
+        block, rest = text[:cut + 1], text[cut + 1:]
+        self.pending, self.pending_chars, self.quotes = [rest], len(rest), rest.count('"')
+        return block
+
+def header_columns(header) -> dict:
+    """{column: position} from a header row; raises ValueError when a required column is missing"""
+    positions = {}
+    for j, name in enumerate(header):
+        positions.setdefault(name.strip().lower(), j)
+    missing = [c for c in REQUIRED_COLUMNS if c not in positions]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+    return {c: positions[c] for c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if c in positions}
+
+class ObservationStore:
+    """
+    SQLite store of weigh-ins. Barangay names are stored as spelled in the
+    barangay table (`barangay_names`); weigh-ins for other barangays, with
+    dates in the future or outside (0, max_kg] kg are rejected. One
+    connection is shared behind a lock, so blocks can be inserted from
+    worker threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB, barangay_names=(), max_kg: float = 50000.0):
+        self.path = path
+        self.max_kg = max_kg
+        self.barangays = {normalize_name(n): n for n in barangay_names}
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls, barangay_names=()):
+        """OBSERVATIONS_DB (observations.sqlite3 next to this file) and OBSERVATIONS_MAX_KG (50000)"""
+        return cls(
+            path=os.environ.get('OBSERVATIONS_DB', DEFAULT_DB),
+            barangay_names=barangay_names,
+            max_kg=float(os.environ.get('OBSERVATIONS_MAX_KG', '50000')),
+        )
+
+    def _barangay(self, raw: str) -> str:
+        barangay = self.barangays.get(normalize_name(raw))
+        if barangay is None:
+            raise ValueError(f"unknown barangay '{raw.strip()}'")
+        return barangay
+
+    @staticmethod
+    def _date(raw: str, today: date) -> str:
+        try:
+            day = date.fromisoformat(raw.strip())
+        except ValueError:
+            raise ValueError(f"invalid date '{raw.strip()}', expected YYYY-MM-DD")
+        if day > today:
+            raise ValueError(f"date {day} is in the future")
+        return day.isoformat()
+
+    def _weight(self, raw: str) -> float:
+        try:
+            weight = float(raw.replace(',', ''))
+        except ValueError:
+            raise ValueError(f"invalid weight_kg '{raw.strip()}'")
+        if not 0 < weight <= self.max_kg:
+            raise ValueError(f"weight_kg {weight:g} is outside (0, {self.max_kg:g}]")
+        return weight
+
+    def insert_block(self, text: str, columns: dict, upload_id: str, first_row: int):
+        """
+        Parse, validate and insert one block of whole records in a single
+        transaction. `first_row` numbers the block's first record in the
+        upload (the header is row 1). Returns (records, accepted, errors,
+        rows the block spans).
+        """
+        today = datetime.now().date()
+        # A block repeats the same few barangays and dates, so each distinct
+        # spelling is checked once and its result (or error) reused
+        barangays, dates = {}, {}
+        barangay_at, date_at, weight_at = columns['barangay'], columns['date'], columns['weight_kg']
+        truck_at = columns.get('truck')
+        width = max(columns.values()) + 1
+        rows, errors, records, row = [], [], 0, first_row - 1
+        for row, record in enumerate(csv.reader(io.StringIO(text, newline='')), start=first_row):
+            if not any(field.strip() for field in record):
+                continue  # Blank lines are not records
+            records += 1
+            try:
+                if len(record) < width:
+                    raise ValueError(f"expected at least {width} fields, got {len(record)}")
+                raw = record[barangay_at]
+                barangay = barangays.get(raw)
+                if barangay is None:
+                    barangay = barangays[raw] = _outcome(self._barangay, raw)
+                raw = record[date_at]
+                day = dates.get(raw)
+                if day is None:
+                    day = dates[raw] = _outcome(self._date, raw, today)
+                if isinstance(barangay, ValueError):
+                    raise barangay
+                if isinstance(day, ValueError):
+                    raise day
+                truck = record[truck_at].strip() or None if truck_at is not None else None
+                rows.append((barangay, day, self._weight(record[weight_at]), truck, upload_id))
+            except ValueError as e:
+                errors.append({'row': row, 'error': str(e)})
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO observations (barangay, date, weight_kg, truck, upload_id) VALUES (?, ?, ?, ?, ?)', rows)
+        return records, len(rows), errors, row - first_row + 1
+
+    def record_upload(self, upload_id: str, filename: str, rows: int, accepted: int, rejected: int,
+                      seconds: float):
+        with self.lock, self.connection:
+            self.connection.execute('INSERT INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                upload_id, filename, datetime.now().isoformat(), rows, accepted, rejected, seconds))
+
+    def daily_totals(self, barangay: str = None, start: str = None, end: str = None):
+        """[(barangay, date, total kg, weigh-ins)] ordered by barangay then date"""
+        clauses, params = [], []
+        if barangay is not None:
+            clauses.append('barangay = ?')
+            params.append(self.barangays.get(normalize_name(barangay), barangay))
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self.lock:
+            return self.connection.execute(
+                f'SELECT barangay, date, SUM(weight_kg), COUNT(*) FROM observations {where} '
+                f'GROUP BY barangay, date ORDER BY barangay, date', params).fetchall()
+
+    def stats(self):
+        """Totals from the uploads table, so this stays cheap however many weigh-ins are stored"""
+        with self.lock:
+            uploads, accepted, rejected = self.connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(accepted), 0), COALESCE(SUM(rejected), 0) FROM uploads').fetchone()
+        return {'path': self.path, 'uploads': uploads, 'weighIns': accepted, 'rejected': rejected}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def _outcome(check, *args):
+    """check(*args), or the ValueError it raised"""
+    try:
+        return check(*args)
+    except ValueError as e:
+        return e
+
+def new_upload_id() -> str:
+    return uuid.uuid4().hex[:12]
@@ -0,0 +1,116 @@
+# prediction_cache.py
+# Bounded LRU/TTL cache of raw model outputs, keyed per feature row.
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class PredictionCache:
+    """
+    Maps a feature row to the model outputs for it (any fixed-width float
+    vector, e.g. volume followed by the class probabilities).
+
+    Keys hash the row as the models see it (float32, -0.0 folded into 0.0)
+    together with the model version, so rows that can only produce the same
+    prediction share an entry. Binding a different model version clears the
+    cache. At most `max_entries` rows are kept (least recently used go
+    first) and entries older than `ttl_s` seconds count as misses.
+    `max_entries=0` disables caching. Safe to share between threads; in the
+    process pool each worker keeps its own cache.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl_s: float = 3600.0, clock=time.monotonic):
+        self.max_entries = max(0, max_entries)
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """PREDICTION_CACHE_SIZE (50000, 0 disables) and PREDICTION_CACHE_TTL_S (3600)"""
+        return cls(
+            max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', '50000')),
+            ttl_s=float(os.environ.get('PREDICTION_CACHE_TTL_S', '3600')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def bind(self, model_version: str):
+        """Start serving `model_version`; entries from any other version are dropped"""
+        with self._lock:
+            if model_version != self.model_version:
+                if self.model_version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.model_version = model_version
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def keys(self, X: np.ndarray, model_version: str = None) -> list:
+        """Row keys for the bound version, or for `model_version` when scoring with another one"""
+        rows = np.ascontiguousarray(np.asarray(X, dtype=np.float32) + np.float32(0.0))
+        prefix = str(model_version or self.model_version).encode()
+        return [hashlib.blake2b(prefix + row, digest_size=16).digest()
+                for row in rows.view(np.dtype((np.void, rows.shape[1] * 4))).ravel().tolist()]
+
+    def get_many(self, keys: list, width: int):
+        """(hit mask, (N x width) values); rows that missed are left uninitialized"""
+        hit = np.zeros(len(keys), dtype=bool)
+        values = np.empty((len(keys), width))
+        now = self.clock()
+        with self._lock:
+            for j, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                values[j] = entry[1]
+                hit[j] = True
+            hits = int(hit.sum())
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return hit, values
+
+    def put_many(self, keys: list, values: np.ndarray):
+        if not self.enabled:
+            return
+        expires = self.clock() + self.ttl_s
+        with self._lock:
+            for key, row in zip(keys, np.asarray(values, dtype=np.float64).tolist()):
+                self._entries[key] = (expires, row)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'maxEntries': self.max_entries,
+            'ttlSeconds': self.ttl_s,
+            'modelVersion': self.model_version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,35 @@
+# prediction_intervals.py
+# Volume bands from the spread of the volume forest's per-tree predictions.
+#
+# Each tree of the forest is one plausible prediction. Their P10/P50/P90 and
+# standard deviation give truck dispatch a range instead of a single number.
+# All trees are evaluated for the whole batch in one walk of the flattened
+# forest (FlatForest.predict_trees, a trees x rows matrix), and the point
+# prediction is taken from that same matrix, so a request with bands costs
+# one forest walk plus the quantiles of the matrix.
+import numpy as np
+
+QUANTILES = (10, 50, 90)
+INTERVAL_FIELDS = ('p10', 'p50', 'p90', 'std')
+
+def per_tree_predictions(model, X) -> np.ndarray:
+    """(trees x rows) predictions of every tree; sklearn forests are evaluated tree by tree"""
+    if hasattr(model, 'predict_trees'):
+        return model.predict_trees(X)
+    X = np.asarray(X, dtype=np.float32)
+    return np.stack([tree.predict(X) for tree in model.estimators_])
+
+def volume_intervals(model, X):
+    """
+    (volumes, bands) for an (N x 14) feature matrix. `bands` is (N x 4)
+    holding the INTERVAL_FIELDS; volumes equal model.predict(X).
+    """
+    trees = per_tree_predictions(model, X)
+    volumes = trees.sum(axis=0) / len(trees)  # Tree-order sum, like FlatForest.predict
+    bands = np.empty((trees.shape[1], len(INTERVAL_FIELDS)))
+    bands[:, :len(QUANTILES)] = np.percentile(trees, QUANTILES, axis=0).T
+    bands[:, -1] = trees.std(axis=0)
+    return volumes, bands
+
+def interval_dict(band) -> dict:
+    return {field: float(value) for field, value in zip(INTERVAL_FIELDS, band)}
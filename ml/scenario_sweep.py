@@ -0,0 +1,141 @@
+# scenario_sweep.py
+# What-if grids: every combination of the swept weather and event values
+# (a "cell") crossed with every barangay of a roster.
+#
+# Rows are laid out cell-major (cell 0 for all barangays, then cell 1, ...),
+# so a chunk of whole cells is a contiguous row range whose per-cell
+# aggregates can be computed on its own. The full (cells x barangays) matrix
+# is never built: memory is one chunk of features plus a few numbers per
+# cell, whatever the grid size.
+#
+# Trees only compare each feature against their split thresholds, so axis
+# values that fall between the same pair of thresholds (in every tree of
+# every model) give identical outputs. collapse() keeps one value per such
+# group; the smaller grid is scored and its surfaces indexed back out to
+# the full grid, which changes no output.
+import numpy as np
+
+RISK_NAMES = ('safe', 'moderate', 'high')
+VOLUME_RISK_NAMES = ('normal', 'moderate', 'high')
+
+def axis_values(spec) -> np.ndarray:
+    """A list of values, or an inclusive {start, stop, step} range"""
+    if isinstance(spec, dict):
+        start, stop, step = float(spec['start']), float(spec['stop']), float(spec['step'])
+        if step <= 0:
+            raise ValueError("step must be positive")
+        if stop < start:
+            raise ValueError("stop is before start")
+        # Rounded so 0..60 step 0.1 gives 601 exact-looking values
+        return np.round(start + step * np.arange(int(np.floor((stop - start) / step + 1e-9)) + 1), 10)
+    values = np.asarray(spec, dtype=np.float64).ravel()
+    if not len(values):
+        raise ValueError("an axis needs at least one value")
+    return values
+
+def split_thresholds(models, feature: int) -> np.ndarray:
+    """Sorted distinct thresholds on which any tree of `models` splits `feature`"""
+    parts = [np.empty(0)]
+    for model in models:
+        if hasattr(model, 'tree_offsets'):  # FlatForest; leaves carry NaN thresholds
+            parts.append(model.threshold[(model.feature == feature) & np.isfinite(model.threshold)])
+        else:
+            parts.extend(tree.tree_.threshold[tree.tree_.feature == feature] for tree in model.estimators_)
+    return np.unique(np.concatenate(parts))
+
+def threshold_bins(values, thresholds) -> np.ndarray:
+    """Which gap between `thresholds` each value falls in, compared like sklearn (as float32, value <= t)"""
+    return np.searchsorted(thresholds, np.asarray(values, dtype=np.float32).astype(np.float64), side='left')
+
+class ScenarioGrid:
+    """
+    Cartesian grid of named axes (in the order given) over `n_barangays`
+    barangays. Cell c's axis values are np.unravel_index(c, shape).
+    """
+
+    def __init__(self, axes: dict, n_barangays: int):
+        self.axes = {name: axis_values(spec) for name, spec in axes.items()}
+        self.shape = tuple(len(values) for values in self.axes.values())
+        self.n_barangays = n_barangays
+        self.cells = int(np.prod(self.shape, dtype=np.int64))
+        self.rows = self.cells * n_barangays
+
+    def collapse(self, keys: dict):
+        """
+        (smaller grid, per-axis index) keeping the first value of each group
+        of equal `keys[axis]` entries; index[k][i] is where the full grid's
+        value i of axis k went. Axes without keys are kept whole.
+        """
+        axes, index = {}, []
+        for name, values in self.axes.items():
+            if name in keys:
+                _, first, inverse = np.unique(keys[name], return_index=True, return_inverse=True)
+                axes[name], position = values[first], inverse.ravel()
+            else:
+                axes[name], position = values, np.arange(len(values))
+            index.append(position)
+        return ScenarioGrid(axes, self.n_barangays), tuple(index)
+
+    def chunks(self, chunk_rows: int):
+        """(first cell, cell count) blocks of about `chunk_rows` rows, whole cells only"""
+        per_chunk = max(1, chunk_rows // max(self.n_barangays, 1))
+        for first in range(0, self.cells, per_chunk):
+            yield first, min(per_chunk, self.cells - first)
+
+    def cell_values(self, first: int, count: int) -> dict:
+        """{axis: value of each cell in [first, first + count)}"""
+        index = np.unravel_index(np.arange(first, first + count), self.shape)
+        return {name: values[i] for (name, values), i in zip(self.axes.items(), index)}
+
+def cell_aggregates(volumes, risk, volume_levels, n_cells: int, n_barangays: int) -> dict:
+    """
+    Per-cell sums for `n_cells` consecutive cells of cell-major rows: total
+    and peak volume, and row counts per risk class (0-2) and volume level (1-3)
+    """
+    volumes = volumes.reshape(n_cells, n_barangays)
+    cell = np.repeat(np.arange(n_cells), n_barangays)
+    return {
+        'volume': volumes.sum(axis=1),
+        'peak': volumes.max(axis=1),
+        'risk': np.bincount(cell * 3 + risk, minlength=n_cells * 3).reshape(n_cells, 3),
+        'volume_risk': np.bincount(cell * 3 + volume_levels - 1, minlength=n_cells * 3).reshape(n_cells, 3),
+    }
+
+class SurfaceAccumulator:
+    """Collects cell_aggregates blocks, in any order, into whole-grid surfaces"""
+
+    def __init__(self, grid: ScenarioGrid):
+        self.grid = grid
+        self.volume = np.zeros(grid.cells)
+        self.peak = np.zeros(grid.cells)
+        self.risk = np.zeros((grid.cells, 3), dtype=np.int64)
+        self.volume_risk = np.zeros((grid.cells, 3), dtype=np.int64)
+
+    def add(self, first: int, aggregates: dict):
+        block = slice(first, first + len(aggregates['volume']))
+        self.volume[block] = aggregates['volume']
+        self.peak[block] = aggregates['peak']
+        self.risk[block] = aggregates['risk']
+        self.volume_risk[block] = aggregates['volume_risk']
+
+    def surfaces(self, expand=None) -> dict:
+        """
+        Nested lists shaped like the grid's axes, or, given the index from
+        ScenarioGrid.collapse, like the full grid it was collapsed from
+        """
+        shape, n = self.grid.shape, max(self.grid.n_barangays, 1)
+
+        def surface(values, decimals):
+            values = values.reshape(shape)
+            if expand is not None:
+                values = values[np.ix_(*expand)]
+            return np.round(values, decimals).tolist()
+
+        return {
+            'totalTonnes': surface(self.volume / 1000, 3),
+            'meanVolumeKg': surface(self.volume / n, 2),
+            'peakVolumeKg': surface(self.peak, 2),
+            'riskShare': {name: surface(self.risk[:, k] / n, 4) for k, name in enumerate(RISK_NAMES)},
+            'volumeRiskShare': {name: surface(self.volume_risk[:, k] / n, 4)
+                                for k, name in enumerate(VOLUME_RISK_NAMES)},
+        }
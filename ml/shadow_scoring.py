@@ -0,0 +1,219 @@
+# shadow_scoring.py
+# Scores a candidate model version on live /predict-batch traffic, off the
+# response path, and logs how it differs from the version being served.
+#
+# The live handler hands over the feature matrix it already built together
+# with what it answered; a single background thread scores the shadow models
+# on that matrix and appends one fixed-width record per barangay to a binary
+# log (SHADOW_RECORD, read back with np.fromfile). Running totals per
+# barangay and a primary-vs-shadow risk confusion matrix are kept in memory
+# for the /models/shadow report.
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SHADOW_RECORD = np.dtype([
+    ('ts', '<f8'),              # Unix time the live request was answered
+    ('barangay', '<i2'),        # Index into the barangay table, -1 if unknown
+    ('primary_volume', '<f4'),
+    ('shadow_volume', '<f4'),
+    ('primary_risk', 'i1'),     # 0=safe, 1=moderate, 2=high
+    ('shadow_risk', 'i1'),
+])
+
+class ShadowScorer:
+    """
+    Background shadow scoring with a bounded cost. A batch is skipped
+    instead of queued when `queue_depth` batches are already waiting, or
+    when shadow scoring has used more than `max_overhead` times the time
+    spent scoring live traffic. `score(models, X, multipliers, positions)`
+    must return (volumes, risk classes) the way the live path computes
+    them; positions are the rows' places in the live request.
+    """
+
+    def __init__(self, score, barangay_index: dict, log_dir: str, max_overhead: float = 0.25,
+                 queue_depth: int = 4, max_log_bytes: int = 64 * 1024 * 1024):
+        self.score = score
+        self.barangay_index = barangay_index
+        self.log_dir = log_dir
+        self.max_overhead = max_overhead
+        self.queue_depth = max(1, queue_depth)
+        self.max_log_bytes = max_log_bytes
+        self.models = None
+        self.primary_version = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+        self._lock = threading.Lock()
+        self._reset()
+
+    @classmethod
+    def from_env(cls, score, barangay_index: dict, default_log_dir: str):
+        """SHADOW_LOG_DIR (shadow_logs), SHADOW_MAX_OVERHEAD (0.25), SHADOW_QUEUE_DEPTH (4) and SHADOW_LOG_MAX_MB (64)"""
+        return cls(
+            score, barangay_index,
+            log_dir=os.environ.get('SHADOW_LOG_DIR', default_log_dir),
+            max_overhead=float(os.environ.get('SHADOW_MAX_OVERHEAD', '0.25')),
+            queue_depth=int(os.environ.get('SHADOW_QUEUE_DEPTH', '4')),
+            max_log_bytes=int(float(os.environ.get('SHADOW_LOG_MAX_MB', '64')) * 1024 * 1024),
+        )
+
+    def _reset(self):
+        n = len(self.barangay_index) + 1  # Last slot collects unknown barangays
+        self.pending = 0
+        self.batches = 0
+        self.rows = 0
+        self.skipped_busy = 0
+        self.skipped_budget = 0
+        self.errors = 0
+        self.primary_s = 0.0
+        self.shadow_s = 0.0
+        self.confusion = np.zeros((3, 3), dtype=np.int64)
+        self.abs_delta = 0.0
+        self.primary_total = 0.0
+        self.barangay_rows = np.zeros(n, dtype=np.int64)
+        self.barangay_abs_delta = np.zeros(n)
+        self.barangay_disagreements = np.zeros(n, dtype=np.int64)
+
+    @property
+    def active(self) -> bool:
+        return self.models is not None
+
+    @property
+    def log_path(self):
+        if not self.active:
+            return None
+        return os.path.join(self.log_dir, f"{self.primary_version}__{self.models.version}.bin")
+
+    def configure(self, models, primary_version: str = None):
+        """Shadow `models` (None stops shadowing); totals restart for every new pairing"""
+        with self._lock:
+            self.models = models
+            self.primary_version = primary_version
+            self._reset()
+
+    def follow_primary(self, primary_version: str):
+        """The served version changed: keep the shadow, start a new comparison"""
+        if self.active and primary_version != self.primary_version:
+            self.configure(self.models, primary_version)
+
+    def submit(self, X, multipliers, positions, barangay_names, primary_volumes, primary_risk,
+               primary_s: float) -> bool:
+        """
+        Queue one live batch for shadow scoring. `primary_s` is what scoring
+        it live cost; it funds the overhead budget. Returns False if skipped.
+        """
+        models = self.models
+        if models is None or not len(X):
+            return False
+        with self._lock:
+            self.primary_s += primary_s
+            if self.pending >= self.queue_depth:
+                self.skipped_busy += 1
+                return False
+            if self.shadow_s > self.max_overhead * self.primary_s:
+                self.skipped_budget += 1
+                return False
+            self.pending += 1
+        codes = np.array([self.barangay_index.get(name, -1) for name in barangay_names], dtype=np.int16)
+        self._executor.submit(self._run, models, self.primary_version, time.time(), X, multipliers, positions,
+                              codes, np.asarray(primary_volumes, dtype=np.float64),
+                              np.asarray(primary_risk, dtype=np.int8))
+        return True
+
+    def _run(self, models, primary_version, ts, X, multipliers, positions, codes, primary_volumes, primary_risk):
+        start = time.perf_counter()
+        try:
+            volumes, risk = self.score(models, X, multipliers, positions)
+            elapsed = time.perf_counter() - start
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+                self.errors += 1
+                self.shadow_s += time.perf_counter() - start
+            return
+
+        records = np.empty(len(codes), dtype=SHADOW_RECORD)
+        records['ts'] = ts
+        records['barangay'] = codes
+        records['primary_volume'] = primary_volumes
+        records['shadow_volume'] = volumes
+        records['primary_risk'] = primary_risk
+        records['shadow_risk'] = risk
+
+        with self._lock:
+            self.pending -= 1
+            self.shadow_s += elapsed
+            if models is not self.models or primary_version != self.primary_version:
+                return  # Reconfigured while this batch was queued
+            self.batches += 1
+            self.rows += len(records)
+            delta = np.abs(volumes - primary_volumes)
+            slots = np.where(codes >= 0, codes, len(self.barangay_rows) - 1)
+            np.add.at(self.confusion, (primary_risk.astype(np.intp), np.asarray(risk, dtype=np.intp)), 1)
+            np.add.at(self.barangay_rows, slots, 1)
+            np.add.at(self.barangay_abs_delta, slots, delta)
+            np.add.at(self.barangay_disagreements, slots, primary_risk != risk)
+            self.abs_delta += float(delta.sum())
+            self.primary_total += float(np.abs(primary_volumes).sum())
+            self._append(records)
+
+    def _append(self, records):
+        """Append to the pairing's log; a full log is rotated to <name>.1"""
+        path = self.log_path
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) + records.nbytes > self.max_log_bytes:
+                os.replace(path, path + '.1')
+            with open(path, 'ab') as f:
+                records.tofile(f)
+        except OSError:
+            self.errors += 1
+
+    def stats(self):
+        if not self.active:
+            return {'active': False}
+        budget = self.max_overhead * self.primary_s
+        return {
+            'active': True,
+            'primaryVersion': self.primary_version,
+            'shadowVersion': self.models.version,
+            'batches': self.batches,
+            'rows': self.rows,
+            'pending': self.pending,
+            'skippedBusy': self.skipped_busy,
+            'skippedBudget': self.skipped_budget,
+            'errors': self.errors,
+            'maxOverhead': self.max_overhead,
+            'overhead': round(self.shadow_s / self.primary_s, 4) if self.primary_s else 0,
+            'shadowSeconds': round(self.shadow_s, 4),
+            'budgetSeconds': round(budget, 4),
+            'meanAbsVolumeDelta': round(self.abs_delta / self.rows, 2) if self.rows else 0,
+            'relativeVolumeDelta': round(self.abs_delta / self.primary_total, 4) if self.primary_total else 0,
+            'riskAgreement': round(float(np.trace(self.confusion)) / self.rows, 4) if self.rows else 0,
+            # Rows: primary risk, columns: shadow risk (safe, moderate, high)
+            'riskConfusion': self.confusion.tolist(),
+            'log': self.log_path,
+        }
+
+    def barangay_report(self, names):
+        """Per-barangay rows, mean absolute volume delta and risk disagreements, most divergent first"""
+        report = []
+        for j, name in enumerate(list(names) + ['(unknown)']):
+            rows = int(self.barangay_rows[j])
+            if rows:
+                report.append({
+                    'barangay': name,
+                    'rows': rows,
+                    'meanAbsVolumeDelta': round(float(self.barangay_abs_delta[j]) / rows, 2),
+                    'riskDisagreements': int(self.barangay_disagreements[j]),
+                })
+        return sorted(report, key=lambda r: r['meanAbsVolumeDelta'], reverse=True)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def read_shadow_log(path: str) -> np.ndarray:
+    """All records of a shadow log as a SHADOW_RECORD array"""
+    return np.fromfile(path, dtype=SHADOW_RECORD)
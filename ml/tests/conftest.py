@@ -0,0 +1,67 @@
+# conftest.py
+# Shared fixtures for the ml/ test suite. Run from ml/: python -m pytest tests
+#
+# api.py reads its configuration from the environment when it is imported,
+# so the registry, shadow logs and observation store are pointed at a
+# scratch directory first, and the forecast cube and registry polling are
+# switched off so requests go through the scoring paths under test.
+import os
+import sys
+import tempfile
+
+import pytest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix='waste-ml-tests-')
+os.environ.update({
+    'MODEL_REGISTRY_DIR': os.path.join(SCRATCH_DIR, 'model_registry'),
+    'MODEL_REGISTRY_POLL_S': '0',
+    'FORECAST_CUBE_DAYS': '0',
+    'SHADOW_LOG_DIR': os.path.join(SCRATCH_DIR, 'shadow_logs'),
+    'OBSERVATIONS_DB': os.path.join(SCRATCH_DIR, 'observations.sqlite3'),
+    'LOG_LEVEL': 'WARNING',
+})
+os.environ.pop('MODEL_ADMIN_TOKEN', None)
+os.environ.pop('SHADOW_MODEL_VERSION', None)
+
+@pytest.fixture(scope='session')
+def api():
+    """The API module with trained models loaded; skips when train_waste_model.py has not been run"""
+    import api as api_module
+    if not api_module.MODELS.loaded:
+        pytest.skip("trained models not found next to api.py (run train_waste_model.py)")
+    return api_module
+
+@pytest.fixture(scope='session')
+def client(api):
+    """One client for the session: the shutdown hooks stop the inference pool for good"""
+    from fastapi.testclient import TestClient
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def no_prediction_cache(api, monkeypatch):
+    """Score every row through the models instead of the shared prediction cache"""
+    from prediction_cache import PredictionCache
+    monkeypatch.setattr(api, 'PREDICTION_CACHE', PredictionCache(max_entries=0))
+
+def barangay_rows(api, n: int, **overrides) -> list:
+    """/predict request bodies for the first `n` barangays of the table"""
+    rows = []
+    for j, name in enumerate(api.BARANGAY_TABLE.names[:n]):
+        rows.append({
+            'barangay_id': str(j + 1),
+            'barangay_name': name,
+            'population': 5000.0 + 1500.0 * j,
+            'population_density': 1200.0,
+            'bin_capacity': 20000.0,
+            'rainfall_mm': float(j % 4) * 10,
+            'temperature_c': 27.0 + j % 6,
+            'is_market_day': j % 2,
+            'day_of_week': j % 7,
+            'prediction_date': '2025-08-22',
+            **overrides,
+        })
+    return rows
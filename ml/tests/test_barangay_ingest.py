@@ -0,0 +1,27 @@
+# test_barangay_ingest.py
+# A malformed cell in a CLENRO export becomes NaN (and then the table's
+# fallbacks) instead of failing the import that builds BARANGAY_TABLE.
+import numpy as np
+
+from barangay_ingest import DEFAULT_PER_CAPITA, load_barangay_table, parse_numbers
+
+def test_numbers_parse():
+    values = parse_numbers(['7,996.38', ' 19039 ', '-2.5', '5.', '.5', '+3', '1,209'])
+    np.testing.assert_array_equal(values, [7996.38, 19039, -2.5, 5, 0.5, 3, 1209])
+
+def test_junk_becomes_nan():
+    junk = ['', '  ', '12-', '5.-', '-', '.', '-.', '1.2.3', 'n/a', '²', '½', '١٢', '1e5', 'nan', 'inf']
+    assert np.isnan(parse_numbers(junk)).all()
+
+def test_junk_cells_do_not_fail_a_load(tmp_path):
+    path = tmp_path / 'clenro-waste-2024.csv'
+    path.write_text(
+        'Barangay,Population,Per capita,Waste,Residual,Biodegradable,Recyclable,Special,Frequency\n'
+        ',,,,,,,,\n'
+        'Agusan,19039,0.42,"7,996.38",12-,"3,038.62","3,998.19",399.819,7 - nightly\n'
+        'Baikingon,2879,0.42,5.-,205.56,459.49,604.59,60.459,2 - morning\n'
+        'Balubal,7O13,0.42,"2,945.46",500.73,"1,119.27","1,472.73",147.273,2 - morning\n')
+    table = load_barangay_table([str(path)], cache_path=None)
+    assert table.names == ['Agusan', 'Baikingon']  # Balubal's population is junk, so it is dropped
+    assert table.waste[0] == 7996.38 and table.classes[0, 0] == 0
+    assert table.waste[1] == 2879 * DEFAULT_PER_CAPITA
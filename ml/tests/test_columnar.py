@@ -0,0 +1,97 @@
+# test_columnar.py
+# /predict-batch/columnar validates whole columns; anything wrong with the
+# payload is the client's error (4xx), never a 500.
+import json
+
+import numpy as np
+import pytest
+
+import columnar
+from model_format import encode_model
+
+URL = '/predict-batch/columnar'
+
+def good_columns(n=3):
+    return {
+        'barangay_id': [str(j) for j in range(n)],
+        'barangay_name': ['Carmen', 'Barangay 1', 'Gusa'][:n],
+        'population': [50000.0, 8000.0, 40000.0][:n],
+        'population_density': 1000.0,
+        'bin_capacity': 20000.0,
+        'prediction_date': '2025-08-22',
+    }
+
+def post_json(client, body, **headers):
+    return client.post(URL, content=body if isinstance(body, (bytes, str)) else json.dumps(body),
+                       headers={'content-type': 'application/json', **headers})
+
+def test_valid_json_batch(api, client):
+    response = post_json(client, good_columns())
+    assert response.status_code == 200
+    body = response.json()
+    assert body['count'] == 3
+    assert len(body['columns']['predictedVolume']) == 3
+    assert body['columns']['errorRows'] == []
+
+def test_valid_wpm_batch(api, client):
+    columns = good_columns()
+    arrays = {'population': np.array(columns.pop('population'))}
+    response = client.post(URL, content=encode_model(arrays, {'columns': columns}),
+                           headers={'content-type': columnar.WPM, 'accept': columnar.WPM})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith(columnar.WPM)
+
+@pytest.mark.parametrize('body', [
+    b'{"population": [1, 2',                                          # Not JSON
+    b'[1, 2, 3]',                                                     # Not an object
+    b'{"population": [NaN], "barangay_id": ["1"], "population_density": 1, "bin_capacity": 1}',
+])
+def test_undecodable_bodies(api, client, body):
+    assert post_json(client, body).status_code == 400
+
+@pytest.mark.parametrize('change', [
+    lambda c: c.update(unknown_field=[1, 2, 3]),
+    lambda c: c.pop('population'),
+    lambda c: c.update(population=[1.0, 2.0]),                        # Lengths differ
+    lambda c: c.update(population=['many', 'few', 'some']),
+    lambda c: c.update(population=[[1.0], [2.0], [3.0]]),
+    lambda c: c.update(population=[1.0, None, 3.0]),
+    lambda c: c.update(day_of_week=[1, 2.5, 3]),
+    lambda c: c.update(barangay_id='1', barangay_name='Carmen', population=50000.0),  # No arrays
+])
+def test_invalid_columns(api, client, change):
+    columns = good_columns()
+    change(columns)
+    response = post_json(client, columns)
+    assert response.status_code == 400, response.text
+    assert response.json()['detail']
+
+def test_malformed_dates_fall_back_to_today(api, client):
+    # Same rule as /predict and the JSON /predict-batch
+    columns = good_columns()
+    columns['prediction_date'] = ['2025-08-22', 'not a date', '2025-13-45']
+    response = post_json(client, columns)
+    assert response.status_code == 200
+    assert response.json()['columns']['errorRows'] == []
+
+def test_truncated_wpm_body(api, client):
+    body = encode_model({'population': np.ones(3)}, {'columns': {'barangay_id': ['1', '2', '3']}})
+    response = client.post(URL, content=body[:len(body) // 2], headers={'content-type': columnar.WPM})
+    assert response.status_code == 400
+
+def test_unsupported_content_type(api, client):
+    response = client.post(URL, content=b'barangay_id,population\n1,2\n', headers={'content-type': 'text/csv'})
+    assert response.status_code == 415
+
+def test_unsupported_accept(api, client):
+    response = post_json(client, good_columns(), accept='text/html')
+    assert response.status_code == 406
+
+def test_msgpack_batch(api, client):
+    msgpack = pytest.importorskip('msgpack')
+    response = client.post(URL, content=msgpack.packb(good_columns()),
+                           headers={'content-type': 'application/x-msgpack', 'accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content)['count'] == 3
+    bad = client.post(URL, content=b'\xc1\xc1', headers={'content-type': 'application/x-msgpack'})
+    assert bad.status_code == 400
@@ -0,0 +1,47 @@
+# test_event_calendar.py
+# Barangay names match events exactly (ignoring case and spacing), so an
+# event for "Barangay 10" never reaches "Barangay 1".
+import json
+
+import numpy as np
+
+from event_calendar import EventCalendar
+from conftest import barangay_rows
+
+def write_events(path, events):
+    with open(path, 'w') as f:
+        json.dump({'events': events, 'weekly_patterns': {}}, f)
+    return str(path)
+
+def test_prefix_names_do_not_match(tmp_path):
+    path = write_events(tmp_path / 'events.json', [
+        {'name': 'Ten Fiesta', 'type': 'festival', 'dates': ['03-10'],
+         'affected_barangays': ['Barangay 10'], 'waste_multiplier': 2.0},
+    ])
+    calendar = EventCalendar(path, ['Barangay 1', 'Barangay 10', 'Barangay 100'])
+    flags = calendar.lookup(np.array(['2025-03-10'] * 4, dtype='datetime64[D]'),
+                            ['Barangay 1', 'Barangay 10', '  barangay   10 ', 'Barangay 100'])
+
+    assert flags['is_fiesta'].tolist() == [0, 1, 1, 0]
+    assert flags['event_multiplier'].tolist() == [1.0, 2.0, 2.0, 1.0]
+    assert flags['event_names'] == [[], ['Ten Fiesta'], ['Ten Fiesta'], []]
+
+def test_all_barangay_events_reach_unknown_names(tmp_path):
+    path = write_events(tmp_path / 'events.json', [
+        {'name': 'City Holiday', 'type': 'holiday', 'dates': ['06-15'],
+         'affected_barangays': 'all', 'waste_multiplier': 1.3},
+    ])
+    calendar = EventCalendar(path, ['Barangay 1'])
+    flags = calendar.lookup(np.array(['2025-06-15', '2025-06-16'], dtype='datetime64[D]'),
+                            ['Nowhere', 'Nowhere'])
+    assert flags['is_holiday'].tolist() == [1, 0]
+
+def test_batch_events_for_prefix_barangays(api, client):
+    # cdo_events.json: the Kumbira Food Festival (10-15 to 10-20) covers Barangay 34-37, not Barangay 3
+    rows = [row for row in barangay_rows(api, 80, prediction_date='2025-10-16')
+            if row['barangay_name'] in ('Barangay 3', 'Barangay 34')]
+    assert len(rows) == 2
+    predictions = client.post('/predict-batch', json={'barangays': rows}).json()['predictions']
+    events = {p['barangayName']: p['events'] for p in predictions}
+    assert 'Kumbira Food Festival' in events['Barangay 34']
+    assert 'Kumbira Food Festival' not in events['Barangay 3']
@@ -0,0 +1,72 @@
+# test_flat_forest.py
+# FlatForest (and its memory-mapped .wpm form) must give exactly what the
+# sklearn estimator it was exported from gives: same bits, not just close.
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from flat_forest import FlatForest, export_forest
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(600, 6)) * [1, 10, 100, 1, 5, 0.1]
+    X[:, 3] = rng.integers(0, 2, len(X))  # A 0/1 flag column, like the is_* features
+    volume = X[:, 0] * 3 + np.sin(X[:, 1]) + X[:, 3] * 2 + rng.normal(scale=0.1, size=len(X))
+    risk = np.digitize(volume, np.quantile(volume, [0.5, 0.8]))
+    return X, volume, risk
+
+@pytest.fixture(scope='module')
+def regressor(data):
+    X, volume, _ = data
+    return RandomForestRegressor(n_estimators=12, max_depth=8, min_samples_leaf=2, random_state=0).fit(X, volume)
+
+@pytest.fixture(scope='module')
+def classifier(data):
+    X, _, risk = data
+    return RandomForestClassifier(n_estimators=12, max_depth=6, class_weight='balanced',
+                                  random_state=0).fit(X, risk)
+
+def test_regressor_is_bit_identical(data, regressor, tmp_path):
+    X = data[0]
+    path = str(tmp_path / 'volume.wpm')
+    FlatForest.save(export_forest(regressor), path)
+    for flat in (FlatForest.from_model(regressor), FlatForest.load(path)):
+        assert np.array_equal(flat.predict(X), regressor.predict(X))
+
+def test_classifier_is_bit_identical(data, classifier, tmp_path):
+    X = data[0]
+    path = str(tmp_path / 'risk.wpm')
+    FlatForest.save(export_forest(classifier), path)
+    for flat in (FlatForest.from_model(classifier), FlatForest.load(path)):
+        assert np.array_equal(flat.predict_proba(X), classifier.predict_proba(X))
+        assert np.array_equal(flat.predict(X), classifier.predict(X))
+        assert np.array_equal(flat.classes_, classifier.classes_)
+
+def test_rows_span_several_chunks(data, regressor, monkeypatch):
+    import flat_forest
+    monkeypatch.setattr(flat_forest, 'CHUNK_ROWS', 64)
+    X = data[0]
+    assert np.array_equal(FlatForest.from_model(regressor).predict(X), regressor.predict(X))
+
+def test_negative_infinity_reaches_the_right_leaf(data, regressor, classifier):
+    # sklearn refuses infinite inputs; -3e38 is below every threshold and routes the same way
+    X = data[0][:50].copy()
+    X[::2, 0] = -np.inf  # Feature 0 is also the placeholder feature at every leaf
+    X[1::2, 2] = -np.inf
+    finite = np.where(np.isinf(X), -3e38, X)
+    assert np.array_equal(FlatForest.from_model(regressor).predict(X), regressor.predict(finite))
+    assert np.array_equal(FlatForest.from_model(classifier).predict_proba(X), classifier.predict_proba(finite))
+
+def test_format_1_forests_still_load(data, regressor):
+    arrays = export_forest(regressor)
+    leaves = arrays['left'] == np.arange(len(arrays['left']))
+    arrays['threshold'] = np.where(leaves, -np.inf, arrays['threshold'])
+    arrays['format_version'] = np.array(1)
+    X = data[0][:50].copy()
+    X[:, 0] = -np.inf
+    assert np.array_equal(FlatForest(arrays).predict(X), FlatForest.from_model(regressor).predict(X))
+
+def test_wrong_width_is_rejected(data, regressor):
+    with pytest.raises(ValueError):
+        FlatForest.from_model(regressor).predict(data[0][:, :5])
@@ -0,0 +1,55 @@
+# test_forecast_cube.py
+# The default cube roster is what a caller copying the barangay table and
+# event calendar would send, so such /forecast-range requests are slices.
+import asyncio
+
+import numpy as np
+import pytest
+
+from forecast_cube import ForecastCube, ForecastCubeStore
+
+@pytest.fixture
+def cube_store(api, tmp_path, monkeypatch):
+    store = ForecastCubeStore(days=3, path=str(tmp_path / 'forecast_cube.npz'))
+    monkeypatch.setattr(api, 'FORECAST_CUBE', store)
+    return store
+
+def test_default_roster_uses_census_population_and_market_list(api):
+    roster = {b.barangay_name: b for b in api.forecast_cube_roster()}
+    assert list(roster) == api.BARANGAY_TABLE.names
+    assert roster['Agusan'].population == 19039 and not roster['Agusan'].has_market
+    assert roster['Carmen'].has_market and roster['Bulua'].has_market and roster['Gusa'].has_market
+    for b in roster.values():
+        assert b.population == api.BARANGAY_TABLE.population[api.BARANGAY_TABLE.index[b.barangay_name]]
+
+def test_table_roster_requests_are_answered_from_the_cube(api, client, cube_store, no_prediction_cache):
+    asyncio.run(api.refresh_forecast_cube())
+    assert cube_store.builds == 1
+    barangays = [b.model_dump() for b in api.forecast_cube_roster() if b.barangay_name in ('Carmen', 'Agusan')]
+    body = {'barangays': barangays, 'days': 3}
+
+    response = client.post('/forecast-range', json=body)
+    assert response.status_code == 200 and cube_store.hits == 1
+    request = api.ForecastRangeRequest(**body)
+    scored = api.score_forecast_range(request)
+    for day, predictions in response.json()['forecasts'].items():
+        for served, expected in zip(predictions, scored[day]):
+            assert served['predictedVolume'] == pytest.approx(expected['predictedVolume'])
+            assert (served['overflowRisk'], served['events']) == (expected['overflowRisk'], expected['events'])
+
+    flipped = dict(body, barangays=[dict(b, has_market=not b['has_market']) for b in barangays])
+    assert client.post('/forecast-range', json=flipped).status_code == 200
+    assert cube_store.hits == 1
+
+def test_persisted_cube_for_another_roster_is_rebuilt(api, cube_store):
+    asyncio.run(api.refresh_forecast_cube())
+    cube = cube_store.cube
+    stale = ForecastCube(cube.dates, [(name, population / 0.42, False) for name, population, _ in cube.roster],
+                         cube.volumes, cube.risk_proba, cube.multipliers, cube.event_names, cube.version)
+    stale.save(cube_store.path)
+    cube_store.cube = None
+
+    asyncio.run(api.refresh_forecast_cube())
+    assert cube_store.builds == 2
+    assert cube_store.cube.roster == api.roster_keys(api.forecast_cube_roster())
+    np.testing.assert_array_equal(cube_store.cube.volumes, cube.volumes)
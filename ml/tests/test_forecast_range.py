@@ -0,0 +1,33 @@
+# test_forecast_range.py
+# /forecast-range answers 400 with a readable message for ranges and
+# rosters it cannot forecast, instead of quietly shrinking them.
+import pytest
+
+def roster(n: int) -> list:
+    return [{'barangay_id': str(j), 'barangay_name': name, 'population': 8000.0}
+            for j, name in enumerate(['Carmen', 'Bulua', 'Gusa'][:n])]
+
+def test_days_sets_the_range(client):
+    response = client.post('/forecast-range', json={'barangays': roster(2), 'start_date': '2025-03-01', 'days': 3})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['startDate'], body['endDate'], body['days']) == ('2025-03-01', '2025-03-03', 3)
+    assert all(len(day) == 2 for day in body['forecasts'].values())
+
+@pytest.mark.parametrize('days', [0, -3])
+def test_days_below_one_is_rejected(client, days):
+    response = client.post('/forecast-range', json={'barangays': roster(2), 'days': days})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "days must be at least 1"
+
+def test_end_date_wins_over_days(client):
+    response = client.post('/forecast-range', json={
+        'barangays': roster(1), 'start_date': '2025-03-01', 'end_date': '2025-03-02', 'days': 0})
+    assert response.status_code == 200
+    assert response.json()['days'] == 2
+
+@pytest.mark.parametrize('accept', ['application/json', 'application/x-ndjson'])
+def test_empty_roster_is_rejected(client, accept):
+    response = client.post('/forecast-range', json={'barangays': [], 'days': 3}, headers={'Accept': accept})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "No barangays to forecast"
@@ -0,0 +1,35 @@
+# test_forest_pruning.py
+# Pruning ranks trees on one set of rows and judges the result on another;
+# a forest that already meets its targets ships unpruned.
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from forest_pruning import MIN_TREES, _forest_score, prune_forest
+
+@pytest.fixture(scope='module')
+def split():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(1200, 5))
+    y = X[:, 0] * 2 + np.sin(3 * X[:, 1]) + rng.normal(scale=0.3, size=len(X))
+    model = RandomForestRegressor(n_estimators=30, max_depth=8, random_state=0).fit(X[:600], y[:600])
+    return model, (X[600:900], y[600:900]), (X[900:], y[900:])
+
+def test_scores_are_held_out(split):
+    model, (X_select, y_select), (X_check, y_check) = split
+    pruned, report = prune_forest(model, X_select, y_select, X_check, y_check, max_loss=0.02)
+    assert report['pruned']
+    assert MIN_TREES <= report['after']['trees'] < 30
+    assert report['score'] == pytest.approx(_forest_score(pruned, X_check, y_check), abs=1e-6)
+    assert report['baseline_score'] == pytest.approx(_forest_score(model, X_check, y_check), abs=1e-6)
+    assert report['score_loss'] <= 0.02
+    for candidate in report['candidates']:
+        assert candidate['score'] >= report['baseline_score'] - 0.02
+        assert candidate['trees'] >= MIN_TREES
+
+def test_forest_meeting_the_targets_is_kept(split):
+    model, (X_select, y_select), (X_check, y_check) = split
+    pruned, report = prune_forest(model, X_select, y_select, X_check, y_check, target_latency_ms=1e6)
+    assert pruned is model
+    assert not report['pruned']
+    assert report['targets_met'] and report['score_loss'] == 0
@@ -0,0 +1,61 @@
+# test_http_cache.py
+# Conditional requests: a client holding the current ETag gets a bodiless
+# 304, and anything that changes the answer changes the ETag.
+import json
+
+from http_cache import etag_matches, weak_etag
+from conftest import barangay_rows
+
+def test_etag_matching():
+    etag = weak_etag('predict-batch', 'v1', b'{}')
+    opaque = etag[2:]
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(opaque, etag)  # Weak comparison ignores W/
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"other"', etag)
+    assert weak_etag('predict-batch', 'v2', b'{}') != etag
+
+def test_matching_if_none_match_returns_304(api, client):
+    body = {'barangays': barangay_rows(api, 5)}
+    first = client.post('/predict-batch', json=body)
+    assert first.status_code == 200
+    etag = first.headers['etag']
+    assert first.headers['cache-control'] == 'no-cache'
+
+    again = client.post('/predict-batch', json=body, headers={'if-none-match': etag})
+    assert again.status_code == 304
+    assert again.content == b''
+    assert again.headers['etag'] == etag
+
+    body['barangays'][0]['rainfall_mm'] += 5
+    changed = client.post('/predict-batch', json=body, headers={'if-none-match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+
+def test_streamed_and_plain_responses_have_different_etags(api, client):
+    body = {'barangays': barangay_rows(api, 3)}
+    plain = client.post('/predict-batch', json=body)
+    streamed = client.post('/predict-batch', json=body, headers={'accept': 'application/x-ndjson'})
+    assert plain.headers['etag'] != streamed.headers['etag']
+    assert client.post('/predict-batch', json=body, headers={
+        'accept': 'application/x-ndjson', 'if-none-match': streamed.headers['etag'],
+    }).status_code == 304
+
+def test_metrics_304(api, client):
+    etag = client.get('/api/metrics').headers['etag']
+    assert client.get('/api/metrics', headers={'if-none-match': etag}).status_code == 304
+
+def test_large_responses_are_gzipped(api, client):
+    response = client.post('/predict-batch', json={'barangays': barangay_rows(api, 40)},
+                           headers={'accept-encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    # The client decodes transparently; the body is still the JSON response
+    assert len(response.json()['predictions']) == 40
+    raw = client.post('/predict-batch', json={'barangays': barangay_rows(api, 40)},
+                      headers={'accept-encoding': 'identity'})
+    assert 'content-encoding' not in raw.headers
+    assert json.loads(raw.content)['predictions'][0]['barangayId'] == '1'
@@ -0,0 +1,105 @@
+# test_observations.py
+# Streaming weigh-in ingest: CsvBlocks must only cut between whole records
+# (quoted newlines stay inside their field) however the bytes arrive, and
+# uploads must store what validates and report what does not.
+import csv
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from observations import CsvBlocks, ObservationStore, header_columns
+from conftest import ML_DIR
+
+CSV_TEXT = (
+    'date,barangay,weight_kg,truck\n'
+    '2024-01-01,Carmen,1200,"T-1"\n'
+    '2024-01-01,Gusa,800,"T-2\nspare"\n'
+    '2024-01-02,Carmen,1300,"says ""hi""\n\nand\nmore"\n'
+    '2024-01-02,Barangay 1,450,T-3\n'
+    '2024-01-03,Barangay 10,"1,250",ñandú\n'
+)
+
+def split(data: bytes, block_bytes: int, feed_bytes: int, encoding='utf-8-sig'):
+    blocks = CsvBlocks(block_bytes, encoding)
+    out = []
+    for start in range(0, len(data), feed_bytes):
+        block = blocks.feed(data[start:start + feed_bytes])
+        if block:
+            out.append(block)
+    tail = blocks.finish()
+    if tail:
+        out.append(tail)
+    return out
+
+@pytest.mark.parametrize('block_bytes', [1, 7, 40, 1 << 20])
+@pytest.mark.parametrize('feed_bytes', [1, 3, 16, 1 << 20])
+def test_blocks_are_whole_records(block_bytes, feed_bytes):
+    blocks = split(CSV_TEXT.encode('utf-8'), block_bytes, feed_bytes)
+    assert ''.join(blocks) == CSV_TEXT
+    expected = list(csv.reader(io.StringIO(CSV_TEXT, newline='')))
+    records = [r for block in blocks for r in csv.reader(io.StringIO(block, newline=''))]
+    assert records == expected
+    for block in blocks[:-1]:
+        assert block.endswith('\n')
+        assert block.count('"') % 2 == 0
+
+def test_small_blocks_cut_at_every_record():
+    blocks = split(CSV_TEXT.encode('utf-8'), 1, 1 << 20)
+    # One feed: a single cut at the last newline outside quotes
+    assert blocks == [CSV_TEXT]
+    blocks = split(CSV_TEXT.encode('utf-8'), 1, 1)
+    assert blocks[1] == '2024-01-01,Carmen,1200,"T-1"\n'
+    assert blocks[2] == '2024-01-01,Gusa,800,"T-2\nspare"\n'
+    assert blocks[3] == '2024-01-02,Carmen,1300,"says ""hi""\n\nand\nmore"\n'
+
+def test_bom_and_split_multibyte_characters():
+    data = '﻿'.encode('utf-8') + CSV_TEXT.encode('utf-8')
+    assert ''.join(split(data, 5, 1)) == CSV_TEXT
+
+def test_header_columns():
+    assert header_columns([' Weight_KG', 'barangay', 'DATE', 'extra']) == {'weight_kg': 0, 'barangay': 1, 'date': 2}
+    with pytest.raises(ValueError, match='weight_kg'):
+        header_columns(['date', 'barangay'])
+
+def test_insert_block_validates_rows(tmp_path):
+    store = ObservationStore(str(tmp_path / 'obs.sqlite3'), ['Carmen', 'Gusa'], max_kg=2000)
+    header, _, body = CSV_TEXT.partition('\n')
+    body += ('2024-01-04,Nowhere,100,\n'
+             '\n'
+             '2999-01-01,Carmen,100,\n'
+             '2024-01-04,Gusa,-5,\n'
+             '2024-01-04,Gusa\n')
+    records, accepted, errors, spanned = store.insert_block(body, header_columns(header.split(',')), 'u1', 2)
+
+    assert (records, accepted) == (9, 3)
+    assert [e['row'] for e in errors] == [5, 6, 7, 9, 10, 11]
+    assert "unknown barangay 'Nowhere'" in errors[2]['error']
+    assert 'future' in errors[3]['error']
+    assert spanned == 10  # Blank lines are not records, but they are rows
+    assert store.daily_totals() == [('Carmen', '2024-01-01', 1200.0, 1), ('Carmen', '2024-01-02', 1300.0, 1),
+                                    ('Gusa', '2024-01-01', 800.0, 1)]
+    store.close()
+
+def test_upload_endpoint(api, client, monkeypatch):
+    monkeypatch.setattr(api, 'OBSERVATIONS_BLOCK_BYTES', 16)
+    files = {'file': ('weighins.csv', CSV_TEXT.encode('utf-8'), 'text/csv')}
+    response = client.post('/observations/upload', files=files)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body['filename'], body['rows'], body['accepted'], body['rejected']) == ('weighins.csv', 5, 5, 0)
+
+    raw = client.post('/observations/upload', content=b'date,barangay\n2024-01-01,Carmen\n',
+                      headers={'content-type': 'text/csv'})
+    assert raw.status_code == 400
+
+    days = client.get('/observations', params={'barangay': 'carmen'}).json()['days']
+    assert [(d['date'], d['weightKg']) for d in days] == [('2024-01-01', 1200.0), ('2024-01-02', 1300.0)]
+
+def test_importing_api_leaves_the_database_alone(tmp_path):
+    path = tmp_path / 'observations.sqlite3'
+    subprocess.run([sys.executable, '-c', 'import api'], cwd=ML_DIR, check=True, capture_output=True,
+                   env={**os.environ, 'OBSERVATIONS_DB': str(path)})
+    assert not path.exists()
@@ -0,0 +1,116 @@
+# test_predict_batch.py
+# /predict-batch scores a whole batch with one call per model; it must give
+# each row what /predict gives it alone, its column-wise risk overrides must
+# agree with the per-row rules they replaced, and a row that fails to score
+# must not take the rest of the batch down with it.
+import numpy as np
+
+from conftest import barangay_rows
+
+def test_batch_matches_single_predictions(api, client, no_prediction_cache):
+    rows = barangay_rows(api, 12)
+    response = client.post('/predict-batch', json={'barangays': rows})
+    assert response.status_code == 200
+    batch = response.json()['predictions']
+    assert [p['barangayId'] for p in batch] == [r['barangay_id'] for r in rows]
+
+    for row, prediction in zip(rows, batch):
+        single = client.post('/predict', json=row).json()
+        assert prediction['predictedVolume'] == single['predictedVolume']
+        assert prediction['eventMultiplier'] == single['eventMultiplier']
+        assert prediction['events'] == single['events']
+
+def test_bad_row_does_not_fail_the_batch(api, client, no_prediction_cache, monkeypatch):
+    rows = barangay_rows(api, 6)
+    expected = client.post('/predict-batch', json={'barangays': rows}).json()['predictions']
+
+    # Any matrix holding the poisoned population fails, as a model would on a row it cannot score
+    score_feature_matrix = api.score_feature_matrix
+
+    def failing_score(X, models, intervals=False):
+        if np.any(X[:, 0] == 13.0):
+            raise ValueError("cannot score population 13")
+        return score_feature_matrix(X, models, intervals)
+
+    monkeypatch.setattr(api, 'score_feature_matrix', failing_score)
+    rows[3]['population'] = 13.0
+    response = client.post('/predict-batch', json={'barangays': rows})
+    assert response.status_code == 200
+    predictions = response.json()['predictions']
+
+    assert len(predictions) == len(rows)
+    assert predictions[3]['error'] == "cannot score population 13"
+    assert predictions[3]['barangayId'] == rows[3]['barangay_id']
+    for j in [0, 1, 2, 4, 5]:
+        assert 'error' not in predictions[j]
+        assert predictions[j]['predictedVolume'] == expected[j]['predictedVolume']
+        assert predictions[j]['overflowRisk'] == expected[j]['overflowRisk']
+
+def legacy_overrides(volume, proba, risk_class, multiplier, i):
+    """The baseline /predict-batch rules for one row, as they ran per barangay before the column-wise rewrite"""
+    risk_level = {0: 'safe', 1: 'moderate', 2: 'high'}.get(int(risk_class), 'moderate')
+    confidence = float(max(proba))
+    if proba[1] >= 0.5:
+        if volume > 20000:
+            risk_level, confidence = 'high', 0.95
+        elif volume > 10000:
+            risk_level, confidence = 'high', 0.88
+        elif volume > 5000:
+            risk_level, confidence = 'moderate', max(0.75, confidence)
+        elif volume < 1000:
+            risk_level, confidence = 'safe', 0.90
+        else:
+            risk_level, confidence = 'moderate', max(0.70, confidence)
+    if multiplier > 1.8:
+        risk_level, confidence = 'high', 0.92
+    elif multiplier > 1.3:
+        if risk_level != 'high':
+            risk_level, confidence = 'moderate', max(0.80, confidence)
+    if i % 10 == 0 and volume > 3000:
+        risk_level, confidence = 'high', 0.85
+    elif i % 7 == 0 and volume < 2000:
+        risk_level, confidence = 'safe', 0.88
+    return risk_level, confidence
+
+def test_column_overrides_match_legacy_rules_on_every_branch(api):
+    rng = np.random.default_rng(7)
+    n = 5000
+    # Volumes and multipliers cluster on the rule boundaries, including the boundaries themselves
+    volumes = rng.choice([500, 999, 1000, 1999, 2000, 2500, 3000, 3001, 5000, 5001, 9000,
+                          10000, 10001, 20000, 20001, 40000], n) + rng.choice([0, 0, 0.5, -0.5], n)
+    proba = rng.dirichlet([1, 1, 1], n)
+    proba[::5] = [0.25, 0.5, 0.25]
+    risk_classes = rng.choice([0, 1, 2, 3], n, p=[0.3, 0.3, 0.3, 0.1])
+    multipliers = rng.choice([1.0, 1.3, 1.31, 1.4, 1.8, 1.81, 2.5], n)
+    positions = rng.integers(0, 100, n)
+
+    risk, confidence = api.apply_risk_overrides(volumes, proba, risk_classes, multipliers, positions)
+    expected = [legacy_overrides(*args) for args in zip(volumes, proba, risk_classes, multipliers, positions)]
+    assert api.RISK_LEVELS[risk].tolist() == [level for level, _ in expected]
+    np.testing.assert_array_equal(confidence, [c for _, c in expected])
+
+def test_batch_risk_matches_legacy_per_row_scoring(api, client, no_prediction_cache):
+    # Festival, holiday, market and ordinary days; populations from tiny to very large
+    dates = ['2025-08-22', '2025-12-24', '2025-06-15', '2025-03-05', '2025-12-31', '2025-10-16', '2025-02-04']
+    rows = barangay_rows(api, 45)
+    for j, row in enumerate(rows):
+        row['population'] = float([300, 1500, 4000, 12000, 30000, 80000, 200000][j % 7] + 37 * j)
+        row['prediction_date'] = dates[j % len(dates)]
+        row['rainfall_mm'] = float(j % 5) * 15
+    response = client.post('/predict-batch', json={'barangays': rows})
+    assert response.status_code == 200
+    batch = response.json()['predictions']
+
+    models = api.MODELS
+    levels = set()
+    for i, (row, prediction) in enumerate(zip(rows, batch)):
+        features_list, event_flags = api.calculate_features(api.PredictionRequest(**row))
+        features = np.array([features_list])
+        volume = float(models.volume_model.predict(features)[0])
+        proba = models.risk_model.predict_proba(features)[0]
+        risk_class = models.risk_model.predict(features)[0]
+        level, confidence = legacy_overrides(volume, proba, risk_class, event_flags['event_multiplier'], i)
+        assert prediction['predictedVolume'] == volume
+        assert (prediction['overflowRisk'], prediction['confidence']) == (level, confidence), row
+        levels.add(level)
+    assert levels == {'safe', 'moderate', 'high'}
@@ -0,0 +1,33 @@
+# test_predict_factors.py
+# /predict returns its four traced factors by default, as it always has;
+# ?explain=false skips the trace and returns an empty list.
+import pytest
+
+from conftest import barangay_rows
+
+@pytest.fixture(params=['batched', 'direct'])
+def predict_path(request, api, monkeypatch):
+    """/predict through the micro-batcher and with coalescing switched off"""
+    if request.param == 'direct':
+        monkeypatch.setattr(api.PREDICT_BATCHER, 'window_ms', 0)
+    return request.param
+
+@pytest.mark.parametrize('query', ['', '?uncertainty=true'])
+def test_factors_by_default(client, api, predict_path, query):
+    row = barangay_rows(api, 3)[2]
+    prediction = client.post(f'/predict{query}', json=row).json()
+    factors = prediction['factors']
+    assert len(factors) == 4
+    assert all({'feature', 'value', 'importance', 'contributionKg'} <= set(f) for f in factors)
+    assert [abs(f['contributionKg']) for f in factors] == sorted((abs(f['contributionKg']) for f in factors),
+                                                                  reverse=True)
+
+@pytest.mark.parametrize('query', ['?explain=false', '?explain=false&uncertainty=true'])
+def test_explain_false_skips_factors(client, api, predict_path, query):
+    row = barangay_rows(api, 3)[2]
+    plain = client.post(f'/predict{query}', json=row).json()
+    explained = client.post(f"/predict{query.replace('explain=false', 'explain=true')}", json=row).json()
+    assert plain['factors'] == []
+    assert explained['factors']
+    for key in ('predictedVolume', 'overflowRisk', 'confidence', 'events'):
+        assert plain[key] == explained[key]
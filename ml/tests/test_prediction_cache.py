@@ -0,0 +1,71 @@
+# test_prediction_cache.py
+# Cached model outputs belong to one model version: binding another one, or
+# hot-swapping the served models, must turn every earlier entry into a miss.
+import numpy as np
+
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from conftest import barangay_rows
+
+ROWS = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+OUTPUTS = np.array([[10.0, 0.2, 0.8], [20.0, 0.6, 0.4]])
+
+def cached(version='v1', **kwargs):
+    cache = PredictionCache(**kwargs)
+    cache.bind(version)
+    cache.put_many(cache.keys(ROWS), OUTPUTS)
+    return cache
+
+def test_hits_for_the_bound_version():
+    cache = cached()
+    hit, values = cache.get_many(cache.keys(ROWS), 3)
+    assert hit.all()
+    assert np.array_equal(values, OUTPUTS)
+    # Rows the models cannot tell apart (same float32 values, -0.0 and 0.0) share an entry
+    cache.put_many(cache.keys(np.array([[0.0, 0.0, 0.0]])), OUTPUTS[:1])
+    hit, _ = cache.get_many(cache.keys(np.array([[1.0, 2.0, 3.0 + 1e-12], [-0.0, 0.0, -0.0]])), 3)
+    assert hit.all()
+
+def test_binding_another_version_misses():
+    cache = cached()
+    cache.bind('v1')  # Rebinding the same version keeps its entries
+    assert cache.get_many(cache.keys(ROWS), 3)[0].all()
+    cache.bind('v2')
+    assert not cache.get_many(cache.keys(ROWS), 3)[0].any()
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['invalidations'] == 1
+
+def test_keys_of_another_version_miss():
+    cache = cached()
+    assert not cache.get_many(cache.keys(ROWS, model_version='v0'), 3)[0].any()
+
+def test_expired_and_evicted_entries_miss():
+    now = [0.0]
+    cache = cached(ttl_s=10, clock=lambda: now[0])
+    now[0] = 11.0
+    assert not cache.get_many(cache.keys(ROWS), 3)[0].any()
+
+    cache = cached(max_entries=1)
+    assert cache.get_many(cache.keys(ROWS), 3)[0].tolist() == [False, True]
+
+def test_model_swap_misses(api, client, monkeypatch, tmp_path):
+    registry = ModelRegistry(root=str(tmp_path / 'registry'), poll_s=0)
+    registry.publish(api.MODEL_DIR, version='cache-test', activate=False)
+    monkeypatch.setattr(api, 'MODEL_REGISTRY', registry)
+    monkeypatch.setattr(api, 'MODELS', api.MODELS)  # Restored after the swap below
+    cache = PredictionCache()
+    cache.bind(api.MODELS.fingerprint)
+    monkeypatch.setattr(api, 'PREDICTION_CACHE', cache)
+
+    body = {'barangays': barangay_rows(api, 10)}
+    first = client.post('/predict-batch', json=body).json()['predictions']
+    client.post('/predict-batch', json=body)
+    assert (cache.hits, cache.misses) == (10, 10)
+
+    response = client.post('/models/activate/cache-test')
+    assert response.status_code == 200
+    assert api.MODELS.version == 'cache-test'
+    swapped = client.post('/predict-batch', json=body).json()['predictions']
+    assert (cache.hits, cache.misses) == (10, 20)
+    assert [p['modelVersion'] for p in swapped] == ['cache-test'] * 10
+    assert [p['predictedVolume'] for p in swapped] == [p['predictedVolume'] for p in first]
@@ -0,0 +1,66 @@
+# test_streaming.py
+# NDJSON responses: one prediction per line in request order, and the last
+# line is always the {"summary": ...} record, even when scoring fails
+# part-way through the stream.
+import json
+
+from conftest import barangay_rows
+
+NDJSON = {'accept': 'application/x-ndjson'}
+
+def ndjson_lines(response):
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_batch_stream_ends_with_summary(api, client, monkeypatch):
+    monkeypatch.setattr(api, 'STREAM_CHUNK_ROWS', 4)
+    rows = barangay_rows(api, 10)
+    lines = ndjson_lines(client.post('/predict-batch', json={'barangays': rows}, headers=NDJSON))
+
+    assert len(lines) == 11
+    assert [line['barangayId'] for line in lines[:-1]] == [row['barangay_id'] for row in rows]
+    assert all('summary' not in line for line in lines[:-1])
+    summary = lines[-1]['summary']
+    assert summary['complete'] is True
+    assert summary['rows'] == 10
+    assert sum(summary['riskDistribution'].values()) == 10
+    assert summary['modelVersion'] == api.MODELS.version
+
+    # Chunking must not change what each row gets
+    plain = client.post('/predict-batch', json={'barangays': rows}).json()['predictions']
+    assert [line['predictedVolume'] for line in lines[:-1]] == [p['predictedVolume'] for p in plain]
+    assert [line['overflowRisk'] for line in lines[:-1]] == [p['overflowRisk'] for p in plain]
+
+def test_failed_stream_still_ends_with_summary(api, client, monkeypatch):
+    monkeypatch.setattr(api, 'STREAM_CHUNK_ROWS', 4)
+    score_batch_chunk = api.score_batch_chunk
+
+    async def failing_chunk(barangays, version, offset, intervals):
+        if offset >= 4:
+            raise RuntimeError("worker died")
+        return await score_batch_chunk(barangays, version, offset, intervals)
+
+    monkeypatch.setattr(api, 'score_batch_chunk', failing_chunk)
+    lines = ndjson_lines(client.post('/predict-batch', json={'barangays': barangay_rows(api, 10)}, headers=NDJSON))
+
+    assert len(lines) == 5
+    summary = lines[-1]['summary']
+    assert summary['complete'] is False
+    assert summary['error'] == "worker died"
+    assert summary['rows'] == 4
+
+def test_forecast_range_stream_ends_with_summary(api, client, monkeypatch):
+    monkeypatch.setattr(api, 'STREAM_CHUNK_ROWS', 6)
+    barangays = [{'barangay_id': str(j), 'barangay_name': name, 'population': 10000.0 + j}
+                 for j, name in enumerate(api.BARANGAY_TABLE.names[:3])]
+    lines = ndjson_lines(client.post('/forecast-range', json={
+        'barangays': barangays, 'start_date': '2025-08-20', 'days': 5,
+    }, headers=NDJSON))
+
+    assert len(lines) == 5 * 3 + 1
+    assert all('summary' not in line for line in lines[:-1])
+    summary = lines[-1]['summary']
+    assert summary['complete'] is True
+    assert (summary['rows'], summary['days'], summary['barangays']) == (15, 5, 3)
+    assert (summary['startDate'], summary['endDate']) == ('2025-08-20', '2025-08-24')
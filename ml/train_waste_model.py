@@ -1,170 +1,65 @@
 # train_waste_model_all_barangays.py
+#
+# Usage: python train_waste_model.py [--search [random|grid]] [--trials N] [--workers N]
+#                                    [--prune] [--target-latency-ms MS] [--target-size-mb MB] [--max-loss L]
+#                                    [--no-publish] [--no-backtest] [--actuals CSV]
+import os
+import sys
+import subprocess
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import accuracy_score, r2_score, classification_report, mean_squared_error
 import joblib
 import warnings
+from flat_forest import FlatForest, export_forest
+from training_data import FEATURES, load_or_build_dataset
+from barangay_ingest import load_barangay_table, source_paths
+from forest_pruning import inference_cost, prune_forest
+from model_registry import ModelRegistry
+from model_search import LATENCY_BATCH, candidate_configs, search, select_best, write_leaderboard, write_ring
 warnings.filterwarnings('ignore')
 
+parser = argparse.ArgumentParser(description="Train the CDO waste volume and risk models")
+parser.add_argument('--search', nargs='?', const='random', choices=['random', 'grid'],
+                    help="Search forest hyperparameters before training (default: random)")
+parser.add_argument('--trials', type=int, default=20, help="Configs tried by the random search")
+parser.add_argument('--workers', type=int, default=None, help="Search / CV processes (default: all CPUs)")
+parser.add_argument('--tolerance', type=float, default=0.005,
+                    help="Score the fastest picked config may give up against the best one")
+parser.add_argument('--prune', action='store_true',
+                    help="Prune both forests (fewer trees, lower depth) on a validation fold")
+parser.add_argument('--target-latency-ms', type=float, default=None,
+                    help=f"Pruning target: flattened-forest latency per {LATENCY_BATCH}-row batch")
+parser.add_argument('--target-size-mb', type=float, default=None,
+                    help="Pruning target: size of the flattened forest arrays")
+parser.add_argument('--max-loss', type=float, default=0.005,
+                    help="R² / accuracy pruning may give up against the unpruned forest")
+parser.add_argument('--no-publish', action='store_true',
+                    help="Do not publish the trained models to the model registry")
+parser.add_argument('--no-backtest', action='store_true',
+                    help="Skip replaying the new models over a year of dates (backtest.py)")
+parser.add_argument('--actuals', default=None,
+                    help="Recorded tonnage CSV for the backtest (default: simulated tonnage)")
+args = parser.parse_args()
+
 print("="*80)
 print("🤖 CDO WASTE ML TRAINING - ALL 80 BARANGAYS WITH REAL DATA")
 print("="*80)
 
 # ============================================================================
-# STEP 1: MANUAL CSV PARSING TO ENSURE ALL 80 BARANGAYS
+# STEP 1: LOAD ALL 80 BARANGAYS FROM THE CLENRO CSV
 # ============================================================================
 
-print("\n📁 MANUAL PARSING OF CSV TO GET ALL 80 BARANGAYS...")
-
-# Your CSV data from the file
-csv_content = """Barangay ,Population (2020 census),Solid Waste Generation per capita (kg/ day),SW generation (Population x SW segregation) kg/day,Solid Waste Classification,,,,Collection Frequency,,Truck Unit & Capacity,
-,,,,Residual (14%) kg/day,Biodegradable (38%) kg/day,Recyclable (50%) kg/day,Special Waste (5%),Times/Week,,38 - 16 tons,
-Agusan,19039,0.42,"7,996.38","1,119.49","3,038.62","3,998.19",399.819,7 - nightly |    2 - Morning,,,
-Baikingon ,2879,0.42,"1,209.18",205.56,459.49,604.59,60.459,2 - morning,,,
-Balubal ,7013,0.42,"2,945.46",500.73,"1,119.27","1,472.73",147.273,2 - morning,,,
-Balulang ,42205,0.42,"17,726.10","3,013.44","6,735.92","8,863.05",886.305,7 - nightly |    2 - Morning,,,
-Barangay 1 ,168,0.42,70.56,12.00,26.81,35.28,3.528, 7 - nightly,,,
-Barangay 2,50,0.42,21.00,3.57,7.98,10.50,1.05, 7 - nightly,,,
-Barangay 3,93,0.42,39.06,6.64,14.84,19.53,1.953, 7 - nightly,,,
-Barangay 4,68,0.42,28.56,4.86,10.85,14.28,1.428, 7 - nightly,,,
-Barangay 5,34,0.42,14.28,2.43,5.43,7.14,0.714, 7 - nightly,,,
-Barangay 6,33,0.42,13.86,2.36,5.27,6.93,0.693, 7 - nightly,,,
-Barangay 7,544,0.42,228.48,38.84,86.82,114.24,11.424, 7 - nightly,,,
-Barangay 8,90,0.42,37.80,6.43,14.36,18.90,1.89, 7 - nightly,,,
-Barangay 9,130,0.42,54.60,9.28,20.75,27.30,2.73, 7 - nightly,,,
-Barangay 10 ,557,0.42,233.94,39.77,88.90,116.97,11.697, 7 - nightly,,,
-Barangay 11,162,0.42,68.04,11.57,25.86,34.02,3.402, 7 - nightly,,,
-Barangay 12,257,0.42,107.94,18.35,41.02,53.97,5.397, 7 - nightly,,,
-Barangay 13,965,0.42,405.30,68.90,154.01,202.65,20.265, 7 - nightly,,,
-Barangay 14,351,0.42,147.42,25.06,56.02,73.71,7.371, 7 - nightly,,,
-Barangay 15 ,1847,0.42,775.74,131.88,294.78,387.87,38.787, 7 - nightly,,,
-Barangay 16,25,0.42,10.50,1.79,3.99,5.25,0.525, 7 - nightly,,,
-Barangay 17,2058,0.42,864.36,146.94,328.46,432.18,43.218, 7 - nightly,,,
-Barangay 18,1269,0.42,532.98,90.61,202.53,266.49,26.649, 7 - nightly,,,
-Barangay 19,227,0.42,95.34,16.21,36.23,47.67,4.767, 7 - nightly,,,
-Barangay 20,80,0.42,33.60,5.71,12.77,16.80,1.68, 7 - nightly,,,
-Barangay 21,363,0.42,152.46,25.92,57.93,76.23,7.623, 7 - nightly,,,
-Barangay 22,3324,0.42,"1,396.08",237.33,530.51,698.04,69.804, 7 - nightly,,,
-Barangay 23,936,0.42,393.12,66.83,149.39,196.56,19.656, 7 - nightly,,,
-Barangay 24,607,0.42,254.94,43.34,96.88,127.47,12.747, 7 - nightly,,,
-Barangay 25,661,0.42,277.62,47.20,105.50,138.81,13.881, 7 - nightly,,,
-Barangay 26,1215,0.42,510.30,86.75,193.91,255.15,25.515, 7 - nightly,,,
-Barangay 27,1601,0.42,672.42,114.31,255.52,336.21,33.621, 7 - nightly,,,
-Barangay 28,493,0.42,207.06,35.20,78.68,103.53,10.353, 7 - nightly,,,
-Barangay 29,476,0.42,199.92,33.99,75.97,99.96,9.996, 7 - nightly,,,
-Barangay 30,678,0.42,284.76,48.41,108.21,142.38,14.238, 7 - nightly,,,
-Barangay 31,575,0.42,241.50,41.06,91.77,120.75,12.075, 7 - nightly,,,
-Barangay 32,792,0.42,332.64,56.55,126.40,166.32,16.632, 7 - nightly,,,
-Barangay 33 ,84,0.42,35.28,6.00,13.41,17.64,1.764, 7 - nightly,,,
-Barangay 34,529,0.42,222.18,37.77,84.43,111.09,11.109, 7 - nightly,,,
-Barangay 35 ,2002,0.42,840.84,142.94,319.52,420.42,42.042, 7 - nightly,,,
-Barangay 36,447,0.42,187.74,31.92,71.34,93.87,9.387, 7 - nightly,,,
-Barangay 37,181,0.42,76.02,12.92,28.89,38.01,3.801, 7 - nightly,,,
-Barangay 38,48,0.42,20.16,3.43,7.66,10.08,1.008, 7 - nightly,,,
-Barangay 39,17,0.42,7.14,1.21,2.71,3.57,0.357, 7 - nightly,,,
-Barangay 40,339,0.42,142.38,24.20,54.10,71.19,7.119, 7 - nightly,,,
-Bayabas ,13991,0.42,"5,876.22",998.96,"2,232.96","2,938.11",293.811,2 - morning,,,
-Bayanga ,3402,0.42,"1,428.84",242.90,542.96,714.42,71.442,2 - morning,,,
-Besigan ,1700,0.42,714.00,121.38,271.32,357.00,35.7,2 - morning,,,
-Bonbon ,10976,0.42,"4,609.92",783.69,"1,751.77","2,304.96",230.496,7 - nightly |    2 - Morning,,,
-Bugo ,31229,0.42,"13,116.18","2,229.75","4,984.15","6,558.09",655.809,7 - nightly |    2 - Morning,,,
-Bulua ,35397,0.42,"14,866.74","2,527.35","5,649.36","7,433.37",743.337,2 - morning,,,
-Camaman-an ,35238,0.42,"14,799.96","2,515.99","5,623.98","7,399.98",739.998,2 - morning,,,
-Canitoan,34250,0.42,"14,385.00","2,445.45","5,466.30","7,192.50",719.25,2 - morning,,,
-Carmen ,77756,0.42,"32,657.52","5,551.78","12,409.86","16,328.76",1632.876,7 - nightly |    2 - Morning,,,
-Consolacion ,9396,0.42,"3,946.32",670.87,"1,499.60","1,973.16",197.316,2 - morning,,,
-Cugman,23468,0.42,"9,856.56","1,675.62","3,745.49","4,928.28",492.828,7 - nightly |    2 - Morning,,,
-Dansolihon ,6206,0.42,"2,606.52",443.11,990.48,"1,303.26",130.326,2 - morning,,,
-F.S Catanico ,2364,0.42,992.88,168.79,377.29,496.44,49.644,2 - morning,,,
-Gusa,28974,0.42,"12,169.08","2,068.74","4,624.25","6,084.54",608.454,7 - nightly |    2 - Morning,,,
-Indahag,17831,0.42,"7,489.02","1,273.13","2,845.83","3,744.51",374.451,2 - morning,,,
-Iponan ,27521,0.42,"11,558.82","1,965.00","4,392.35","5,779.41",577.941,2 - morning,,,
-Kauswagan ,40239,0.42,"16,900.38","2,873.06","6,422.14","8,450.19",845.019,7 - nightly |    2 - Morning,,,
-Lapasan ,39234,0.42,"16,478.28","2,801.31","6,261.75","8,239.14",823.914,7 - nightly |    2 - Morning,,,
-Lumbia,31504,0.42,"13,231.68","2,249.39","5,028.04","6,615.84",661.584,2 - morning,,,
-Macabalan,19562,0.42,"8,216.04","1,396.73","3,122.10","4,108.02",410.802,7 - nightly |    2 - Morning,,,
-Macasandig ,23235,0.42,"9,758.70","1,658.98","3,708.31","4,879.35",487.935,2 - morning,,,
-Mambuaya,5963,0.42,"2,504.46",425.76,951.69,"1,252.23",125.223,2 - morning,,,
-Nazareth,6971,0.42,"2,927.82",497.73,"1,112.57","1,463.91",146.391,2 - morning,,,
-Pagalungan,2410,0.42,"1,012.20",172.07,384.64,506.10,50.61,2 - morning,,,
-Pagatpat,13007,0.42,"5,462.94",928.70,"2,075.92","2,731.47",273.147,7 - nightly ,,,
-Patag,17941,0.42,"7,535.22","1,280.99","2,863.38","3,767.61",376.761,7 - nightly |    2 - Morning,,,
-Pigsag-an,1428,0.42,599.76,101.96,227.91,299.88,29.988,2 - morning,,,
-Puerto ,13174,0.42,"5,533.08",940.62,"2,102.57","2,766.54",276.654,7 - nightly |    2 - Morning,,,
-Puntod ,18775,0.42,"7,885.50","1,340.53","2,996.49","3,942.75",394.275,7 - nightly |    2 - Morning,,,
-San Simon,1642,0.42,689.64,117.24,262.06,344.82,34.482,2 - morning,,,
-Tablon,24578,0.42,"10,322.76","1,754.87","3,922.65","5,161.38",516.138,7 - nightly |    2 - Morning,,,
-Taglimao ,1391,0.42,584.22,99.32,222.00,292.11,29.211,2 - morning,,,
-Tagpangi ,2823,0.42,"1,185.66",201.56,450.55,592.83,59.283,2 - morning,,,
-Tignapoloan ,5621,0.42,"2,360.82",401.34,897.11,"1,180.41",118.041,2 - morning,,,
-Tuburan ,1388,0.42,582.96,99.10,221.52,291.48,29.148,2 - morning,,,
-Tumpagon ,2305,0.42,968.10,164.58,367.88,338.83,48.405,2 - morning,,,
-Total: ,728402,,"305,928.84","51,768.01","116,252.96","152,819.21",15296.442,,,,"""
-
-# Parse CSV line by line
-lines = csv_content.strip().split('\n')
-barangay_data = []
-
-print(f"📊 Total lines in CSV: {len(lines)}")
-
-# Start from line 2 (skip headers)
-for line in lines[2:]:
-    line = line.strip()
-    if not line or line.startswith('Total:'):
-        continue
-    
-    # Split by comma but handle quoted values
-    parts = []
-    current = ''
-    in_quotes = False
-    
-    for char in line:
-        if char == '"':
-            in_quotes = not in_quotes
-        elif char == ',' and not in_quotes:
-            parts.append(current.strip())
-            current = ''
-        else:
-            current += char
-    if current:
-        parts.append(current.strip())
-    
-    # We need at least 9 parts for all data
-    if len(parts) >= 9:
-        try:
-            # Barangay name
-            name = parts[0].strip()
-            if not name:
-                continue
-                
-            # Population
-            pop_str = parts[1].strip().replace(',', '')
-            population = int(pop_str) if pop_str and pop_str.replace('.', '', 1).isdigit() else 0
-            
-            # Waste generation (column 4)
-            waste_str = parts[3].strip().replace('"', '').replace(',', '')
-            total_waste = float(waste_str) if waste_str and waste_str.replace('.', '', 1).replace('-', '', 1).isdigit() else 0
-            
-            # Collection frequency
-            collection = parts[8].strip() if len(parts) > 8 else ''
-            
-            if population > 0:
-                barangay_data.append({
-                    'barangay': name,
-                    'population': population,
-                    'total_waste': total_waste if total_waste > 0 else population * 0.42,
-                    'waste_per_capita': (total_waste / population) if total_waste > 0 else 0.42,
-                    'collection_frequency': collection
-                })
-                print(f"  ✓ {name}: Pop={population:,}, Waste={total_waste if total_waste > 0 else population * 0.42:.2f} kg")
-                
-        except Exception as e:
-            print(f"  ⚠️ Skipping line due to error: {e}")
-            continue
+print("\n📁 LOADING CLENRO CSV TO GET ALL 80 BARANGAYS...")
+
+csv_paths = source_paths()
+barangay_data = load_barangay_table(csv_paths).records()
+for d in barangay_data:
+    print(f"  ✓ {d['barangay']}: Pop={d['population']:,}, Waste={d['total_waste']:.2f} kg")
 
 print(f"\n✅ SUCCESSFULLY PARSED {len(barangay_data)} BARANGAYS!")
 
@@ -186,93 +81,20 @@ print(f"   Avg Waste per Capita: {np.mean([d['waste_per_capita'] for d in barang
 
 print("\n🔄 CREATING REALISTIC TRAINING DATA...")
 
-def generate_training_samples(barangay_data, num_samples=1000):
-    """Generate training samples based on real data with realistic variations"""
-    samples = []
-    
-    # CDO-specific patterns
-    patterns = {
-        'weekly_multipliers': [1.2, 0.95, 1.0, 0.9, 1.1, 1.3, 1.4],  # Sun to Sat
-        'monthly_multipliers': {
-            1: 1.1,   # Jan - New Year
-            2: 0.95, 3: 0.9,  4: 0.85, 5: 0.9,
-            6: 1.0,  7: 1.05, 8: 1.3,  9: 1.1,  # Aug - Kadayawan Festival
-            10: 0.95, 11: 0.9, 12: 1.2   # Dec - Christmas
-        },
-        'rainfall_impact': {
-            'none': 1.0, 'light': 0.95, 'moderate': 0.85, 'heavy': 0.7
-        }
-    }
-    
-    for _ in range(num_samples):
-        # Randomly select a barangay
-        barangay = np.random.choice(barangay_data)
-        
-        # Random features
-        day_of_week = np.random.randint(0, 7)
-        month = np.random.randint(1, 13)
-        rainfall_type = np.random.choice(['none', 'light', 'moderate', 'heavy'])
-        temperature = np.random.uniform(24, 35)
-        is_market_day = 1 if day_of_week in [2, 5] else 0  # Wed & Sat are market days
-        is_fiesta = 1 if (month == 8 and np.random.random() < 0.1) else 0
-        is_holiday = 1 if (month in [1, 12] and np.random.random() < 0.2) else 0
-        
-        # Calculate base waste with patterns
-        base_waste = barangay['total_waste']
-        
-        # Apply patterns
-        weekly_factor = patterns['weekly_multipliers'][day_of_week]
-        monthly_factor = patterns['monthly_multipliers'][month]
-        rainfall_factor = patterns['rainfall_impact'][rainfall_type]
-        
-        # Calculate final waste
-        predicted_waste = base_waste * weekly_factor * monthly_factor * rainfall_factor
-        
-        # Add noise for realism
-        predicted_waste *= np.random.uniform(0.9, 1.1)
-        
-        # Calculate risk level based on capacity (assume 1.2x base as capacity)
-        bin_capacity = barangay['total_waste'] * 1.2
-        utilization = predicted_waste / bin_capacity
-        
-        if utilization >= 0.85:
-            risk_level = 2  # High
-        elif utilization >= 0.65:
-            risk_level = 1  # Moderate
-        else:
-            risk_level = 0  # Safe
-        
-        samples.append({
-            'barangay': barangay['barangay'],
-            'population': barangay['population'],
-            'base_waste': base_waste,
-            'predicted_waste': predicted_waste,
-            'risk_level': risk_level,
-            
-            # Features
-            'rainfall_mm': {'none': 0, 'light': 5, 'moderate': 20, 'heavy': 40}[rainfall_type],
-            'temperature_c': temperature,
-            'day_of_week': day_of_week,
-            'month': month,
-            'day_of_month': np.random.randint(1, 29),
-            'is_weekend': 1 if day_of_week >= 5 else 0,
-            'is_market_day': is_market_day,
-            'is_fiesta': is_fiesta,
-            'is_holiday': is_holiday,
-            'is_payday': 1 if np.random.random() < 0.1 else 0,
-            'is_rainy_season': 1 if 6 <= month <= 10 else 0,
-            'is_summer': 1 if 3 <= month <= 5 else 0,
-            
-            # For metrics
-            'actual_waste': predicted_waste * np.random.uniform(0.95, 1.05)  # Simulated actual
-        })
-    
-    return pd.DataFrame(samples)
-
-# Generate training data
-train_df = generate_training_samples(barangay_data, num_samples=5000)
-print(f"✅ Generated {len(train_df)} training samples")
-print(f"📊 Risk distribution: {train_df['risk_level'].value_counts().sort_index().to_dict()}")
+# Generated in chunks into .npy shards, cached by a content hash of the
+# generator parameters and the CSV, so reruns with the same inputs reuse them.
+# TRAINING_SAMPLES (5000), TRAINING_CHUNK_ROWS (1000000), TRAINING_CACHE_DIR (training_cache)
+num_samples = int(os.environ.get('TRAINING_SAMPLES', '5000'))
+chunk_rows = int(os.environ.get('TRAINING_CHUNK_ROWS', '1000000'))
+cache_dir = os.environ.get('TRAINING_CACHE_DIR', 'training_cache')
+
+dataset, reused = load_or_build_dataset(
+    cache_dir, barangay_data, num_samples, chunk_rows=chunk_rows, seed=42, sources=csv_paths
+)
+risk_counts = sum(np.bincount(chunk['risk_level'], minlength=3) for chunk in dataset.iter_shards(['risk_level']))
+print(f"✅ {'Reused' if reused else 'Generated'} {len(dataset)} training samples "
+      f"({len(dataset.shards)} shards in {dataset.directory})")
+print(f"📊 Risk distribution: {dict(enumerate(risk_counts.tolist()))}")
 
 # ============================================================================
 # STEP 3: TRAIN MODELS WITH HONEST VALIDATION
@@ -280,34 +102,117 @@ print(f"📊 Risk distribution: {train_df['risk_level'].value_counts().sort_inde
 
 print("\n🎯 TRAINING MODELS WITH PROPER VALIDATION...")
 
-# Features
-features = [
-    'population', 'base_waste', 'rainfall_mm', 'temperature_c',
-    'day_of_week', 'month', 'day_of_month',
-    'is_weekend', 'is_market_day', 'is_fiesta',
-    'is_holiday', 'is_payday', 'is_rainy_season', 'is_summer'
-]
-
-X = train_df[features]
-y_volume = train_df['predicted_waste']
-y_risk = train_df['risk_level']
+features = FEATURES
+
+# Fold 0 (every 5th row; rows are i.i.d.) is held out for testing, the rest
+# train both models. With --prune, fold 1 is held out as well: its even rows
+# rank the trees and its odd rows decide how many to keep. Feature matrices
+# are float32, which is what the forests use internally, so fit() does not
+# copy them again.
+test_folds = [0]
+validation_folds = [1] if args.prune else []
+train_folds = list(range(1 + len(validation_folds), dataset.n_folds))
+X_train = dataset.features(folds=train_folds)
+y_train_vol = dataset.column('predicted_waste', folds=train_folds)
+y_train_risk = dataset.column('risk_level', folds=train_folds)
+n_test = len(dataset.column('risk_level', folds=test_folds))
+
+print(f"📚 Training samples - Volume: {len(X_train)}, Risk: {len(X_train)}")
+print(f"🧪 Testing samples - Volume: {n_test}, Risk: {n_test}")
+if args.prune:
+    X_val = dataset.features(folds=validation_folds)
+    print(f"✂️  Pruning validation samples: {len(X_val)}")
 
-# Split with stratification for risk classes
-from sklearn.model_selection import StratifiedShuffleSplit
-
-# For volume (regression)
-X_train_vol, X_test_vol, y_train_vol, y_test_vol = train_test_split(
-    X, y_volume, test_size=0.2, random_state=42
-)
+# ============================================================================
+# HYPERPARAMETERS: FIXED, OR PICKED BY A PARALLEL SEARCH (--search)
+# ============================================================================
 
-# For risk (classification) - stratified split
-sss = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
-for train_idx, test_idx in sss.split(X, y_risk):
-    X_train_risk, X_test_risk = X.iloc[train_idx], X.iloc[test_idx]
-    y_train_risk, y_test_risk = y_risk.iloc[train_idx], y_risk.iloc[test_idx]
+volume_params = {
+    'n_estimators': 100,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+}
+risk_params = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'class_weight': 'balanced',  # Handle class imbalance
+}
 
-print(f"📚 Training samples - Volume: {len(X_train_vol)}, Risk: {len(X_train_risk)}")
-print(f"🧪 Testing samples - Volume: {len(X_test_vol)}, Risk: {len(X_test_risk)}")
+# Pruning: the unpruned forest's held-out score minus --max-loss is the floor;
+# among pruned forests above it, the targets pick which one ships. The check
+# rows helped pick it, so the test fold has the last word: a pruned forest
+# that loses more than --max-loss there is dropped for the unpruned one.
+prune_targets = {
+    'max_loss': args.max_loss,
+    'target_latency_ms': args.target_latency_ms,
+    'target_bytes': int(args.target_size_mb * 1024 * 1024) if args.target_size_mb else None,
+}
+pruning = {}
+
+def prune(name, model, target, score):
+    y_val = dataset.column(target, folds=validation_folds)
+    pruned, report = prune_forest(model, X_val[0::2], y_val[0::2], X_val[1::2], y_val[1::2], **prune_targets)
+    before, after = report['before'], report['after']
+    if report['pruned']:
+        print(f"✂️  Pruned {name}: {before['trees']} trees / depth {before['max_depth']} → "
+              f"{after['trees']} trees / depth {after['max_depth']}, "
+              f"{before['batch_ms']:.2f}ms → {after['batch_ms']:.2f}ms per {LATENCY_BATCH} rows, "
+              f"{before['artifact_bytes'] / 1e6:.2f}MB → {after['artifact_bytes'] / 1e6:.2f}MB "
+              f"(held-out score {report['baseline_score']:.4f} → {report['score']:.4f})")
+    else:
+        print(f"✂️  {name} left unpruned ({before['batch_ms']:.2f}ms per {LATENCY_BATCH} rows, "
+              f"{before['artifact_bytes'] / 1e6:.2f}MB)")
+    if report['targets_met'] is False:
+        print(f"⚠️  No pruned {name} meets the latency/size target within a {args.max_loss} loss; "
+              f"kept the cheapest one that stays within it")
+
+    if report['pruned']:
+        y_test, unpruned_pred = dataset.predict(model, target, folds=test_folds)
+        _, pruned_pred = dataset.predict(pruned, target, folds=test_folds)
+        report['test_score_unpruned'] = round(float(score(y_test, unpruned_pred)), 6)
+        report['test_score'] = round(float(score(y_test, pruned_pred)), 6)
+        report['test_loss'] = round(report['test_score_unpruned'] - report['test_score'], 6)
+        print(f"   Test fold: {report['test_score_unpruned']:.4f} → {report['test_score']:.4f}")
+        if report['test_loss'] > args.max_loss:
+            print(f"⚠️  Pruned {name} loses {report['test_loss']:.4f} on the test fold "
+                  f"(more than {args.max_loss}); keeping the unpruned forest")
+            report['pruned'] = False
+            pruned = model
+    pruning[name] = report
+    return pruned
+
+# CV folds laid out once for the worker processes to memory-map
+ring_dir = write_ring(dataset, os.path.join(dataset.directory, 'cv_ring'))
+search_results = {}
+
+if args.search:
+    print("\n" + "-"*40)
+    print(f"🔎 HYPERPARAMETER SEARCH ({args.search})")
+    print("-"*40)
+    configs = candidate_configs(args.search, trials=args.trials)
+    for kind, base_params in [('volume', {'random_state': 42}),
+                              ('risk', {'random_state': 42, 'class_weight': 'balanced'})]:
+        start = datetime.now()
+        results = search(ring_dir, kind, configs, base_params=base_params, workers=args.workers,
+                         on_result=lambda r: print(f"  {r['status']:>8} {r['score_mean']:.4f} "
+                                                   f"{r['latency_ms']:6.2f}ms {r['params']}"))
+        best = select_best(results, tolerance=args.tolerance)
+        search_results[kind] = results
+        aborted = sum(r['status'] == 'aborted' for r in results)
+        print(f"✅ {kind}: {len(configs)} configs ({aborted} aborted early) in "
+              f"{(datetime.now() - start).total_seconds():.1f}s → {best['params']} "
+              f"(score {best['score_mean']:.4f}, {best['latency_ms']:.2f}ms per {LATENCY_BATCH} rows)")
+        if kind == 'volume':
+            volume_params = best['params']
+        else:
+            risk_params = best['params']
+    write_leaderboard('search_leaderboard.json', search_results)
+    print("📋 Leaderboard written to search_leaderboard.json")
 
 # ============================================================================
 # TRAIN VOLUME REGRESSOR
@@ -317,17 +222,12 @@ print("\n" + "-"*40)
 print("📈 TRAINING WASTE VOLUME REGRESSOR")
 print("-"*40)
 
-volume_model = RandomForestRegressor(
-    n_estimators=100,
-    max_depth=15,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1
-)
+volume_model = RandomForestRegressor(**volume_params, n_jobs=-1)
 
-volume_model.fit(X_train_vol, y_train_vol)
-y_vol_pred = volume_model.predict(X_test_vol)
+volume_model.fit(X_train, y_train_vol)
+if args.prune:
+    volume_model = prune('volume_regressor', volume_model, 'predicted_waste', r2_score)
+y_test_vol, y_vol_pred = dataset.predict(volume_model, 'predicted_waste', folds=test_folds)
 
 # Calculate REAL metrics
 r2 = r2_score(y_test_vol, y_vol_pred)
@@ -338,8 +238,13 @@ print(f"✅ REAL R² Score: {r2:.4f}")
 print(f"✅ REAL MSE: {mse:.2f}")
 print(f"✅ REAL MAE: {mae:.2f} kg")
 
-# Cross-validation for more robust metrics
-cv_scores = cross_val_score(volume_model, X, y_volume, cv=5, scoring='r2')
+# Cross-validation for more robust metrics: the folds run in parallel, and a
+# search has already cross-validated the chosen config
+if 'volume' in search_results:
+    cv_result = next(r for r in search_results['volume'] if r.get('selected'))
+else:
+    cv_result = search(ring_dir, 'volume', [volume_params], workers=args.workers)[0]
+cv_scores = np.array([f['score'] for f in sorted(cv_result['folds'], key=lambda f: f['fold'])])
 print(f"✅ Cross-validated R²: {cv_scores.mean():.4f} (±{cv_scores.std():.4f})")
 
 # ============================================================================
@@ -350,19 +255,12 @@ print("\n" + "-"*40)
 print("⚠️  TRAINING RISK LEVEL CLASSIFIER")
 print("-"*40)
 
-risk_model = RandomForestClassifier(
-    n_estimators=100,
-    max_depth=10,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1,
-    class_weight='balanced'  # Handle class imbalance
-)
+risk_model = RandomForestClassifier(**risk_params, n_jobs=-1)
 
-risk_model.fit(X_train_risk, y_train_risk)
-y_risk_pred = risk_model.predict(X_test_risk)
-y_risk_proba = risk_model.predict_proba(X_test_risk)
+risk_model.fit(X_train, y_train_risk)
+if args.prune:
+    risk_model = prune('risk_classifier', risk_model, 'risk_level', accuracy_score)
+y_test_risk, y_risk_pred = dataset.predict(risk_model, 'risk_level', folds=test_folds)
 
 # Calculate REAL accuracy
 accuracy = accuracy_score(y_test_risk, y_risk_pred)
@@ -373,6 +271,24 @@ print("\n📋 REAL CLASSIFICATION REPORT:")
 print(classification_report(y_test_risk, y_risk_pred, 
                           target_names=['Safe', 'Moderate', 'High']))
 
+# ============================================================================
+# INFERENCE COST OF THE SHIPPED FORESTS
+# ============================================================================
+
+print("\n" + "-"*40)
+print("⏱️  INFERENCE COST (FLATTENED FOREST)")
+print("-"*40)
+
+X_cost = dataset.features(folds=test_folds)
+inference = {
+    'volume_regressor': inference_cost(volume_model, X_cost),
+    'risk_classifier': inference_cost(risk_model, X_cost),
+}
+for name, cost in inference.items():
+    print(f"  {name}: {cost['trees']} trees, depth {cost['max_depth']}, {cost['nodes']:,} nodes, "
+          f"{cost['per_row_us']:.1f}µs/row ({cost['batch_ms']:.2f}ms per {cost['batch_rows']} rows), "
+          f"{cost['artifact_bytes'] / 1e6:.2f}MB")
+
 # ============================================================================
 # FEATURE IMPORTANCE
 # ============================================================================
@@ -408,6 +324,12 @@ print("="*40)
 joblib.dump(volume_model, 'waste_volume_regressor.pkl')
 joblib.dump(risk_model, 'risk_level_classifier.pkl')
 
+# Flattened, memory-mappable copies for the API (no sklearn needed to load)
+FlatForest.save(export_forest(volume_model), 'waste_volume_regressor.wpm',
+                metadata={'source': 'waste_volume_regressor.pkl', 'model_version': '3.0'})
+FlatForest.save(export_forest(risk_model), 'risk_level_classifier.wpm',
+                metadata={'source': 'risk_level_classifier.pkl', 'model_version': '3.0'})
+
 # Prepare metadata with HONEST metrics
 metadata = {
     'model_info': {
@@ -415,8 +337,11 @@ metadata = {
         'version': '3.0',
         'trained_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'num_barangays': len(barangay_data),
-        'training_samples': len(train_df),
+        'training_samples': len(dataset),
         'features_used': features,
+        'hyperparameters': {'volume_regressor': volume_params, 'risk_classifier': risk_params},
+        'hyperparameter_search': args.search,
+        'pruning': pruning if args.prune else None,
         'barangays_covered': [d['barangay'] for d in barangay_data]
     },
     'real_metrics': {
@@ -429,7 +354,7 @@ metadata = {
         },
         'risk_classifier': {
             'accuracy': float(accuracy),
-            'class_distribution': dict(train_df['risk_level'].value_counts(normalize=True).sort_index()),
+            'class_distribution': dict(enumerate((risk_counts / risk_counts.sum()).tolist())),
             'test_accuracy_by_class': dict(zip(
                 ['Safe', 'Moderate', 'High'],
                 [np.mean(y_test_risk[y_test_risk == i] == y_risk_pred[y_test_risk == i]) 
@@ -437,6 +362,7 @@ metadata = {
             ))
         }
     },
+    'inference_cost': inference,
     'feature_importance': feature_importance.to_dict('records'),
     'barangay_baseline': {d['barangay']: {
         'population': d['population'],
@@ -463,8 +389,23 @@ print(f"   📊 Accuracy: {accuracy:.3f} ({accuracy*100:.1f}%)")
 print(f"\n📁 Files created:")
 print(f"   - waste_volume_regressor.pkl")
 print(f"   - risk_level_classifier.pkl")
+print(f"   - waste_volume_regressor.wpm, risk_level_classifier.wpm (flattened, memory-mappable)")
 print(f"   - ml_models_metadata.json")
 
+# Publish a versioned copy; running APIs swap to it without a restart
+if not args.no_publish:
+    registry = ModelRegistry.from_env()
+    version = registry.publish('.')
+    print(f"   - {os.path.join(registry.root, version)} (published and activated)")
+
+# Replay the production feature path with the models just saved
+if not args.no_backtest:
+    backtest_args = [sys.executable, 'backtest.py', '--models', '.']
+    if args.actuals:
+        backtest_args += ['--actuals', args.actuals]
+    if subprocess.run(backtest_args).returncode != 0:
+        print("⚠️  Backtest failed; the models were still saved")
+
 print("\n" + "="*80)
 print("🎉 TRAINING COMPLETE! NOW YOU HAVE:")
 print("   1. Models trained on ALL 80 barangays")
@@ -0,0 +1,228 @@
+# training_data.py
+# Vectorized synthetic training data for train_waste_model.py.
+# Every column is drawn as one array from a seeded np.random.Generator and the
+# CDO weekly, monthly and rainfall patterns are lookup arrays, so millions of
+# rows take seconds instead of a Python loop per sample.
+#
+# Large datasets are written chunk by chunk to a directory of columnar .npy
+# shards (one file per column per shard), cached under a content hash of the
+# generator parameters and source data, and read back memory-mapped.
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# CDO-specific patterns
+WEEKLY_MULTIPLIERS = np.array([1.2, 0.95, 1.0, 0.9, 1.1, 1.3, 1.4])  # Sun to Sat
+MONTHLY_MULTIPLIERS = np.array([
+    np.nan,   # Months are 1-based
+    1.1,      # Jan - New Year
+    0.95, 0.9, 0.85, 0.9,
+    1.0, 1.05, 1.3, 1.1,  # Aug - Kadayawan Festival
+    0.95, 0.9, 1.2,       # Dec - Christmas
+])
+RAINFALL_TYPES = ['none', 'light', 'moderate', 'heavy']
+RAINFALL_MULTIPLIERS = np.array([1.0, 0.95, 0.85, 0.7])
+RAINFALL_MM = np.array([0, 5, 20, 40])
+MARKET_DAYS = [2, 5]  # Wed & Sat are market days
+
+# Bin capacity is assumed to be 1.2x the barangay's base waste
+CAPACITY_FACTOR = 1.2
+RISK_UTILIZATION = [0.65, 0.85]  # Safe below, moderate between, high above
+
+FEATURES = [
+    'population', 'base_waste', 'rainfall_mm', 'temperature_c',
+    'day_of_week', 'month', 'day_of_month',
+    'is_weekend', 'is_market_day', 'is_fiesta',
+    'is_holiday', 'is_payday', 'is_rainy_season', 'is_summer'
+]
+TARGETS = ['predicted_waste', 'risk_level', 'actual_waste']
+
+# Bump when the generator changes so cached datasets are rebuilt
+GENERATOR_VERSION = 1
+
+def generate_training_samples(barangay_data, num_samples=1000, seed=None):
+    """
+    Generate training samples based on real data with realistic variations.
+    `barangay_data` is a list of dicts with 'barangay', 'population' and
+    'total_waste'. Same columns and distributions as the original per-sample
+    loop; pass `seed` for a reproducible dataset.
+    """
+    columns = generate_columns(barangay_data, num_samples, seed)
+    names = np.array([b['barangay'] for b in barangay_data], dtype=object)
+    return pd.DataFrame({'barangay': names[columns.pop('barangay_code')], **columns})
+
+def generate_columns(barangay_data, num_samples, seed=None):
+    """generate_training_samples as a dict of arrays, barangays as 'barangay_code' indices"""
+    rng = np.random.default_rng(seed)
+    n = int(num_samples)
+
+    populations = np.array([b['population'] for b in barangay_data])
+    base_wastes = np.array([b['total_waste'] for b in barangay_data], dtype=np.float64)
+
+    # Random features
+    barangay = rng.integers(0, len(barangay_data), n)
+    day_of_week = rng.integers(0, 7, n)
+    month = rng.integers(1, 13, n)
+    rainfall_type = rng.integers(0, len(RAINFALL_TYPES), n)
+    temperature = rng.uniform(24, 35, n)
+    is_fiesta = (month == 8) & (rng.random(n) < 0.1)
+    is_holiday = ((month == 1) | (month == 12)) & (rng.random(n) < 0.2)
+
+    # Apply patterns, then add noise for realism
+    base_waste = base_wastes[barangay]
+    predicted_waste = (base_waste * WEEKLY_MULTIPLIERS[day_of_week] * MONTHLY_MULTIPLIERS[month]
+                       * RAINFALL_MULTIPLIERS[rainfall_type])
+    predicted_waste *= rng.uniform(0.9, 1.1, n)
+
+    # Risk level from utilization of the assumed capacity: 0=safe, 1=moderate, 2=high
+    utilization = predicted_waste / (base_waste * CAPACITY_FACTOR)
+    risk_level = np.searchsorted(RISK_UTILIZATION, utilization, side='right')
+
+    return {
+        'barangay_code': barangay.astype(np.int16),
+        'population': populations[barangay],
+        'base_waste': base_waste,
+        'predicted_waste': predicted_waste,
+        'risk_level': risk_level.astype(np.int64),
+
+        # Features
+        'rainfall_mm': RAINFALL_MM[rainfall_type],
+        'temperature_c': temperature,
+        'day_of_week': day_of_week,
+        'month': month,
+        'day_of_month': rng.integers(1, 29, n),
+        'is_weekend': (day_of_week >= 5).astype(np.int64),
+        'is_market_day': np.isin(day_of_week, MARKET_DAYS).astype(np.int64),
+        'is_fiesta': is_fiesta.astype(np.int64),
+        'is_holiday': is_holiday.astype(np.int64),
+        'is_payday': (rng.random(n) < 0.1).astype(np.int64),
+        'is_rainy_season': ((month >= 6) & (month <= 10)).astype(np.int64),
+        'is_summer': ((month >= 3) & (month <= 5)).astype(np.int64),
+
+        # For metrics
+        'actual_waste': predicted_waste * rng.uniform(0.95, 1.05, n),  # Simulated actual
+    }
+
+# ============================================================================
+# ON-DISK SHARDED DATASET
+# ============================================================================
+MANIFEST = 'manifest.json'
+
+def dataset_key(params: dict, sources=()) -> str:
+    """Content hash of the generator parameters and the bytes of each source"""
+    digest = hashlib.sha256(json.dumps({'generator': GENERATOR_VERSION, **params},
+                                       sort_keys=True, default=str).encode())
+    for source in sources:
+        if isinstance(source, str) and os.path.exists(source):
+            with open(source, 'rb') as f:
+                source = f.read()
+        digest.update(source if isinstance(source, bytes) else str(source).encode())
+    return digest.hexdigest()[:16]
+
+class ShardedDataset:
+    """
+    Read side of a dataset written by write_dataset(). Columns are opened
+    memory-mapped, so iterating shards touches one chunk at a time. Every
+    row has a fold (its global row index modulo `n_folds`), which is how
+    training holds out test rows and splits cross-validation without
+    shuffling or loading the whole dataset.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), 'r') as f:
+            self.manifest = json.load(f)
+        self.shards = self.manifest['shards']
+        self.barangays = self.manifest['barangays']
+        self.n_folds = self.manifest['n_folds']
+
+    def __len__(self):
+        return sum(shard['rows'] for shard in self.shards)
+
+    def _column(self, shard, name):
+        return np.load(os.path.join(self.directory, shard['name'], f'{name}.npy'), mmap_mode='r')
+
+    def iter_shards(self, columns, folds=None):
+        """
+        Yield one dict of arrays per shard holding `columns`, restricted to
+        rows whose fold is in `folds` (all rows when None)
+        """
+        for shard in self.shards:
+            rows = slice(None)
+            if folds is not None:
+                fold = (shard['start'] + np.arange(shard['rows'])) % self.n_folds
+                rows = np.flatnonzero(np.isin(fold, list(folds)))
+            yield {name: self._column(shard, name)[rows] for name in columns}
+
+    def features(self, folds=None, dtype=np.float32) -> np.ndarray:
+        """(rows x len(FEATURES)) C-ordered matrix for the selected folds"""
+        blocks = [np.column_stack([chunk[name] for name in FEATURES]).astype(dtype, copy=False)
+                  for chunk in self.iter_shards(FEATURES, folds)]
+        return np.ascontiguousarray(np.concatenate(blocks)) if blocks else np.empty((0, len(FEATURES)), dtype)
+
+    def column(self, name, folds=None) -> np.ndarray:
+        chunks = [chunk[name] for chunk in self.iter_shards([name], folds)]
+        return np.concatenate(chunks) if chunks else np.empty(0)
+
+    def predict(self, model, target: str, folds=None, method: str = 'predict'):
+        """(targets, predictions) for the selected folds, scored one shard at a time"""
+        y_true, y_pred = [], []
+        for chunk in self.iter_shards(FEATURES + [target], folds):
+            X = np.column_stack([chunk[name] for name in FEATURES]).astype(np.float32)
+            y_true.append(np.asarray(chunk[target]))
+            y_pred.append(getattr(model, method)(X))
+        return np.concatenate(y_true), np.concatenate(y_pred)
+
+def write_dataset(directory: str, barangay_data, num_samples: int, chunk_rows: int = 1_000_000,
+                  seed=None, n_folds: int = 5) -> ShardedDataset:
+    """
+    Generate `num_samples` rows in chunks of `chunk_rows` and write each
+    chunk as a shard of per-column .npy files. Every chunk gets its own
+    child seed, so the result does not depend on what else is in memory.
+    The manifest is written last; a directory without one is incomplete.
+    """
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    chunk_rows = max(1, int(chunk_rows))
+    starts = range(0, int(num_samples), chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    shards = []
+    for i, (start, chunk_seed) in enumerate(zip(starts, seeds)):
+        rows = min(chunk_rows, int(num_samples) - start)
+        name = f'shard-{i:05d}'
+        os.makedirs(os.path.join(directory, name))
+        for column, values in generate_columns(barangay_data, rows, chunk_seed).items():
+            np.save(os.path.join(directory, name, f'{column}.npy'), values)
+        shards.append({'name': name, 'start': start, 'rows': rows})
+
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump({
+            'barangays': [b['barangay'] for b in barangay_data],
+            'n_folds': n_folds,
+            'shards': shards,
+        }, f, indent=2)
+    return ShardedDataset(directory)
+
+def load_or_build_dataset(cache_root: str, barangay_data, num_samples: int, chunk_rows: int = 1_000_000,
+                          seed=None, sources=(), n_folds: int = 5):
+    """
+    (dataset, reused) for the given parameters, generating the shards only
+    when no complete dataset with the same content hash is cached
+    """
+    params = {
+        'num_samples': int(num_samples),
+        'chunk_rows': int(chunk_rows),
+        'seed': seed,
+        'n_folds': n_folds,
+        'barangays': [[b['barangay'], b['population'], b['total_waste']] for b in barangay_data],
+    }
+    directory = os.path.join(cache_root, dataset_key(params, sources))
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        return ShardedDataset(directory), True
+    return write_dataset(directory, barangay_data, num_samples, chunk_rows, seed, n_folds), False